@@ -0,0 +1,313 @@
+"""Token usage and cost accounting of every LLM call, per model, route and session.
+
+Every attempt is accounted, failed and retried ones included, with the prompt and completion
+tokens reported by the provider and the cost computed from litellm's price list. Totals are kept
+in memory; when a sink is configured, one record per call is also appended to a JSONL or SQLite
+file by a periodic flush, off the request path.
+"""
+
+import asyncio
+import functools
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from genai_template_backend.backend_settings import logger, settings
+from genai_template_backend.utils import litellm
+
+SESSION_ID_KEY = "usage_session_id"
+
+# ASGI scope of the HTTP request being served, if any
+_request_scope: ContextVar[Optional[dict]] = ContextVar("usage_request_scope", default=None)
+
+
+class UsageTotals(BaseModel):
+    calls: int = 0
+    failed_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, record: "UsageRecord"):
+        self.calls += 1
+        self.failed_calls += record.outcome != "success"
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.cost += record.cost
+
+
+class UsageRecord(BaseModel):
+    timestamp: float
+    model: str
+    operation: str
+    outcome: str
+    route: Optional[str] = None
+    session: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    seconds: float = 0.0
+
+
+@functools.lru_cache(maxsize=256)
+def _token_prices(model: str, call_type: str) -> tuple[float, float]:
+    """Prompt and completion price per token, looked up once per model."""
+    try:
+        # priced on a small request, so that long-context price tiers don't apply
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model, prompt_tokens=1000, completion_tokens=1000, call_type=call_type
+        )
+    except Exception:
+        logger.warning(f"No price known for {model}, its calls are accounted at no cost")
+        return 0.0, 0.0
+    return prompt_cost / 1000, completion_cost / 1000
+
+
+def usage_cost(model: str, operation: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD of the tokens of a call, from litellm's price list."""
+    call_type = "embedding" if operation == "embedding" else "completion"
+    prompt_price, completion_price = _token_prices(model, call_type)
+    return prompt_tokens * prompt_price + completion_tokens * completion_price
+
+
+class JsonlUsageSink:
+    """Appends usage records to a JSON lines file."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, records: list[UsageRecord]):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.writelines(record.model_dump_json() + "\n" for record in records)
+
+    def close(self):
+        pass
+
+
+class SqliteUsageSink:
+    """Inserts usage records in the ``llm_usage`` table of a SQLite database."""
+
+    _columns = tuple(UsageRecord.model_fields)
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_usage ("
+            " timestamp REAL NOT NULL,"
+            " model TEXT NOT NULL,"
+            " operation TEXT NOT NULL,"
+            " outcome TEXT NOT NULL,"
+            " route TEXT,"
+            " session TEXT,"
+            " prompt_tokens INTEGER NOT NULL,"
+            " completion_tokens INTEGER NOT NULL,"
+            " cost REAL NOT NULL,"
+            " seconds REAL NOT NULL"
+            ")"
+        )
+        self._connection.commit()
+
+    def write(self, records: list[UsageRecord]):
+        self._connection.executemany(
+            f"INSERT INTO llm_usage ({', '.join(self._columns)})"
+            f" VALUES ({', '.join('?' * len(self._columns))})",
+            [tuple(getattr(record, column) for column in self._columns) for record in records],
+        )
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+def open_usage_sink(path: str | Path) -> JsonlUsageSink | SqliteUsageSink:
+    """Sink writing to ``path``: JSON lines for ``.jsonl`` files, SQLite otherwise."""
+    if Path(path).suffix == ".jsonl":
+        return JsonlUsageSink(path)
+    return SqliteUsageSink(path)
+
+
+class UsageLedger:
+    """In-memory usage totals, and the records waiting to be flushed to the sink.
+
+    Sessions are kept in least-recently-used order and the oldest are dropped beyond
+    ``max_sessions``. Records are only buffered when a sink is set, at most ``max_pending`` of
+    them between two flushes.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_pending: int = 100_000,
+        sink: Optional[JsonlUsageSink | SqliteUsageSink] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: deque[UsageRecord] = deque(maxlen=max_pending)
+        self.dropped_records = 0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.totals = UsageTotals()
+            self.by_model: dict[str, UsageTotals] = {}
+            self.by_route: dict[str, UsageTotals] = {}
+            self.by_session: OrderedDict[str, UsageTotals] = OrderedDict()
+            self._pending.clear()
+
+    def record(
+        self,
+        model: str,
+        operation: str,
+        usage: Any = None,
+        outcome: str = "success",
+        seconds: float = 0.0,
+    ) -> UsageRecord:
+        """Account a call to a provider, attributed to the HTTP request being served."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        route, session = current_route(), current_session_id()
+        record = UsageRecord(
+            timestamp=time.time(),
+            model=model,
+            operation=operation,
+            outcome=outcome,
+            route=route,
+            session=session,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=usage_cost(model, operation, prompt_tokens, completion_tokens),
+            seconds=seconds,
+        )
+        with self._lock:
+            self.totals.add(record)
+            self.by_model.setdefault(model, UsageTotals()).add(record)
+            if route is not None:
+                self.by_route.setdefault(route, UsageTotals()).add(record)
+            if session is not None:
+                totals = self.by_session.get(session)
+                if totals is None:
+                    totals = self.by_session[session] = UsageTotals()
+                    if len(self.by_session) > self.max_sessions:
+                        self.by_session.popitem(last=False)
+                else:
+                    self.by_session.move_to_end(session)
+                totals.add(record)
+            if self.sink is not None:
+                if len(self._pending) == self._pending.maxlen:
+                    self.dropped_records += 1
+                self._pending.append(record)
+        return record
+
+    def session_usage(self, session: Optional[str]) -> UsageTotals:
+        with self._lock:
+            totals = self.by_session.get(session) if session else None
+            return totals.model_copy() if totals else UsageTotals()
+
+    def summary(self, top_sessions: int = 10) -> dict:
+        """Totals overall, per model and per route, and the most expensive sessions.
+
+        Sessions are listed under a hash of their id: the id itself gives access to the session's
+        data (its conversation), so it is never exposed.
+        """
+        with self._lock:
+            sessions = sorted(self.by_session.items(), key=lambda item: -item[1].cost)
+            return {
+                "totals": self.totals.model_dump(),
+                "by_model": {key: value.model_dump() for key, value in self.by_model.items()},
+                "by_route": {key: value.model_dump() for key, value in self.by_route.items()},
+                "sessions": len(self.by_session),
+                "top_sessions": {
+                    session_label(key): value.model_dump() for key, value in sessions[:top_sessions]
+                },
+                "pending_records": len(self._pending),
+                "dropped_records": self.dropped_records,
+            }
+
+    def flush(self) -> int:
+        """Write the pending records to the sink, returning how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                records = list(self._pending)
+                self._pending.clear()
+            if not records or self.sink is None:
+                return 0
+            try:
+                self.sink.write(records)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(records)} usage records: {e}")
+                with self._lock:
+                    self._pending.extendleft(reversed(records))
+                return 0
+            return len(records)
+
+    async def run_periodic_flush(self, interval_seconds: float):
+        """Flush the pending records every ``interval_seconds``, until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.flush)
+
+    def close(self):
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+
+def session_label(session: str) -> str:
+    """Public label of a session: a short hash of its id, from which the id can't be found."""
+    return hashlib.sha256(session.encode()).hexdigest()[:16]
+
+
+def current_route() -> Optional[str]:
+    """Route template of the HTTP request being served, once it has been routed."""
+    scope = _request_scope.get()
+    route = scope.get("route") if scope is not None else None
+    return getattr(route, "path", None)
+
+
+def current_session_id() -> Optional[str]:
+    scope = _request_scope.get()
+    session = scope.get("session") if scope is not None else None
+    return session.get(SESSION_ID_KEY) if session is not None else None
+
+
+class UsageContextMiddleware:
+    """ASGI middleware attributing the LLM calls made while serving a request to it.
+
+    It must run inside ``SessionMiddleware``: it gives each session a random id, stored in the
+    session cookie, under which its usage is aggregated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = scope.get("session")
+        if session is not None and SESSION_ID_KEY not in session:
+            session[SESSION_ID_KEY] = uuid.uuid4().hex
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+usage_ledger = UsageLedger(max_sessions=settings.USAGE_MAX_SESSIONS)
@@ -0,0 +1,143 @@
+"""Admission control for expensive requests such as chat generations."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted; carries the HTTP answer to send back."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps the number of concurrent generations, with a bounded FIFO queue in front.
+
+    Requests beyond ``max_concurrent`` wait in the queue for at most ``max_queue_seconds``. A
+    request arriving when the queue is full is rejected right away with a 429, and a request that
+    waited too long is rejected with a 503, both with a ``Retry-After`` estimated from the recent
+    generation durations. The controller holds no event-loop-bound primitive, so a single instance
+    can serve several event loops (e.g. successive test clients).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_queue_size: int = 64,
+        max_queue_seconds: float = 10.0,
+    ):
+        if max_concurrent <= 0:
+            raise ValueError("max_concurrent must be positive")
+        self.max_concurrent = max_concurrent
+        self.max_queue_size = max_queue_size
+        self.max_queue_seconds = max_queue_seconds
+
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._average_hold_seconds = 1.0  # EWMA of the time a slot is held
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+        self.queued = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds_observed = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> int:
+        """Seconds after which a slot is likely to be free."""
+        backlog = self.queue_depth + 1
+        return max(1, math.ceil(self._average_hold_seconds * backlog / self.max_concurrent))
+
+    async def acquire(self):
+        """Wait for a generation slot.
+
+        Raises:
+            AdmissionRejected: when the queue is full or the wait exceeds ``max_queue_seconds``.
+        """
+        if self.in_flight < self.max_concurrent and not self.queue_depth:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if self.queue_depth >= self.max_queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(
+                429, "Too many chat requests are waiting, try again later.", self._retry_after()
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_queue_seconds)
+        except TimeoutError:
+            self._abandon(waiter)
+            self.rejected_queue_timeout += 1
+            raise AdmissionRejected(
+                503, "The server is overloaded, try again later.", self._retry_after()
+            )
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        finally:
+            waited = time.monotonic() - start_time
+            self.queued += 1
+            self.total_queue_seconds += waited
+            self.max_queue_seconds_observed = max(self.max_queue_seconds_observed, waited)
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Give up on a queued request, passing on the slot if it was handed over meanwhile."""
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+        else:
+            waiter.cancel()
+            # release() may have skipped and dropped it already
+            with suppress(ValueError):
+                self._waiters.remove(waiter)
+
+    def release(self, hold_seconds: float | None = None):
+        """Free a slot, handing it over to the oldest waiting request if there is one."""
+        if hold_seconds is not None:
+            self._average_hold_seconds += 0.1 * (hold_seconds - self._average_hold_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            # a waiter cancelled (disconnect, timeout) but not resumed yet can't take the slot
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start_time)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.queue_depth,
+            "max_queue_size": self.max_queue_size,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_queue_timeout": self.rejected_queue_timeout,
+            "average_queue_seconds": self.total_queue_seconds / self.queued if self.queued else 0.0,
+            "max_queue_seconds": self.max_queue_seconds_observed,
+        }
@@ -0,0 +1,108 @@
+"""In-process caches for LLM responses."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+
+def request_key(
+    model_name: str,
+    messages: list,
+    schema: Optional[Type[BaseModel]] = None,
+    **params,
+) -> str:
+    """Hash everything that determines the answer of a completion request.
+
+    Messages are normalized (keys sorted, surrounding whitespace stripped from text contents) so
+    that requests that only differ in formatting share the same key.
+    """
+    normalized_messages = [
+        {
+            key: value.strip() if key == "content" and isinstance(value, str) else value
+            for key, value in dict(message).items()
+        }
+        for message in messages
+    ]
+    payload = {
+        "model": model_name,
+        "messages": normalized_messages,
+        "schema": f"{schema.__module__}.{schema.__qualname__}" if schema else None,
+        "params": params,
+    }
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU cache of LLM outputs with a per-entry time-to-live.
+
+    Structured outputs are stored as validated pydantic objects and returned as deep copies, so a
+    hit skips both the provider call and the parsing, and callers can't alter the cached value.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Number of entries currently stored, expired ones included until they are looked up."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+
+        if isinstance(value, BaseModel):
+            return value.model_copy(deep=True)
+        return value
+
+    def set(self, key: str, value: Any):
+        if value is None:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hit_ratio,
+        }
@@ -0,0 +1,179 @@
+"""LLM clients shared by the whole application and the FastAPI dependencies exposing them."""
+
+import asyncio
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from genai_template_backend.api.cache import ResponseCache
+from genai_template_backend.api.deployment_router import LLMRouter
+from genai_template_backend.api.embedding_cache import EmbeddingCache
+from genai_template_backend.api.hedging import HedgingPolicy
+from genai_template_backend.api.llm import EmbeddingLLMConfig, InferenceLLMConfig
+from genai_template_backend.api.metrics import REGISTRY
+from genai_template_backend.api.rate_limit import rate_limiter_stats
+from genai_template_backend.api.semantic_cache import SemanticCache
+from genai_template_backend.api.single_flight import SingleFlight
+from genai_template_backend.backend_settings import ApplicationSettings, logger
+
+
+class LLMRegistry:
+    """Holds the LLM clients built once at startup and reused by every request."""
+
+    def __init__(
+        self,
+        inference: InferenceLLMConfig,
+        embedding: Optional[EmbeddingLLMConfig] = None,
+    ):
+        self.inference = inference
+        self.embedding = embedding
+
+    def register_metrics(self):
+        """Expose the statistics the clients already keep on ``/metrics``."""
+        inference = self.inference
+        components = {
+            "response_cache": inference.response_cache,
+            "semantic_cache": inference.semantic_cache,
+            "single_flight": inference.single_flight,
+            "hedging": inference.hedging,
+            "router": inference if isinstance(inference, LLMRouter) else None,
+            "embedding_cache": self.embedding.embedding_cache if self.embedding else None,
+        }
+        for name, component in components.items():
+            if component is None:
+                REGISTRY.unregister_collector(name)
+            else:
+                REGISTRY.register_collector(name, component.stats)
+        REGISTRY.register_collector("rate_limiter", rate_limiter_stats)
+        if self.embedding is not None:
+            REGISTRY.register_collector(
+                "embedding_micro_batcher",
+                lambda: (
+                    self.embedding._micro_batcher.stats()
+                    if self.embedding._micro_batcher is not None
+                    else {}
+                ),
+            )
+
+    def close(self):
+        """Release the resources held by the clients."""
+        if self.embedding is not None and self.embedding.embedding_cache is not None:
+            self.embedding.embedding_cache.close()
+
+    @classmethod
+    async def a_from_settings(cls, settings: ApplicationSettings) -> "LLMRegistry":
+        """Build the clients described by the settings.
+
+        Building a client runs litellm's model lookups, so the clients are built concurrently in
+        worker threads instead of one after the other on the event loop.
+        """
+        response_cache = None
+        if settings.RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache(
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            )
+
+        inference_task = asyncio.to_thread(_inference_from_settings, settings, response_cache)
+        if settings.EMBEDDINGS_DEPLOYMENT_NAME and settings.EMBEDDINGS_BASE_URL:
+            embedding_task = asyncio.to_thread(
+                EmbeddingLLMConfig,
+                model_name=settings.EMBEDDINGS_DEPLOYMENT_NAME,
+                api_key=settings.EMBEDDINGS_API_KEY,
+                base_url=settings.EMBEDDINGS_BASE_URL,
+                api_version=settings.EMBEDDINGS_API_VERSION,
+                embedding_batch_size=settings.EMBEDDINGS_BATCH_SIZE,
+                embedding_batch_max_tokens=settings.EMBEDDINGS_BATCH_MAX_TOKENS,
+                embedding_max_concurrency=settings.EMBEDDINGS_MAX_CONCURRENCY,
+                micro_batching=settings.EMBEDDINGS_MICRO_BATCHING,
+                micro_batch_max_size=settings.EMBEDDINGS_MICRO_BATCH_MAX_SIZE,
+                micro_batch_max_wait_ms=settings.EMBEDDINGS_MICRO_BATCH_MAX_WAIT_MS,
+                embedding_cache=EmbeddingCache(settings.EMBEDDINGS_CACHE_PATH)
+                if settings.EMBEDDINGS_CACHE_PATH
+                else None,
+            )
+            inference, embedding = await asyncio.gather(inference_task, embedding_task)
+        else:
+            inference, embedding = await inference_task, None
+
+        if settings.SEMANTIC_CACHE_ENABLED:
+            if embedding is None:
+                logger.warning(
+                    "SEMANTIC_CACHE_ENABLED is set but no embedding model is configured."
+                )
+            else:
+                inference.semantic_cache = SemanticCache(
+                    embedding,
+                    capacity=settings.SEMANTIC_CACHE_CAPACITY,
+                    similarity_threshold=settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+                )
+
+        logger.info(
+            f"LLM clients ready: inference={inference.model_name}, "
+            f"embedding={embedding.model_name if embedding else None}"
+        )
+        registry = cls(inference=inference, embedding=embedding)
+        registry.register_metrics()
+        return registry
+
+
+def _inference_from_settings(
+    settings: ApplicationSettings, response_cache: Optional[ResponseCache]
+) -> InferenceLLMConfig:
+    """Build the inference client, routing over every deployment when several are configured."""
+    shared = dict(
+        response_cache=response_cache,
+        single_flight=SingleFlight() if settings.INFERENCE_SINGLE_FLIGHT else None,
+        hedging=HedgingPolicy(
+            percentile=settings.INFERENCE_HEDGE_PERCENTILE,
+            max_hedge_rate=settings.INFERENCE_HEDGE_MAX_RATE,
+        )
+        if settings.INFERENCE_HEDGING
+        else None,
+        deadline_seconds=settings.INFERENCE_DEADLINE_SECONDS,
+    )
+    primary = dict(
+        model_name=settings.INFERENCE_DEPLOYMENT_NAME,
+        api_key=settings.INFERENCE_API_KEY,
+        base_url=settings.INFERENCE_BASE_URL,
+        api_version=settings.INFERENCE_API_VERSION,
+        requests_per_minute=settings.INFERENCE_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.INFERENCE_TOKENS_PER_MINUTE,
+    )
+    if not settings.INFERENCE_DEPLOYMENTS:
+        return InferenceLLMConfig(**primary, **shared, max_retries=settings.INFERENCE_MAX_RETRIES)
+
+    # the router fails over to another deployment instead of retrying on the same one
+    deployments = [
+        InferenceLLMConfig(
+            **primary, max_retries=0, deadline_seconds=settings.INFERENCE_DEADLINE_SECONDS
+        )
+    ]
+    fallback_deployments = []
+    for deployment in settings.INFERENCE_DEPLOYMENTS:
+        client = InferenceLLMConfig(
+            model_name=deployment.model_name,
+            base_url=deployment.base_url,
+            api_key=deployment.api_key or settings.INFERENCE_API_KEY,
+            api_version=deployment.api_version or settings.INFERENCE_API_VERSION,
+            requests_per_minute=deployment.requests_per_minute,
+            tokens_per_minute=deployment.tokens_per_minute,
+            max_retries=0,
+            deadline_seconds=settings.INFERENCE_DEADLINE_SECONDS,
+        )
+        (fallback_deployments if deployment.fallback else deployments).append(client)
+    return LLMRouter(deployments=deployments, fallback_deployments=fallback_deployments, **shared)
+
+
+def get_llm_registry(request: Request) -> LLMRegistry:
+    return request.app.state.llm_registry
+
+
+def get_inference_llm(registry: LLMRegistry = Depends(get_llm_registry)) -> InferenceLLMConfig:
+    return registry.inference
+
+
+def get_embedding_llm(registry: LLMRegistry = Depends(get_llm_registry)) -> EmbeddingLLMConfig:
+    if registry.embedding is None:
+        raise HTTPException(status_code=503, detail="No embedding model is configured.")
+    return registry.embedding
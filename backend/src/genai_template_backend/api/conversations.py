@@ -0,0 +1,451 @@
+"""Server-side conversation history of the chat sessions, trimmed to a context budget.
+
+Each session keeps a window of its latest messages together with their token counts, computed
+once when a message is added, so preparing a prompt never re-counts the history. When the window
+exceeds the budget its oldest turns are dropped (``window``), or folded into a running summary
+(``summary``), in both cases one message at a time as new ones come in.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Literal, NamedTuple, Optional
+
+from genai_template_backend.api.llm import InferenceLLMConfig, estimate_tokens
+from genai_template_backend.backend_settings import logger, settings
+
+# tokens taken by the role and separators of each message in the prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+# bytes accounted per message on top of its content, for the memory budget
+MESSAGE_OVERHEAD_BYTES = 120
+
+SUMMARY_PROMPT = (
+    "Update the summary of a conversation with its following messages. Keep the facts, names,"
+    " decisions and open questions needed to continue it, in at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\nFollowing messages:\n{messages}\n\nUpdated summary:"
+)
+
+Trimming = Literal["window", "summary"]
+
+
+class StoredMessage(NamedTuple):
+    seq: int
+    role: str
+    content: str
+    tokens: int
+
+    def as_message(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def message_bytes(content: str) -> int:
+    return len(content.encode()) + MESSAGE_OVERHEAD_BYTES
+
+
+class Conversation:
+    """History of a session: a summary of its earlier turns and a window of the latest messages."""
+
+    def __init__(self, session: str):
+        self.session = session
+        self.window: deque[StoredMessage] = deque()
+        self.window_tokens = 0
+        self.turns = 0  # user messages in the window
+        self.summary = ""
+        self.summary_tokens = 0
+        # messages dropped from the window and not folded into the summary yet
+        self.to_summarize: list[StoredMessage] = []
+        self.next_seq = 0
+        self.last_access = time.monotonic()
+        self.bytes = 0
+
+    def append(self, role: str, content: str) -> StoredMessage:
+        message = StoredMessage(self.next_seq, role, content, message_tokens(content))
+        self.next_seq = message.seq + 1
+        self.push(message)
+        return message
+
+    def push(self, message: StoredMessage):
+        self.window.append(message)
+        self.window_tokens += message.tokens
+        self.turns += message.role == "user"
+        self.bytes += message_bytes(message.content)
+
+    def pop_oldest_turn(self) -> list[StoredMessage]:
+        """Remove the oldest message of the window, and the replies that would start it after."""
+        dropped = [self.window.popleft()]
+        while self.window and self.window[0].role != "user":
+            dropped.append(self.window.popleft())
+        for message in dropped:
+            self.window_tokens -= message.tokens
+            self.turns -= message.role == "user"
+            self.bytes -= message_bytes(message.content)
+        return dropped
+
+    def set_summary(self, summary: str):
+        self.bytes += len(summary.encode()) - len(self.summary.encode())
+        self.summary = summary
+        self.summary_tokens = message_tokens(summary) if summary else 0
+
+    def messages(self) -> list[dict]:
+        """Messages of the history to send before a new one, the summary first if there is one."""
+        messages = [message.as_message() for message in self.window]
+        if self.summary:
+            messages.insert(
+                0,
+                {
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation: {self.summary}",
+                },
+            )
+        return messages
+
+
+class SqliteConversationBackend:
+    """Conversations persisted in SQLite, so they survive restarts and memory evictions.
+
+    Only the messages of the windows and the summaries are kept: trimmed messages are deleted,
+    once they are folded into the summary when the history is summarized.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_messages ("
+            " session TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (session, seq)"
+            ") WITHOUT ROWID"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_summaries ("
+            " session TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL"
+            ")"
+        )
+        self._connection.commit()
+
+    def load(self, session: str) -> Optional[Conversation]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT seq, role, content, tokens FROM conversation_messages"
+                " WHERE session = ? ORDER BY seq",
+                (session,),
+            ).fetchall()
+            summary = self._connection.execute(
+                "SELECT summary FROM conversation_summaries WHERE session = ?", (session,)
+            ).fetchone()
+        if not rows and summary is None:
+            return None
+        conversation = Conversation(session)
+        for row in rows:
+            conversation.push(StoredMessage(*row))
+        conversation.next_seq = rows[-1][0] + 1 if rows else 0
+        if summary is not None:
+            conversation.set_summary(summary[0])
+        return conversation
+
+    def save_messages(self, session: str, messages: list[StoredMessage]):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO conversation_messages (session, seq, role, content, tokens)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(session, *message) for message in messages],
+            )
+            self._connection.commit()
+
+    def delete_messages_before(self, session: str, seq: int):
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM conversation_messages WHERE session = ? AND seq < ?", (session, seq)
+            )
+            self._connection.commit()
+
+    def save_summary(self, session: str, summary: str, summarized_before: Optional[int] = None):
+        """Save the summary, and delete the messages before ``summarized_before`` it includes."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO conversation_summaries (session, summary) VALUES (?, ?)",
+                (session, summary),
+            )
+            if summarized_before is not None:
+                self._connection.execute(
+                    "DELETE FROM conversation_messages WHERE session = ? AND seq < ?",
+                    (session, summarized_before),
+                )
+            self._connection.commit()
+
+    def delete(self, session: str):
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM conversation_messages WHERE session = ?", (session,)
+            )
+            self._connection.execute(
+                "DELETE FROM conversation_summaries WHERE session = ?", (session,)
+            )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ConversationStore:
+    """Conversations of the sessions, in memory with an optional SQLite backend.
+
+    Conversations idle for more than ``idle_ttl_seconds``, and the least recently used ones past
+    ``max_memory_bytes``, are evicted from memory; with a backend they are reloaded from it when
+    their session comes back, without one they are lost.
+
+    Each session's history is kept within ``max_context_tokens`` (summary included) once a new
+    message is added, so that the prompts stay under the model's context limit.
+    """
+
+    def __init__(
+        self,
+        max_context_tokens: int = 4096,
+        trimming: Trimming = "window",
+        idle_ttl_seconds: Optional[float] = 3600,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        summary_max_words: int = 200,
+        backend: Optional[SqliteConversationBackend] = None,
+    ):
+        if max_context_tokens <= 0:
+            raise ValueError("max_context_tokens must be positive")
+        self.max_context_tokens = max_context_tokens
+        self.trimming = trimming
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.summary_max_words = summary_max_words
+        self.backend = backend
+        self._conversations: OrderedDict[str, Conversation] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.trimmed_messages = 0
+        self.summaries = 0
+
+    def __len__(self) -> int:
+        """Number of conversations held in memory."""
+        return len(self._conversations)
+
+    def _evict_expired(self, now: float):
+        # conversations are kept in access order, so the idle ones are at the front
+        while self._conversations and self.idle_ttl_seconds is not None:
+            conversation = next(iter(self._conversations.values()))
+            if now - conversation.last_access <= self.idle_ttl_seconds:
+                break
+            self._evict(conversation.session)
+
+    def _evict_over_budget(self, keep: str):
+        while self._bytes > self.max_memory_bytes and len(self._conversations) > 1:
+            oldest = next(iter(self._conversations))
+            if oldest == keep:
+                self._conversations.move_to_end(keep)
+                continue
+            self._evict(oldest)
+
+    def _evict(self, session: str):
+        conversation = self._conversations.pop(session)
+        self._bytes -= conversation.bytes
+        self.evictions += 1
+
+    def _get(self, session: str, create: bool) -> Optional[Conversation]:
+        now = time.monotonic()
+        self._evict_expired(now)
+        conversation = self._conversations.get(session)
+        if conversation is None:
+            if self.backend is not None:
+                conversation = self.backend.load(session)
+            if conversation is None and not create:
+                return None
+            conversation = conversation or Conversation(session)
+            self._conversations[session] = conversation
+            self._bytes += conversation.bytes
+        else:
+            self._conversations.move_to_end(session)
+        conversation.last_access = now
+        return conversation
+
+    def history(self, session: Optional[str], new_message: str = "") -> list[dict]:
+        """Messages to send before ``new_message``, trimmed so that both fit in the budget."""
+        if session is None:
+            return []
+        with self._lock:
+            conversation = self._get(session, create=False)
+            if conversation is None:
+                return []
+            before = conversation.bytes
+            self._trim(conversation, message_tokens(new_message) if new_message else 0)
+            self._bytes += conversation.bytes - before
+            return conversation.messages()
+
+    def add_turn(self, session: Optional[str], user_message: str, reply: str):
+        """Append a completed exchange to the session's history."""
+        if session is None:
+            return
+        with self._lock:
+            conversation = self._get(session, create=True)
+            before = conversation.bytes
+            messages = [conversation.append("user", user_message)]
+            messages.append(conversation.append("assistant", reply))
+            if self.backend is not None:
+                self.backend.save_messages(session, messages)
+            self._trim(conversation)
+            self._bytes += conversation.bytes - before
+            self._evict_over_budget(keep=session)
+
+    def last_turn(self, session: Optional[str]) -> Optional[tuple[list[dict], str]]:
+        """The history preceding the session's latest turn, and the user message of that turn."""
+        if session is None:
+            return None
+        with self._lock:
+            conversation = self._get(session, create=False)
+            if conversation is None or len(conversation.window) < 2:
+                return None
+            user_message = conversation.window[-2]
+            if user_message.role != "user":
+                return None
+            return conversation.messages()[:-2], user_message.content
+
+    def replace_last_reply(self, session: Optional[str], reply: str):
+        """Replace the reply of the session's latest turn, e.g. with a regenerated one."""
+        if session is None:
+            return
+        with self._lock:
+            conversation = self._get(session, create=False)
+            if conversation is None or not conversation.window:
+                return
+            old = conversation.window[-1]
+            new = old._replace(content=reply, tokens=message_tokens(reply))
+            conversation.window[-1] = new
+            conversation.window_tokens += new.tokens - old.tokens
+            delta_bytes = message_bytes(reply) - message_bytes(old.content)
+            conversation.bytes += delta_bytes
+            self._bytes += delta_bytes
+            if self.backend is not None:
+                self.backend.save_messages(session, [new])
+
+    def _trim(self, conversation: Conversation, reserved_tokens: int = 0):
+        """Drop the oldest turns until the history and ``reserved_tokens`` fit in the budget.
+
+        The latest turn is always kept, even when it alone exceeds the budget.
+        """
+        budget = self.max_context_tokens - reserved_tokens
+        dropped = []
+        while (
+            conversation.turns > 1
+            and conversation.summary_tokens + conversation.window_tokens > budget
+        ):
+            dropped.extend(conversation.pop_oldest_turn())
+        if not dropped:
+            return
+        self.trimmed_messages += len(dropped)
+        if self.trimming == "summary":
+            # kept in the backend until the summary including them is saved: after a restart they
+            # are loaded back into the window, and trimmed and summarized again
+            conversation.to_summarize.extend(dropped)
+            conversation.bytes += sum(message_bytes(message.content) for message in dropped)
+        elif self.backend is not None:
+            first_kept = (
+                conversation.window[0].seq if conversation.window else conversation.next_seq
+            )
+            self.backend.delete_messages_before(conversation.session, first_kept)
+
+    async def a_summarize(self, session: Optional[str], llm: InferenceLLMConfig):
+        """Fold the messages trimmed from the session's window into its summary.
+
+        Only the trimmed messages are sent along with the current summary, so the cost of a
+        summary update doesn't grow with the length of the conversation.
+        """
+        if session is None or self.trimming != "summary":
+            return
+        with self._lock:
+            conversation = self._conversations.get(session)
+            if conversation is None or not conversation.to_summarize:
+                return
+            pending = list(conversation.to_summarize)
+            previous_summary = conversation.summary
+
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_max_words,
+            summary=previous_summary or "(none)",
+            messages="\n".join(f"{message.role}: {message.content}" for message in pending),
+        )
+        # never from the caches nor shared with another call: the prompts of all the sessions
+        # look alike, so those could answer with the summary of another user's conversation
+        try:
+            summary, _ = await llm._a_generate_with_completion(
+                [{"role": "user", "content": prompt}], use_caches=False
+            )
+        except Exception as e:
+            logger.error(f"Error in generating response from LLM: {e}")
+            summary = None
+        if not summary:
+            logger.warning(f"Summarizing {len(pending)} messages failed, they will be retried")
+            return
+
+        with self._lock:
+            # the conversation may have been evicted or cleared in the meantime
+            if self._conversations.get(session) is not conversation:
+                return
+            before = conversation.bytes
+            del conversation.to_summarize[: len(pending)]
+            conversation.bytes -= sum(message_bytes(message.content) for message in pending)
+            conversation.set_summary(summary.strip())
+            self._bytes += conversation.bytes - before
+            self.summaries += 1
+            if self.backend is not None:
+                self.backend.save_summary(session, conversation.summary, pending[-1].seq + 1)
+
+    def clear(self, session: Optional[str]):
+        """Forget the session's history."""
+        if session is None:
+            return
+        with self._lock:
+            conversation = self._conversations.pop(session, None)
+            if conversation is not None:
+                self._bytes -= conversation.bytes
+            if self.backend is not None:
+                self.backend.delete(session)
+
+    def reset(self):
+        with self._lock:
+            self._conversations.clear()
+            self._bytes = 0
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "memory_bytes": self._bytes,
+                "evictions": self.evictions,
+                "trimmed_messages": self.trimmed_messages,
+                "summaries": self.summaries,
+            }
+
+
+conversation_store = ConversationStore(
+    max_context_tokens=settings.CONVERSATION_MAX_CONTEXT_TOKENS,
+    trimming=settings.CONVERSATION_TRIMMING,
+    idle_ttl_seconds=settings.CONVERSATION_IDLE_TTL_SECONDS,
+    max_memory_bytes=settings.CONVERSATION_MAX_MEMORY_BYTES,
+)
@@ -0,0 +1,370 @@
+"""Routing of inference requests over several equivalent deployments."""
+
+import functools
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Type
+
+from pydantic import BaseModel, PrivateAttr, model_validator
+
+from genai_template_backend.api.hedging import hedged_deployments
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.rate_limit import RateLimitTimeout
+from genai_template_backend.backend_settings import logger
+from genai_template_backend.utils import litellm
+
+
+@functools.cache
+def _deployment_errors() -> tuple[type[Exception], ...]:
+    """Errors telling that the deployment, not the request, is at fault: it's sent elsewhere."""
+    return (
+        litellm.exceptions.RateLimitError,
+        litellm.exceptions.APIConnectionError,
+        litellm.exceptions.Timeout,
+        litellm.exceptions.InternalServerError,
+        litellm.exceptions.ServiceUnavailableError,
+        RateLimitTimeout,
+        TimeoutError,
+    )
+
+
+class DeploymentHealth:
+    """Latency, load and error statistics of a deployment, and its ejection state."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # EWMA, in seconds
+        self.error_rate = 0.0  # EWMA of the failures
+        self.in_flight = 0
+        self.consecutive_failures = 0
+
+        self.ejected = False
+        self.ejected_until = 0.0
+        self.eject_seconds = 0.0  # doubles each time a re-probe fails
+        self.probe_in_flight = False
+
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def stats(self) -> dict:
+        return {
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "in_flight": self.in_flight,
+            "ejected": self.ejected,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class LLMRouter(InferenceLLMConfig):
+    """Inference client spreading requests over equivalent deployments.
+
+    Each request goes to the deployment with the lowest expected latency, estimated from the EWMA
+    of its recent latencies, its in-flight requests and its recent error rate. Deployments failing
+    repeatedly are ejected for ``eject_seconds``, then get a single probe request; the ejection
+    time doubles (up to ``max_eject_seconds``) each time the probe fails. Fallback deployments,
+    e.g. a local Ollama, are only used when no primary deployment is available.
+
+    A request failing because of the deployment (rate limit, timeout, connection or server
+    error) is sent again to the next best deployment, so deployments are usually configured
+    without retries of their own. A hedge (see ``hedging``) goes to another deployment than the
+    attempt it hedges whenever one is available. Caches and single-flight apply once, on top of
+    the routing; the router's own ``model_name`` and ``base_url`` are the ones of the first
+    deployment.
+    """
+
+    deployments: list[InferenceLLMConfig]
+    fallback_deployments: list[InferenceLLMConfig] = []
+
+    latency_alpha: float = 0.2
+    eject_after_failures: int = 3
+    eject_error_rate: float = 0.5
+    eject_seconds: float = 10.0
+    max_eject_seconds: float = 300.0
+
+    _health: list[DeploymentHealth] = PrivateAttr(default_factory=list)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @model_validator(mode="before")
+    @classmethod
+    def default_to_first_deployment(cls, data: Any) -> Any:
+        if isinstance(data, dict) and data.get("deployments"):
+            first = data["deployments"][0]
+            data.setdefault("model_name", first.model_name)
+            data.setdefault("base_url", first.base_url)
+            data.setdefault("api_key", first.api_key)
+            data.setdefault("api_version", first.api_version)
+        return data
+
+    def model_post_init(self, __context: Any):
+        if not self.deployments:
+            raise ValueError("LLMRouter needs at least one deployment")
+        self._health = [DeploymentHealth() for _ in self._all_deployments]
+
+    @property
+    def _all_deployments(self) -> list[InferenceLLMConfig]:
+        return self.deployments + self.fallback_deployments
+
+    def _select(self, exclude: set[int], allow_ejected: bool = True) -> Optional[tuple[int, bool]]:
+        """Pick the deployment for the next attempt and count the attempt as in flight.
+
+        Returns the index of the deployment, and whether the attempt is the probe of an ejected
+        deployment (to be passed on to :meth:`_release`).
+        """
+        now = time.monotonic()
+        with self._lock:
+            choice = None
+            tiers = (
+                range(len(self.deployments)),
+                range(len(self.deployments), len(self._health)),
+            )
+            for tier in tiers:
+                candidates = []
+                for index in tier:
+                    health = self._health[index]
+                    if index in exclude or (health.ejected and now < health.ejected_until):
+                        continue
+                    if health.ejected:
+                        if not health.probe_in_flight:
+                            # a due probe goes first, otherwise the deployment never comes back
+                            candidates = [(-1.0, 0, 0.0, index)]
+                            break
+                        continue
+                    score = (health.latency or 0.0) * (1 + health.in_flight)
+                    score /= max(1.0 - health.error_rate, 0.05)
+                    # unmeasured deployments score 0, the in-flight count breaks the tie
+                    candidates.append((score, health.in_flight, random.random(), index))
+                if candidates:
+                    choice = min(candidates)[3]
+                    break
+
+            if choice is None and allow_ejected:
+                # every deployment is ejected: the one coming back first is the best bet
+                remaining = [i for i in range(len(self._health)) if i not in exclude]
+                if remaining:
+                    choice = min(remaining, key=lambda i: self._health[i].ejected_until)
+            if choice is None:
+                return None
+
+            health = self._health[choice]
+            health.in_flight += 1
+            health.requests += 1
+            probe = health.ejected and not health.probe_in_flight
+            if probe:
+                health.probe_in_flight = True
+            return choice, probe
+
+    def _select_avoiding_hedged(self, exclude: set[int]) -> Optional[tuple[int, bool]]:
+        """Like :meth:`_select`, sending a hedge to another deployment than the first attempt."""
+        busy = hedged_deployments.get()
+        selected = self._select(exclude | busy, allow_ejected=False) if busy else None
+        if selected is None:
+            selected = self._select(exclude)
+        if selected is not None and busy is not None:
+            busy.add(selected[0])
+        return selected
+
+    def _record(self, index: int, elapsed: float, failed: bool):
+        """Update the statistics of a deployment with the outcome of an attempt."""
+        alpha = self.latency_alpha
+        with self._lock:
+            health = self._health[index]
+            if health.latency is None:
+                health.latency = elapsed
+            elif not failed or elapsed > health.latency:
+                # fast failures say nothing about latency, slow ones (timeouts) do
+                health.latency += alpha * (elapsed - health.latency)
+            health.error_rate += alpha * (float(failed) - health.error_rate)
+
+            if not failed:
+                health.consecutive_failures = 0
+                if health.ejected:
+                    logger.info(f"Deployment {self._name(index)} is back")
+                health.ejected = False
+                health.eject_seconds = 0.0
+                return
+
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.ejected or (
+                health.consecutive_failures >= self.eject_after_failures
+                or (health.requests >= 10 and health.error_rate >= self.eject_error_rate)
+            ):
+                health.eject_seconds = min(
+                    max(self.eject_seconds, 2 * health.eject_seconds), self.max_eject_seconds
+                )
+                health.ejected = True
+                health.ejected_until = time.monotonic() + health.eject_seconds
+                health.ejections += 1
+                logger.warning(
+                    f"Deployment {self._name(index)} ejected for {health.eject_seconds:.0f}s"
+                )
+
+    def _release(self, index: int, probe: bool):
+        with self._lock:
+            self._health[index].in_flight -= 1
+            if probe:
+                # only the probe's own outcome allows the next one
+                self._health[index].probe_in_flight = False
+
+    def _name(self, index: int) -> str:
+        deployment = self._all_deployments[index]
+        return f"{deployment.model_name}@{deployment.base_url}"
+
+    async def _a_complete(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        tried, last_error = set(), None
+        while (selected := self._select_avoiding_hedged(tried)) is not None:
+            index, probe = selected
+            tried.add(index)
+            start_time = time.monotonic()
+            try:
+                result = await self._all_deployments[index]._a_complete(
+                    messages, schema, *args, **kwargs
+                )
+            except _deployment_errors() as e:
+                self._record(index, time.monotonic() - start_time, failed=True)
+                logger.warning(f"Deployment {self._name(index)} failed, failing over: {e}")
+                last_error = e
+                continue
+            finally:
+                self._release(index, probe)
+            self._record(index, time.monotonic() - start_time, failed=False)
+            return result
+        raise last_error
+
+    def _complete(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Synchronous counterpart of :meth:`_a_complete`."""
+        tried, last_error = set(), None
+        while (selected := self._select(tried)) is not None:
+            index, probe = selected
+            tried.add(index)
+            start_time = time.monotonic()
+            try:
+                result = self._all_deployments[index]._complete(messages, schema, *args, **kwargs)
+            except _deployment_errors() as e:
+                self._record(index, time.monotonic() - start_time, failed=True)
+                logger.warning(f"Deployment {self._name(index)} failed, failing over: {e}")
+                last_error = e
+                continue
+            finally:
+                self._release(index, probe)
+            self._record(index, time.monotonic() - start_time, failed=False)
+            return result
+        raise last_error
+
+    async def a_stream_from_messages(
+        self,
+        messages: list,
+        raw_response: bool = False,
+        *args,
+        **kwargs,
+    ) -> AsyncIterator:
+        """Stream from the best deployment, failing over as long as nothing has been sent.
+
+        The latency of a stream is its time to first chunk.
+        """
+        async for chunk in self._a_stream_routed(
+            lambda deployment: deployment.a_stream_from_messages(
+                messages, raw_response, *args, **kwargs
+            )
+        ):
+            yield chunk
+
+    async def _a_stream_partials(
+        self,
+        messages: list,
+        schema: Type[BaseModel],
+        *args,
+        **kwargs,
+    ) -> AsyncIterator[BaseModel]:
+        async for partial in self._a_stream_routed(
+            lambda deployment: deployment._a_stream_partials(messages, schema, *args, **kwargs)
+        ):
+            yield partial
+
+    async def _a_stream_routed(
+        self, open_stream: Callable[[InferenceLLMConfig], AsyncIterator]
+    ) -> AsyncIterator:
+        """Items of the stream opened on the best deployment, failing over until the first one."""
+        tried, last_error = set(), None
+        while (selected := self._select(tried)) is not None:
+            index, probe = selected
+            tried.add(index)
+            start_time = time.monotonic()
+            stream = open_stream(self._all_deployments[index])
+            try:
+                try:
+                    first_chunk = await anext(stream)
+                except StopAsyncIteration:
+                    self._record(index, time.monotonic() - start_time, failed=False)
+                    return
+                except _deployment_errors() as e:
+                    self._record(index, time.monotonic() - start_time, failed=True)
+                    logger.warning(f"Deployment {self._name(index)} failed, failing over: {e}")
+                    last_error = e
+                    continue
+                self._record(index, time.monotonic() - start_time, failed=False)
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+                return
+            finally:
+                await stream.aclose()
+                self._release(index, probe)
+        raise last_error
+
+    def stream_from_messages(
+        self,
+        messages: list,
+        raw_response: bool = False,
+        *args,
+        **kwargs,
+    ) -> Iterator:
+        """Synchronous counterpart of :meth:`a_stream_from_messages`."""
+        tried, last_error = set(), None
+        while (selected := self._select(tried)) is not None:
+            index, probe = selected
+            tried.add(index)
+            start_time = time.monotonic()
+            stream = self._all_deployments[index].stream_from_messages(
+                messages, raw_response, *args, **kwargs
+            )
+            try:
+                try:
+                    first_chunk = next(stream)
+                except StopIteration:
+                    self._record(index, time.monotonic() - start_time, failed=False)
+                    return
+                except _deployment_errors() as e:
+                    self._record(index, time.monotonic() - start_time, failed=True)
+                    logger.warning(f"Deployment {self._name(index)} failed, failing over: {e}")
+                    last_error = e
+                    continue
+                self._record(index, time.monotonic() - start_time, failed=False)
+                yield first_chunk
+                yield from stream
+                return
+            finally:
+                stream.close()
+                self._release(index, probe)
+        raise last_error
+
+    def stats(self) -> dict:
+        """Statistics of every deployment, keyed by ``model@base_url``."""
+        with self._lock:
+            return {self._name(i): health.stats() for i, health in enumerate(self._health)}
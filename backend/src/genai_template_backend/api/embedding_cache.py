@@ -0,0 +1,89 @@
+"""Persistent, content-addressed cache of embeddings."""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+
+# stays below SQLite's default limit on the number of bound parameters
+_MAX_QUERY_PARAMETERS = 900
+
+
+class EmbeddingCache:
+    """Embeddings stored in SQLite, keyed by model name and SHA-256 of the embedded text.
+
+    Vectors are stored as packed float32 blobs. Lookups and inserts work on whole lists of keys so
+    that re-embedding a corpus costs one bulk query, and only unseen texts reach the provider.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_many(self, model: str, text_hashes: list[str]) -> dict[str, list[float]]:
+        """Return the cached vectors found among the given hashes."""
+        unique_hashes = list(dict.fromkeys(text_hashes))
+        found = {}
+        with self._lock:
+            for start in range(0, len(unique_hashes), _MAX_QUERY_PARAMETERS):
+                chunk = unique_hashes[start : start + _MAX_QUERY_PARAMETERS]
+                rows = self._connection.execute(
+                    "SELECT text_hash, vector FROM embeddings"
+                    f" WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    (model, *chunk),
+                )
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, list[float]]):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [
+                    (model, text_hash, array("f", vector).tobytes())
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        """Number of cached embeddings, all models included."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
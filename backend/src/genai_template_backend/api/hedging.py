@@ -0,0 +1,84 @@
+"""Hedged requests: a second attempt for the calls slower than most recent ones."""
+
+import math
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+# Deployments already busy with an attempt of the current hedged call. The attempts of a call
+# share this set, so a router can send the hedge to another deployment than the first attempt.
+hedged_deployments: ContextVar[Optional[set]] = ContextVar("hedged_deployments", default=None)
+
+
+class HedgingPolicy:
+    """Decides when a call gets a hedge, and keeps the statistics of the hedges.
+
+    A call still running after the ``percentile`` of the recent call latencies gets a second,
+    identical attempt; the first attempt to succeed wins and the other one is cancelled. Hedges
+    are paid for by a budget refilled by ``max_hedge_rate`` per call, so at most that fraction
+    of the calls is hedged in the long run, with bursts of up to ``max_burst`` hedges.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_hedge_rate: float = 0.1,
+        max_burst: float = 5.0,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in ]0, 100]")
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.max_burst = max_burst
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0  # hedges not sent because the budget was exhausted
+
+    def delay(self) -> Optional[float]:
+        """Register a new call and return after how long it should be hedged.
+
+        Returns ``None`` while there aren't enough latency samples to tell what a slow call is.
+        """
+        with self._lock:
+            self.calls += 1
+            self._budget = min(self.max_burst, self._budget + self.max_hedge_rate)
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        rank = math.ceil(self.percentile / 100 * len(latencies)) - 1
+        return latencies[max(rank, 0)]
+
+    def try_fire(self) -> bool:
+        """Take a hedge from the budget, return ``False`` if there is none left."""
+        with self._lock:
+            if self._budget < 1.0:
+                self.hedges_skipped += 1
+                return False
+            self._budget -= 1.0
+            self.hedges_fired += 1
+            return True
+
+    def record(self, latency: float, hedge_won: bool = False):
+        """Record the latency of the winning attempt of a call."""
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self.hedges_won += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_rate": self.hedges_fired / self.calls if self.calls else 0.0,
+        }
@@ -1,20 +1,212 @@
-import ast
-from typing import Optional, Type
+import asyncio
+import contextvars
+import functools
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractAsyncContextManager, aclosing, nullcontext
+from itertools import chain
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Optional,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
-import instructor
-import litellm
-from litellm import supports_response_schema, acompletion, completion, aembedding, embedding
-from pydantic import BaseModel, SecretStr, ConfigDict, model_validator
+from pydantic import (
+    BaseModel,
+    SecretStr,
+    ConfigDict,
+    PrivateAttr,
+    TypeAdapter,
+    model_validator,
+)
 from typing_extensions import Self
 
 from tenacity import (
-    retry,
+    AsyncRetrying,
+    Retrying,
     stop_after_attempt,
-    wait_fixed,
+    wait_exponential,
     retry_if_exception_type,
 )
 
+from genai_template_backend.api.cache import ResponseCache, request_key
+from genai_template_backend.api.embedding_cache import EmbeddingCache
+from genai_template_backend.api.hedging import HedgingPolicy, hedged_deployments
+from genai_template_backend.api.accounting import usage_ledger
+from genai_template_backend.api.metrics import (
+    LLM_HEDGED_CALL_DURATION,
+    LLM_RATE_LIMITED,
+    LLM_RETRIES,
+    observe_llm_call,
+)
+from genai_template_backend.api.micro_batcher import EmbeddingMicroBatcher
+from genai_template_backend.api.rate_limit import (
+    NO_PROVIDER_RETRIES,
+    RateLimiter,
+    get_rate_limiter,
+)
+from genai_template_backend.api.semantic_cache import SemanticCache
+from genai_template_backend.api.single_flight import SingleFlight
+from genai_template_backend.api.structured_output import (
+    instructor_client,
+    parse_json_output,
+    response_format,
+)
 from genai_template_backend.backend_settings import logger
+from genai_template_backend.utils import instructor, litellm
+
+
+@functools.cache
+def _retryable_errors() -> tuple[type[Exception], ...]:
+    """Transient provider errors worth retrying."""
+    return (
+        litellm.exceptions.RateLimitError,
+        litellm.exceptions.APIConnectionError,
+        litellm.exceptions.Timeout,
+        litellm.exceptions.InternalServerError,
+        litellm.exceptions.ServiceUnavailableError,
+    )
+
+
+# litellm functions, resolved when called since litellm is imported lazily
+
+
+def supports_response_schema(model: str) -> bool:
+    return litellm.supports_response_schema(model)
+
+
+def completion(*args, **kwargs):
+    return litellm.completion(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+async def acompletion(*args, **kwargs):
+    return await litellm.acompletion(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+def embedding(*args, **kwargs):
+    return litellm.embedding(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+async def aembedding(*args, **kwargs):
+    return await litellm.aembedding(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate (about 4 characters per token), used to size requests."""
+    return len(text) // 4 + 1
+
+
+def _split_batches(texts: list[str], max_items: int, max_tokens: int) -> list[list[str]]:
+    """Group texts into consecutive batches within both the item and estimated token limits."""
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _dump_partial(value: Any) -> Any:
+    """Turn a complete item of a partial object back into plain data for validation."""
+    return value.model_dump(exclude_unset=True) if isinstance(value, BaseModel) else value
+
+
+def _list_item_type(schema: Type[BaseModel], field: str) -> Any:
+    """Item type of the list field ``field`` of ``schema``, which may be optional or annotated."""
+    annotation = schema.model_fields[field].annotation if field in schema.model_fields else None
+    while get_origin(annotation) in (Annotated, Union, types.UnionType):
+        if get_origin(annotation) is Annotated:
+            annotation = get_args(annotation)[0]
+            continue
+        members = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(members) != 1:
+            break
+        annotation = members[0]
+    if annotation is not list and get_origin(annotation) is not list:
+        raise ValueError(f"{field} is not a list field of {schema.__name__}")
+    return (get_args(annotation) or (Any,))[0]
+
+
+def _messages_text(messages: list) -> str:
+    """Flatten a conversation into the text embedded by the semantic cache."""
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+
+def _deadline(seconds: Optional[float]) -> Optional[float]:
+    """``time.monotonic()`` deadline of a call starting now, None without a limit."""
+    return time.monotonic() + seconds if seconds else None
+
+
+def _with_timeout(kwargs: dict, deadline: Optional[float]) -> dict:
+    """Provider call kwargs with a ``timeout`` ending by ``deadline``.
+
+    Raises:
+        TimeoutError: if the deadline has already passed.
+    """
+    if deadline is None:
+        return kwargs
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("The deadline of the call has passed")
+    timeout = kwargs.get("timeout")
+    return kwargs | {"timeout": min(timeout, remaining) if timeout else remaining}
+
+
+def _check_deadline(deadline: Optional[float]):
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError("The deadline of the call has passed")
+
+
+def _estimated_usage(messages: list, completion: str) -> Any:
+    """Usage of a call estimated from its text, for streams whose provider reports none."""
+    prompt_tokens = estimate_tokens(_messages_text(messages))
+    completion_tokens = estimate_tokens(completion)
+    return litellm.Usage(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+def _embedding_vector(data: Any) -> list[float]:
+    """Vector of an item of an embedding response, given as a dict or as an object."""
+    return data["embedding"] if isinstance(data, dict) else data.embedding
+
+
+def _record_call(
+    model: str,
+    operation: str,
+    seconds: float,
+    usage: Any = None,
+    outcome: str = "success",
+    time_to_first_token: Optional[float] = None,
+):
+    """Record a call to a provider in the metrics and in the usage accounting."""
+    observe_llm_call(model, operation, seconds, usage, outcome, time_to_first_token)
+    usage_ledger.record(model, operation, usage, outcome, seconds)
+
+
+class GenerationResult(BaseModel):
+    """Outcome of one request of a batch: its output, or the error that prevented it."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    output: Any = None
+    error: Optional[str] = None
+    total_tokens: int = 0  # set by a_generate_result, 0 when the output came from a cache
 
 
 class InferenceLLMConfig(BaseModel):
@@ -27,11 +219,30 @@ class InferenceLLMConfig(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     supports_response_schema: bool = False
+    # how instructor asks for structured outputs when the model has no response schema support
+    instructor_mode: str = "json_mode"  # an instructor.Mode value
 
     temperature: Optional[float] = None
     seed: int = 1729
     max_tokens: Optional[int] = None
 
+    # opt-in caches of generated outputs, shared by the sync and async generate paths
+    response_cache: Optional[ResponseCache] = None
+    semantic_cache: Optional[SemanticCache] = None
+
+    # identical concurrent async requests share a single provider call
+    single_flight: Optional[SingleFlight] = None
+
+    # slow async calls get a second attempt, the first one to succeed wins
+    hedging: Optional[HedgingPolicy] = None
+
+    # client-side rate limits, shared by every client of the same deployment
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_retries: int = 6  # on rate-limit errors
+    # a call fails once it would exceed it: rate-limit waits, retries and provider calls included
+    deadline_seconds: Optional[float] = None
+
     @model_validator(mode="after")
     def init_client(self) -> Self:
         litellm.drop_params = True
@@ -41,6 +252,41 @@ class InferenceLLMConfig(BaseModel):
     def load_model(self, prompt: str, schema: Optional[Type[BaseModel]] = None, *args, **kwargs):
         pass
 
+    def _cache_key(self, messages: list, schema: Optional[Type[BaseModel]], kwargs: dict) -> str:
+        return request_key(
+            self.model_name,
+            messages,
+            schema,
+            temperature=self.temperature,
+            seed=self.seed,
+            max_tokens=self.max_tokens,
+            **kwargs,
+        )
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return get_rate_limiter(
+            self.model_name, self.base_url, self.requests_per_minute, self.tokens_per_minute
+        )
+
+    def _estimate_request_tokens(self, messages: list) -> int:
+        return estimate_tokens(_messages_text(messages)) + (self.max_tokens or 0)
+
+    def _record_usage(self, estimated_tokens: int, usage: Any):
+        if usage is not None and usage.total_tokens:
+            self.rate_limiter.record_usage(estimated_tokens, usage.total_tokens)
+
+    def _observe_failure(self, start_time: float, outcome: str):
+        _record_call(
+            self.model_name, "completion", time.perf_counter() - start_time, outcome=outcome
+        )
+        if outcome == "rate_limited":
+            LLM_RATE_LIMITED.inc(model=self.model_name)
+
+    def _semantic_namespace(self, schema: Optional[Type[BaseModel]], kwargs: dict) -> str:
+        # everything that determines the answer but the messages, per-call options included
+        return self._cache_key([], schema, kwargs)
+
     async def a_generate(
         self,
         prompt: str,
@@ -54,11 +300,6 @@ class InferenceLLMConfig(BaseModel):
             messages=messages, schema=schema, raw_response=raw_response, *args, **kwargs
         )
 
-    @retry(
-        wait=wait_fixed(60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type((litellm.exceptions.RateLimitError)),
-    )
     async def a_generate_from_messages(
         self,
         messages: list,
@@ -67,53 +308,559 @@ class InferenceLLMConfig(BaseModel):
         *args,
         **kwargs,
     ):
+        try:
+            return await self._a_generate(messages, schema, raw_response, *args, **kwargs)
+        except Exception as e:
+            # the usage of the failed attempts was accounted as they failed
+            logger.error(f"Error in generating response from LLM: {e}")
+            return None
+
+    async def a_regenerate_from_messages(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        **kwargs,
+    ):
+        """Generate the response again without the caches, and replace the output they hold.
+
+        For outputs reported as wrong: the semantic cache hit that gave one is overridden with the
+        new output, which the cache counts in ``false_positive_overrides``.
+        """
+        try:
+            output, _ = await self._a_generate_with_completion(messages, schema, False, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in generating response from LLM: {e}")
+            return None
+        if self.response_cache is not None:
+            self.response_cache.set(self._cache_key(messages, schema, kwargs), output)
+        if self.semantic_cache is not None:
+            try:
+                await self.semantic_cache.a_override(
+                    _messages_text(messages), output, self._semantic_namespace(schema, kwargs)
+                )
+            except Exception as e:
+                logger.warning(f"Semantic cache override failed: {e}")
+        return output
+
+    async def a_generate_result(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """Generate the response of a conversation, with its error instead of raising it.
+
+        Unlike :meth:`a_generate_from_messages`, the error is kept, and so are the tokens used.
+        """
+        try:
+            output, raw_completion = await self._a_generate_with_completion(
+                messages, schema, **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Error in generating response from LLM: {e}")
+            return GenerationResult(error=f"{type(e).__name__}: {e}")
+        usage = getattr(raw_completion, "usage", None)
+        return GenerationResult(output=output, total_tokens=getattr(usage, "total_tokens", 0) or 0)
+
+    async def a_generate_many(
+        self,
+        messages_list: list[list],
+        schema: Optional[Type[BaseModel]] = None,
+        max_concurrency: int = 8,
+        raw_response: bool = False,
+        slot: Optional[Callable[[], AbstractAsyncContextManager]] = None,
+        **kwargs,
+    ) -> list[GenerationResult]:
+        """Generate the responses of several conversations concurrently.
+
+        At most ``max_concurrency`` requests are in flight at once, each of them within the
+        context returned by ``slot`` if given (e.g. an admission slot). Results are returned in the
+        order of ``messages_list``; a failed request gets its error instead of failing the batch.
+        """
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate(messages: list) -> GenerationResult:
+            async with semaphore:
+                try:
+                    async with slot() if slot is not None else nullcontext():
+                        output = await self._a_generate(messages, schema, raw_response, **kwargs)
+                except Exception as e:
+                    logger.error(f"Error in generating response from LLM: {e}")
+                    return GenerationResult(error=f"{type(e).__name__}: {e}")
+                return GenerationResult(output=output)
+
+        return await asyncio.gather(*(generate(messages) for messages in messages_list))
+
+    def generate_many(
+        self,
+        messages_list: list[list],
+        schema: Optional[Type[BaseModel]] = None,
+        max_concurrency: int = 8,
+        raw_response: bool = False,
+        **kwargs,
+    ) -> list[GenerationResult]:
+        """Synchronous wrapper of :meth:`a_generate_many`, for scripts and offline jobs.
+
+        It runs its own event loop, so it can't be called from a running one.
+        """
+        return asyncio.run(
+            self.a_generate_many(messages_list, schema, max_concurrency, raw_response, **kwargs)
+        )
+
+    async def _a_generate(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        raw_response: bool = False,
+        *args,
+        **kwargs,
+    ):
+        """Cached generation, raising the errors of the provider call."""
+        # raw completions carry per-call data (ids, usage), so only parsed outputs are cached
+        output, raw_completion = await self._a_generate_with_completion(
+            messages, schema, not raw_response, *args, **kwargs
+        )
+        if raw_response:
+            return raw_completion
+        return output
+
+    async def _a_generate_with_completion(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        use_caches: bool = True,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Output and raw completion of a cached generation.
+
+        The completion is None on cache hits and for callers joining an identical call in flight,
+        so that the usage of a provider call is only reported to the caller that made it.
+        """
+        cache_key = None
+        if self.response_cache is not None and use_caches and not args:
+            cache_key = self._cache_key(messages, schema, kwargs)
+            cached_output = self.response_cache.get(cache_key)
+            if cached_output is not None:
+                return cached_output, None
+
+        semantic_vector = None
+        if self.semantic_cache is not None and use_caches and not args:
+            try:
+                cached_output, semantic_vector = await self.semantic_cache.a_get(
+                    _messages_text(messages), self._semantic_namespace(schema, kwargs)
+                )
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
+            else:
+                if cached_output is not None:
+                    return cached_output, None
+
+        # a call without caches (a regeneration) must not join a call that may give the old output
+        if self.single_flight is not None and use_caches and not args:
+            (output, raw_completion), shared = await self.single_flight.do_shared(
+                cache_key or self._cache_key(messages, schema, kwargs),
+                lambda: self._a_complete_hedged(messages, schema, **kwargs),
+            )
+            if shared:
+                raw_completion = None
+            # the output may be shared with other callers
+            if isinstance(output, BaseModel):
+                output = output.model_copy(deep=True)
+        else:
+            output, raw_completion = await self._a_complete_hedged(
+                messages, schema, *args, **kwargs
+            )
+
+        if cache_key is not None:
+            self.response_cache.set(cache_key, output)
+        if semantic_vector is not None:
+            self.semantic_cache.add(
+                semantic_vector, output, self._semantic_namespace(schema, kwargs)
+            )
+        return output, raw_completion
+
+    async def _a_complete_hedged(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """:meth:`_a_complete`, hedged by a second attempt when slow if ``hedging`` is set."""
+        if self.hedging is None:
+            return await self._a_complete(messages, schema, *args, **kwargs)
+
+        async def attempt(hedge: bool):
+            start_time = time.monotonic()
+            result = await self._a_complete(messages, schema, *args, **kwargs)
+            return result, time.monotonic() - start_time, hedge
+
+        busy_deployments = set()
+        started: dict[asyncio.Task, float] = {}
+
+        def start(hedge: bool) -> asyncio.Task:
+            context = contextvars.copy_context()
+            context.run(hedged_deployments.set, busy_deployments)
+            task = asyncio.get_running_loop().create_task(attempt(hedge), context=context)
+            started[task] = time.monotonic()
+            return task
+
+        def observe(hedged: bool, winner: str):
+            LLM_HEDGED_CALL_DURATION.observe(
+                time.perf_counter() - start_time,
+                model=self.model_name,
+                hedged=str(hedged).lower(),
+                winner=winner,
+            )
+
+        start_time = time.perf_counter()
+        delay = self.hedging.delay()
+        pending = {start(hedge=False)}
+        hedged = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.hedging.try_fire():
+                    logger.debug(f"No response from {self.model_name} after {delay:.2f}s, hedging")
+                    pending.add(start(hedge=True))
+                    hedged = True
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result, latency, hedge = task.result()
+                        self.hedging.record(latency, hedge_won=hedge)
+                        # the attempts still running took at least this long: sampling only the
+                        # winners would drag the hedge delay down, and the hedge rate up
+                        for loser in pending:
+                            self.hedging.record(time.monotonic() - started[loser])
+                        observe(hedged, "hedge" if hedge else "first")
+                        if hedge:
+                            logger.debug(f"Hedged request to {self.model_name} won")
+                        return result
+                    error = task.exception()
+            observe(hedged, "none")
+            raise error
+        finally:
+            # the losing attempt is cancelled, and waited for so that it releases its resources
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _a_complete(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Call the model and return the parsed output together with the raw completion.
+
+        Calls wait for capacity on the deployment's rate limiter, and rate-limited calls are
+        retried up to ``max_retries`` times, as long as ``deadline_seconds`` isn't exceeded.
+        """
+        deadline = _deadline(self.deadline_seconds)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(estimated_tokens, deadline)
+            start_time = time.perf_counter()
+            try:
+                output, raw_completion = await self._a_call(
+                    messages, schema, *args, **_with_timeout(kwargs, deadline)
+                )
+            except litellm.exceptions.RateLimitError as e:
+                self._observe_failure(start_time, "rate_limited")
+                delay = self.rate_limiter.backoff(e, attempt)
+                if attempt == self.max_retries or (
+                    deadline is not None and time.monotonic() + delay > deadline
+                ):
+                    raise
+                logger.warning(f"Rate limited by {self.model_name}, retrying in {delay:.2f}s")
+                LLM_RETRIES.inc(model=self.model_name, operation="completion")
+                await asyncio.sleep(delay)
+            except Exception:
+                self._observe_failure(start_time, "error")
+                raise
+            else:
+                _record_call(
+                    self.model_name,
+                    "completion",
+                    time.perf_counter() - start_time,
+                    getattr(raw_completion, "usage", None),
+                )
+                self._record_usage(estimated_tokens, getattr(raw_completion, "usage", None))
+                return output, raw_completion
+
+    async def _a_call(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Single call to the model, without rate limiting nor retries."""
         # check if model supports structured output
         if schema:
             if self.supports_response_schema:
-                res = await litellm.acompletion(
+                res = await acompletion(
                     model=self.model_name,
                     api_key=self.api_key.get_secret_value(),
                     base_url=self.base_url,
                     messages=messages,
-                    response_format=schema,
+                    response_format=response_format(schema),
                     api_version=self.api_version,
+                    *args,
+                    **kwargs,
                 )
                 if res.choices[0].finish_reason == "content_filter":
                     raise ValueError(f"Response filtred by content filter")
-                else:
-                    dict_res = ast.literal_eval(res.choices[0].message.content)
+                return parse_json_output(schema, res.choices[0].message.content), res
 
-                    if raw_response:
-                        return res
-                    return schema(**dict_res)
+            client = instructor_client(self.instructor_mode, use_async=True)
+            return await client.chat.completions.create_with_completion(
+                model=self.model_name,
+                api_key=self.api_key.get_secret_value(),
+                base_url=self.base_url,
+                messages=messages,
+                response_model=schema,
+                api_version=self.api_version,
+                *args,
+                **kwargs,
+            )
 
-            else:
-                client = instructor.from_litellm(acompletion, mode=instructor.Mode.JSON)
-                output, raw_completion = await client.chat.completions.create_with_completion(
-                    model=self.model_name,
-                    api_key=self.api_key.get_secret_value(),
-                    base_url=self.base_url,
-                    messages=messages,
-                    response_model=schema,
-                    api_version=self.api_version,
-                )
+        res = await acompletion(
+            model=self.model_name,
+            api_key=self.api_key.get_secret_value(),
+            base_url=self.base_url,
+            messages=messages,
+            api_version=self.api_version,
+            *args,
+            **kwargs,
+        )
+        return res.choices[0].message.content, res
+
+    async def a_stream_from_messages(
+        self,
+        messages: list,
+        raw_response: bool = False,
+        *args,
+        **kwargs,
+    ) -> AsyncIterator:
+        """Yield the completion as it is generated.
 
+        Text deltas are yielded by default. With ``raw_response=True`` every litellm chunk is
+        forwarded untouched, including the final chunk carrying the token usage.
+        """
+        deadline = _deadline(self.deadline_seconds)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        await self.rate_limiter.acquire(estimated_tokens, deadline)
+        start_time = time.perf_counter()
+        time_to_first_token, usage, contents = None, None, []
+        try:
+            response = await acompletion(
+                model=self.model_name,
+                api_key=self.api_key.get_secret_value(),
+                base_url=self.base_url,
+                messages=messages,
+                api_version=self.api_version,
+                stream=True,
+                stream_options={"include_usage": True},
+                *args,
+                **_with_timeout(kwargs, deadline),
+            )
+            async for chunk in response:
+                _check_deadline(deadline)
+                usage = getattr(chunk, "usage", None) or usage
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    contents.append(content)
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start_time
                 if raw_response:
-                    return raw_completion
-                return output
+                    yield chunk
+                elif content:
+                    yield content
+        except BaseException as e:
+            # streams closed early by the caller are accounted too, they used tokens
+            _record_call(
+                self.model_name,
+                "stream",
+                time.perf_counter() - start_time,
+                outcome="error" if isinstance(e, Exception) else "cancelled",
+                time_to_first_token=time_to_first_token,
+            )
+            raise
+        usage = usage or _estimated_usage(messages, "".join(contents))
+        _record_call(
+            self.model_name,
+            "stream",
+            time.perf_counter() - start_time,
+            usage,
+            time_to_first_token=time_to_first_token,
+        )
+        self._record_usage(estimated_tokens, usage)
 
-        else:
-            res = await litellm.acompletion(
+    def stream_from_messages(
+        self,
+        messages: list,
+        raw_response: bool = False,
+        *args,
+        **kwargs,
+    ) -> Iterator:
+        """Synchronous counterpart of :meth:`a_stream_from_messages`."""
+        deadline = _deadline(self.deadline_seconds)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        self.rate_limiter.acquire_sync(estimated_tokens, deadline)
+        start_time = time.perf_counter()
+        time_to_first_token, usage, contents = None, None, []
+        try:
+            response = completion(
+                model=self.model_name,
+                api_key=self.api_key.get_secret_value(),
+                base_url=self.base_url,
+                messages=messages,
+                api_version=self.api_version,
+                stream=True,
+                stream_options={"include_usage": True},
+                *args,
+                **_with_timeout(kwargs, deadline),
+            )
+            for chunk in response:
+                _check_deadline(deadline)
+                usage = getattr(chunk, "usage", None) or usage
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    contents.append(content)
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start_time
+                if raw_response:
+                    yield chunk
+                elif content:
+                    yield content
+        except BaseException as e:
+            # streams closed early by the caller are accounted too, they used tokens
+            _record_call(
+                self.model_name,
+                "stream",
+                time.perf_counter() - start_time,
+                outcome="error" if isinstance(e, Exception) else "cancelled",
+                time_to_first_token=time_to_first_token,
+            )
+            raise
+        usage = usage or _estimated_usage(messages, "".join(contents))
+        _record_call(
+            self.model_name,
+            "stream",
+            time.perf_counter() - start_time,
+            usage,
+            time_to_first_token=time_to_first_token,
+        )
+        self._record_usage(estimated_tokens, usage)
+
+    async def a_stream_structured(
+        self,
+        messages: list,
+        schema: Type[BaseModel],
+        *args,
+        **kwargs,
+    ) -> AsyncIterator[BaseModel]:
+        """Yield partial objects of ``schema`` as the structured response is generated.
+
+        Each partial object is a ``schema`` whose fields are all optional, filled in as tokens
+        arrive (the last string of a partial object may be cut). The last one holds the whole
+        response, validated against ``schema``.
+        """
+        if self.supports_response_schema:
+            deltas = self.a_stream_from_messages(
+                messages, False, *args, response_format=response_format(schema), **kwargs
+            )
+            # closed right away if the caller stops reading, so that the call is accounted
+            async with aclosing(deltas):
+                async for partial in instructor.Partial[schema].model_from_chunks_async(deltas):
+                    yield partial
+            return
+
+        async with aclosing(self._a_stream_partials(messages, schema, *args, **kwargs)) as stream:
+            async for partial in stream:
+                yield partial
+
+    async def _a_stream_partials(
+        self,
+        messages: list,
+        schema: Type[BaseModel],
+        *args,
+        **kwargs,
+    ) -> AsyncIterator[BaseModel]:
+        """Partial objects of ``schema`` streamed by instructor, for models without response schema."""
+        deadline = _deadline(self.deadline_seconds)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        await self.rate_limiter.acquire(estimated_tokens, deadline)
+        client = instructor_client(self.instructor_mode, use_async=True)
+        start_time = time.perf_counter()
+        time_to_first_token, partial = None, None
+        try:
+            async for partial in client.chat.completions.create_partial(
                 model=self.model_name,
                 api_key=self.api_key.get_secret_value(),
                 base_url=self.base_url,
                 messages=messages,
+                response_model=schema,
                 api_version=self.api_version,
+                *args,
+                **_with_timeout(kwargs, deadline),
+            ):
+                _check_deadline(deadline)
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                yield partial
+        except BaseException as e:
+            _record_call(
+                self.model_name,
+                "stream",
+                time.perf_counter() - start_time,
+                outcome="error" if isinstance(e, Exception) else "cancelled",
+                time_to_first_token=time_to_first_token,
             )
+            raise
+        # instructor doesn't pass the usage chunk on, so it is estimated from the final object
+        usage = _estimated_usage(messages, partial.model_dump_json() if partial else "")
+        _record_call(
+            self.model_name,
+            "stream",
+            time.perf_counter() - start_time,
+            usage,
+            time_to_first_token=time_to_first_token,
+        )
+        self._record_usage(estimated_tokens, usage)
 
-            if raw_response:
-                return res
-            return res.choices[0].message.content
+    async def a_stream_structured_items(
+        self,
+        messages: list,
+        schema: Type[BaseModel],
+        field: str,
+        *args,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """Yield the items of the list field ``field`` of ``schema`` one by one, once complete.
+
+        An item is complete as soon as the model starts generating the next one, so downstream
+        processing can start with the first items while the rest is still being generated. Items
+        are validated against the item type of the field.
+        """
+        item_adapter = TypeAdapter(_list_item_type(schema, field))
+        items, emitted = [], 0
+        async for partial in self.a_stream_structured(messages, schema, *args, **kwargs):
+            items = getattr(partial, field) or []
+            while emitted < len(items) - 1:
+                yield item_adapter.validate_python(_dump_partial(items[emitted]))
+                emitted += 1
+        for item in items[emitted:]:
+            yield item_adapter.validate_python(_dump_partial(item))
 
     def generate(
         self,
@@ -128,11 +875,6 @@ class InferenceLLMConfig(BaseModel):
             messages=messages, schema=schema, raw_response=raw_response, *args, **kwargs
         )
 
-    @retry(
-        wait=wait_fixed(60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type((litellm.exceptions.RateLimitError)),
-    )
     def generate_from_messages(
         self,
         messages: list,
@@ -141,62 +883,130 @@ class InferenceLLMConfig(BaseModel):
         *args,
         **kwargs,
     ):
+        # raw completions carry per-call data (ids, usage), so only parsed outputs are cached
+        cache_key = None
+        if self.response_cache is not None and not raw_response and not args:
+            cache_key = self._cache_key(messages, schema, kwargs)
+            cached_output = self.response_cache.get(cache_key)
+            if cached_output is not None:
+                return cached_output
+
+        semantic_vector = None
+        if self.semantic_cache is not None and not raw_response and not args:
+            try:
+                cached_output, semantic_vector = self.semantic_cache.get(
+                    _messages_text(messages), self._semantic_namespace(schema, kwargs)
+                )
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
+            else:
+                if cached_output is not None:
+                    return cached_output
+
         try:
-            # check if model supports structured output
-            if schema:
-                if self.supports_response_schema:
-                    res = litellm.completion(
-                        model=self.model_name,
-                        api_key=self.api_key.get_secret_value(),
-                        base_url=self.base_url,
-                        messages=messages,
-                        response_format=schema,
-                        api_version=self.api_version,
-                        *args,
-                        **kwargs,
-                    )
-                    if res.choices[0].finish_reason == "content_filter":
-                        raise ValueError(f"Response filtred by content filter")
-                    else:
-                        dict_res = ast.literal_eval(res.choices[0].message.content)
-
-                        if raw_response:
-                            return res
-                        return schema(**dict_res)
-
-                else:
-                    client = instructor.from_litellm(completion, mode=instructor.Mode.JSON)
-                    res, raw_completion = client.chat.completions.create_with_completion(
-                        model=self.model_name,
-                        api_key=self.api_key.get_secret_value(),
-                        base_url=self.base_url,
-                        messages=messages,
-                        response_model=schema,
-                        api_version=self.api_version,
-                        *args,
-                        **kwargs,
-                    )
-
-                    if raw_response:
-                        return raw_completion
-                    return res
+            output, raw_completion = self._complete(messages, schema, *args, **kwargs)
+        except Exception as e:
+            # the usage of the failed attempts was accounted as they failed
+            logger.error(f"Error in generating response from LLM: {e}")
+            return None
+
+        if cache_key is not None:
+            self.response_cache.set(cache_key, output)
+        if semantic_vector is not None:
+            self.semantic_cache.add(
+                semantic_vector, output, self._semantic_namespace(schema, kwargs)
+            )
+        if raw_response:
+            return raw_completion
+        return output
+
+    def _complete(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Synchronous counterpart of :meth:`_a_complete`."""
+        deadline = _deadline(self.deadline_seconds)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire_sync(estimated_tokens, deadline)
+            start_time = time.perf_counter()
+            try:
+                output, raw_completion = self._call(
+                    messages, schema, *args, **_with_timeout(kwargs, deadline)
+                )
+            except litellm.exceptions.RateLimitError as e:
+                self._observe_failure(start_time, "rate_limited")
+                delay = self.rate_limiter.backoff(e, attempt)
+                if attempt == self.max_retries or (
+                    deadline is not None and time.monotonic() + delay > deadline
+                ):
+                    raise
+                logger.warning(f"Rate limited by {self.model_name}, retrying in {delay:.2f}s")
+                LLM_RETRIES.inc(model=self.model_name, operation="completion")
+                time.sleep(delay)
+            except Exception:
+                self._observe_failure(start_time, "error")
+                raise
             else:
-                res = litellm.completion(
+                _record_call(
+                    self.model_name,
+                    "completion",
+                    time.perf_counter() - start_time,
+                    getattr(raw_completion, "usage", None),
+                )
+                self._record_usage(estimated_tokens, getattr(raw_completion, "usage", None))
+                return output, raw_completion
+
+    def _call(
+        self,
+        messages: list,
+        schema: Optional[Type[BaseModel]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[Any, Any]:
+        """Synchronous counterpart of :meth:`_a_call`."""
+        # check if model supports structured output
+        if schema:
+            if self.supports_response_schema:
+                res = completion(
                     model=self.model_name,
                     api_key=self.api_key.get_secret_value(),
                     base_url=self.base_url,
                     messages=messages,
+                    response_format=response_format(schema),
                     api_version=self.api_version,
                     *args,
                     **kwargs,
                 )
-                if raw_response:
-                    return res
-                return res.choices[0].message.content
-        except Exception as e:
-            # todo handle cost if exception
-            logger.error(f"Error in generating response from LLM: {e}")
-            return None
+                if res.choices[0].finish_reason == "content_filter":
+                    raise ValueError(f"Response filtred by content filter")
+                return parse_json_output(schema, res.choices[0].message.content), res
+
+            client = instructor_client(self.instructor_mode, use_async=False)
+            return client.chat.completions.create_with_completion(
+                model=self.model_name,
+                api_key=self.api_key.get_secret_value(),
+                base_url=self.base_url,
+                messages=messages,
+                response_model=schema,
+                api_version=self.api_version,
+                *args,
+                **kwargs,
+            )
+
+        res = completion(
+            model=self.model_name,
+            api_key=self.api_key.get_secret_value(),
+            base_url=self.base_url,
+            messages=messages,
+            api_version=self.api_version,
+            *args,
+            **kwargs,
+        )
+        return res.choices[0].message.content, res
 
 
 class EmbeddingLLMConfig(InferenceLLMConfig):
@@ -208,44 +1018,175 @@ class EmbeddingLLMConfig(InferenceLLMConfig):
     api_version: str = "2024-12-01-preview"  # used only if model is from azure openai
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    # opt-in persistent cache, only texts missing from it are sent to the provider
+    embedding_cache: Optional[EmbeddingCache] = None
+
+    # embed_texts splits its inputs into batches that fit the provider limits
+    embedding_batch_size: int = 256
+    embedding_batch_max_tokens: int = 100_000
+    embedding_max_concurrency: int = 4
+    embedding_batch_retries: int = 3
+
+    # a_embed_text calls made concurrently are coalesced into batched provider calls
+    micro_batching: bool = False
+    micro_batch_max_size: int = 64
+    micro_batch_max_wait_ms: float = 5.0
+    _micro_batcher: Optional[EmbeddingMicroBatcher] = PrivateAttr(default=None)
+    _micro_batcher_loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+
     def load_model(self, prompt: str, schema: Optional[Type[BaseModel]] = None, *args, **kwargs):
         pass
 
     def embed_text(self, text: str) -> list[float]:
+        if self.embedding_cache is not None:
+            return self.embed_texts([text])[0]
+        start_time = time.perf_counter()
         response = embedding(
             model=self.model_name,
             api_base=self.base_url,
             api_key=self.api_key.get_secret_value(),
             input=[text],
         )
-        return response.data[0]["embedding"]
+        self._observe_embedding(start_time, response)
+        return _embedding_vector(response.data[0])
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        response = embedding(
-            model=self.model_name,
-            api_base=self.base_url,
-            api_key=self.api_key.get_secret_value(),
-            input=texts,
+        if self.embedding_cache is None:
+            return self._embed_texts(texts)
+
+        text_hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = self.embedding_cache.get_many(self.model_name, text_hashes)
+        missing = {h: text for h, text in zip(text_hashes, texts) if h not in vectors}
+        if missing:
+            fresh = dict(zip(missing, self._embed_texts(list(missing.values()))))
+            self.embedding_cache.put_many(self.model_name, fresh)
+            vectors.update(fresh)
+        return [vectors[h] for h in text_hashes]
+
+    def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed the texts in provider-sized batches dispatched concurrently from threads."""
+        unique_texts = list(dict.fromkeys(texts))
+        batches = _split_batches(
+            unique_texts, self.embedding_batch_size, self.embedding_batch_max_tokens
         )
-        return [data.embedding for data in response.data]
+        if len(batches) <= 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            max_workers = min(self.embedding_max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+
+        vectors = dict(zip(unique_texts, chain.from_iterable(results)))
+        return [vectors[text] for text in texts]
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.embedding_batch_retries),
+            wait=wait_exponential(multiplier=1, max=30),
+            retry=retry_if_exception_type(_retryable_errors()),
+            before_sleep=self._count_embedding_retry,
+            reraise=True,
+        ):
+            with attempt:
+                start_time = time.perf_counter()
+                response = embedding(
+                    model=self.model_name,
+                    api_base=self.base_url,
+                    api_key=self.api_key.get_secret_value(),
+                    input=texts,
+                )
+                self._observe_embedding(start_time, response)
+        return [_embedding_vector(data) for data in response.data]
+
+    @property
+    def micro_batcher(self) -> EmbeddingMicroBatcher:
+        """The micro-batcher of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._micro_batcher is None or self._micro_batcher_loop is not loop:
+            self._micro_batcher = EmbeddingMicroBatcher(
+                self.a_embed_texts,
+                max_batch_size=self.micro_batch_max_size,
+                max_wait_ms=self.micro_batch_max_wait_ms,
+            )
+            self._micro_batcher_loop = loop
+        return self._micro_batcher
 
     async def a_embed_text(self, text: str) -> list[float]:
+        if self.micro_batching:
+            return await self.micro_batcher.submit(text)
+        if self.embedding_cache is not None:
+            return (await self.a_embed_texts([text]))[0]
+        start_time = time.perf_counter()
         response = await aembedding(
             model=self.model_name,
             api_base=self.base_url,
             api_key=self.api_key.get_secret_value(),
             input=[text],
         )
-        return response.data[0]["embedding"]
+        self._observe_embedding(start_time, response)
+        return _embedding_vector(response.data[0])
 
     async def a_embed_texts(self, texts: list[str]) -> list[list[float]]:
-        response = await aembedding(
-            model=self.model_name,
-            api_base=self.base_url,
-            api_key=self.api_key.get_secret_value(),
-            input=texts,
+        if self.embedding_cache is None:
+            return await self._a_embed_texts(texts)
+
+        text_hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = await asyncio.to_thread(
+            self.embedding_cache.get_many, self.model_name, text_hashes
         )
-        return [data.embedding for data in response.data]
+        missing = {h: text for h, text in zip(text_hashes, texts) if h not in vectors}
+        if missing:
+            fresh = dict(zip(missing, await self._a_embed_texts(list(missing.values()))))
+            await asyncio.to_thread(self.embedding_cache.put_many, self.model_name, fresh)
+            vectors.update(fresh)
+        return [vectors[h] for h in text_hashes]
+
+    async def _a_embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed the texts in provider-sized batches, at most ``embedding_max_concurrency`` at once."""
+        unique_texts = list(dict.fromkeys(texts))
+        batches = _split_batches(
+            unique_texts, self.embedding_batch_size, self.embedding_batch_max_tokens
+        )
+        semaphore = asyncio.Semaphore(self.embedding_max_concurrency)
+
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                return await self._a_embed_batch(batch)
+
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+        vectors = dict(zip(unique_texts, chain.from_iterable(results)))
+        return [vectors[text] for text in texts]
+
+    async def _a_embed_batch(self, texts: list[str]) -> list[list[float]]:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.embedding_batch_retries),
+            wait=wait_exponential(multiplier=1, max=30),
+            retry=retry_if_exception_type(_retryable_errors()),
+            before_sleep=self._count_embedding_retry,
+            reraise=True,
+        ):
+            with attempt:
+                start_time = time.perf_counter()
+                response = await aembedding(
+                    model=self.model_name,
+                    api_base=self.base_url,
+                    api_key=self.api_key.get_secret_value(),
+                    input=texts,
+                )
+                self._observe_embedding(start_time, response)
+        return [_embedding_vector(data) for data in response.data]
+
+    def _observe_embedding(self, start_time: float, response: Any):
+        _record_call(
+            self.model_name,
+            "embedding",
+            time.perf_counter() - start_time,
+            getattr(response, "usage", None),
+        )
+
+    def _count_embedding_retry(self, retry_state):
+        LLM_RETRIES.inc(model=self.model_name, operation="embedding")
 
     def get_model_name(self):
         return self.model_name
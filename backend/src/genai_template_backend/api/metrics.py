@@ -0,0 +1,329 @@
+"""Prometheus-style metrics, cheap enough to record on the hot path.
+
+Metrics are kept in memory and rendered in the Prometheus text format by ``/metrics``. Recording
+a value is a dict lookup and a few additions under an uncontended lock, i.e. around a
+microsecond. Statistics that components already keep (cache hits, queue depths...) are not
+recorded twice: collectors read them when the metrics are scraped.
+"""
+
+import abc
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+# latency buckets in seconds, from fast cache hits to long generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """Name, labels and value of each line of the metric."""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, counted in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, total
+
+
+class MetricsRegistry:
+    """Set of metrics and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, tuple(labelnames)))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, tuple(labelnames)))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=None) -> Histogram:
+        return self.register(
+            Histogram(name, documentation, tuple(labelnames), buckets or LATENCY_BUCKETS)
+        )
+
+    def register_collector(self, name: str, collect: Callable[[], dict[str, Any]]):
+        """Expose the numeric values of ``collect()`` as ``genai_<name>_<key>`` gauges.
+
+        ``collect`` is called on each scrape. Registering a collector under an existing name
+        replaces it, so components rebuilt at startup don't pile up.
+        """
+        self._collectors[name] = collect
+
+    def unregister_collector(self, name: str):
+        self._collectors.pop(name, None)
+
+    def _collected(self) -> list[str]:
+        lines = []
+        for prefix, collect in list(self._collectors.items()):
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in _flatten(values):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = _metric_name(f"genai_{prefix}_{key}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        lines.extend(self._collected())
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(values: dict, prefix: str = "") -> Iterable[tuple[str, Any]]:
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests, until the last byte of the response.",
+    ("method", "route", "status"),
+)
+LLM_REQUEST_DURATION = REGISTRY.histogram(
+    "llm_request_duration_seconds",
+    "Duration of the calls to LLM providers.",
+    ("model", "operation", "outcome"),
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time to the first token of streamed completions.",
+    ("model",),
+)
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_completion_tokens_per_second",
+    "Completion tokens generated per second by each call.",
+    ("model",),
+    THROUGHPUT_BUCKETS,
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "llm_prompt_tokens", "Prompt tokens sent to LLM providers.", ("model", "operation")
+)
+LLM_COMPLETION_TOKENS = REGISTRY.counter(
+    "llm_completion_tokens", "Completion tokens received from LLM providers.", ("model",)
+)
+LLM_HEDGED_CALL_DURATION = REGISTRY.histogram(
+    "llm_hedged_call_duration_seconds",
+    "Duration of the calls made with hedging, by whether a hedge was sent and which attempt won.",
+    ("model", "hedged", "winner"),
+)
+LLM_RETRIES = REGISTRY.counter("llm_retries", "Retried LLM calls.", ("model", "operation"))
+LLM_RATE_LIMITED = REGISTRY.counter(
+    "llm_rate_limited", "LLM calls rejected with a rate-limit error.", ("model",)
+)
+
+
+def observe_llm_call(
+    model: str,
+    operation: str,
+    seconds: float,
+    usage: Any = None,
+    outcome: str = "success",
+    time_to_first_token: Optional[float] = None,
+):
+    """Record a call to a provider, with the token usage of its response when known."""
+    LLM_REQUEST_DURATION.observe(seconds, model=model, operation=operation, outcome=outcome)
+    if time_to_first_token is not None:
+        LLM_TIME_TO_FIRST_TOKEN.observe(time_to_first_token, model=model)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    if prompt_tokens:
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, model=model, operation=operation)
+    if completion_tokens:
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, model=model)
+        generation_seconds = seconds - (time_to_first_token or 0.0)
+        if generation_seconds > 0:
+            LLM_TOKENS_PER_SECOND.observe(completion_tokens / generation_seconds, model=model)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the duration of every HTTP request.
+
+    Requests are labelled with their route template (``/api/chat``, not the actual path) to
+    keep the number of series bounded. Streamed responses are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
@@ -0,0 +1,86 @@
+"""Micro-batching of concurrent single-text embedding requests."""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+class EmbeddingMicroBatcher:
+    """Coalesces concurrent single-text embedding requests into batched provider calls.
+
+    Texts submitted while a batch is open are collected for at most ``max_wait_ms``, or until
+    ``max_batch_size`` texts are waiting, then embedded with a single call. Each caller gets back
+    the vector of its own text, or the exception raised by the batch call.
+
+    A batcher belongs to the event loop it is first used from.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # callers cancelled while waiting don't need a vector anymore
+        pending = [(text, future) for text, future in self._pending if not future.done()]
+        self._pending = []
+        if not pending:
+            return
+
+        self.batches += 1
+        self.items += len(pending)
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)  # keep a reference until the batch is done
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: list[tuple[str, asyncio.Future]]):
+        try:
+            vectors = await self._embed_batch([text for text, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(pending, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    @property
+    def fill_ratio(self) -> float:
+        """Average batch size relative to ``max_batch_size``."""
+        return self.items / (self.batches * self.max_batch_size) if self.batches else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "max_batch_size": self.max_batch_size,
+            "fill_ratio": self.fill_ratio,
+        }
@@ -0,0 +1,206 @@
+"""Client-side rate limiting shared by the LLM clients of a provider deployment."""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# OpenAI style reset durations, e.g. "1s", "6m0s", "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# provider calls are retried by the callers, which wait on the rate limiter and stop at their
+# deadline, so neither litellm (num_retries) nor the provider SDK (max_retries) may retry below
+NO_PROVIDER_RETRIES = {"num_retries": 0, "max_retries": 0}
+
+
+class RateLimitTimeout(Exception):
+    """Raised when waiting for rate-limit capacity would exceed the caller's deadline."""
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read how long the provider asks to wait from the headers of a rate-limit error."""
+    headers = getattr(error, "litellm_response_headers", None) or getattr(error, "headers", None)
+    if not headers and getattr(error, "response", None) is not None:
+        headers = getattr(error.response, "headers", None)
+    if not headers:
+        return None
+    headers = {key.lower(): value for key, value in dict(headers).items()}
+
+    if "retry-after-ms" in headers:
+        delay = _parse_duration(headers["retry-after-ms"])
+        return max(delay / 1000, 0.0) if delay is not None else None
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if name in headers:
+            delay = _parse_duration(headers[name])
+            if delay is not None:
+                return max(delay, 0.0)
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously, on which capacity is reserved ahead of time.
+
+    A reservation always succeeds but may leave the bucket in debt: the returned delay is how
+    long the caller has to wait before the reserved capacity is actually available.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.refill_per_second
+        )
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return -self.tokens / self.refill_per_second if self.tokens < 0 else 0.0
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, plus the provider's own throttling.
+
+    Callers reserve capacity before each call and wait until it's available, so the request rate
+    stays close to the quota instead of alternating between bursts and long stalls. When the
+    provider still answers 429, :meth:`backoff` honors its ``Retry-After`` / rate-limit reset
+    headers by pausing every caller of the deployment, and falls back to exponential backoff with
+    full jitter when there is no such header.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self._requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute
+            else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        )
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    def _reserve(self, tokens: int, deadline: Optional[float]) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self._blocked_until - now, 0.0)
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+
+            if deadline is not None and now + delay > deadline:
+                if self._requests is not None:
+                    self._requests.refund(1)
+                if self._tokens is not None:
+                    self._tokens.refund(tokens)
+                raise RateLimitTimeout(f"Rate limit capacity available in {delay:.1f}s only.")
+            self.throttled_seconds += delay
+            return delay
+
+    async def acquire(self, tokens: int = 0, deadline: Optional[float] = None):
+        """Wait until a request of ``tokens`` tokens may be sent.
+
+        Raises:
+            RateLimitTimeout: if the wait would end after ``deadline`` (a ``time.monotonic()``
+                timestamp). Nothing is reserved in that case.
+        """
+        delay = self._reserve(tokens, deadline)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 0, deadline: Optional[float] = None):
+        """Blocking counterpart of :meth:`acquire`."""
+        delay = self._reserve(tokens, deadline)
+        if delay:
+            time.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        if self._tokens is None:
+            return
+        with self._lock:
+            self._tokens.tokens -= actual_tokens - estimated_tokens
+
+    def backoff(self, error: Exception, attempt: int) -> float:
+        """Return how long to wait before retrying a call rejected with a rate-limit error."""
+        retry_after = retry_after_seconds(error)
+        with self._lock:
+            self.rate_limited += 1
+            if retry_after is None:
+                return random.uniform(0, min(self.max_backoff, self.base_backoff * 2**attempt))
+            # the provider's hint applies to every caller of the deployment
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            return retry_after
+
+    def stats(self) -> dict:
+        return {"rate_limited": self.rate_limited, "throttled_seconds": self.throttled_seconds}
+
+
+_rate_limiters: dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    model_name: str,
+    base_url: str,
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+) -> RateLimiter:
+    """Return the limiter shared by every client of the deployment, creating it if needed.
+
+    Deployments are identified by provider, base URL and model, so clients of the same deployment
+    share its quota. The limits given when the limiter is first created are the ones that apply.
+    """
+    provider = model_name.split("/")[0] if "/" in model_name else "openai"
+    key = f"{provider}|{base_url}|{model_name}"
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _rate_limiters[key] = limiter
+        return limiter
+
+
+def rate_limiter_stats() -> dict:
+    """Statistics of every deployment's limiter, keyed like the limiters."""
+    with _rate_limiters_lock:
+        limiters = list(_rate_limiters.items())
+    return {key: limiter.stats() for key, limiter in limiters}
@@ -1,8 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import json
+import time
 
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+from genai_template_backend.api.accounting import current_session_id
+from genai_template_backend.api.admission import AdmissionController, AdmissionRejected
+from genai_template_backend.api.clients import get_inference_llm
+from genai_template_backend.api.conversations import conversation_store
 from genai_template_backend.api.llm import InferenceLLMConfig
-from genai_template_backend.backend_settings import settings
+from genai_template_backend.api.metrics import REGISTRY
+from genai_template_backend.backend_settings import logger, settings
+
+# bounds the number of generations running at once in this process
+admission = AdmissionController(
+    max_concurrent=settings.CHAT_MAX_CONCURRENT_GENERATIONS,
+    max_queue_size=settings.CHAT_MAX_QUEUE_SIZE,
+    max_queue_seconds=settings.CHAT_MAX_QUEUE_SECONDS,
+)
+REGISTRY.register_collector("chat_admission", admission.stats)
+REGISTRY.register_collector("chat_conversations", conversation_store.stats)
+
+
+async def admit_generation():
+    """Hold a generation slot for the duration of the request (streamed responses included)."""
+    try:
+        await admission.acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    start_time = time.monotonic()
+    try:
+        yield
+    finally:
+        admission.release(time.monotonic() - start_time)
+
 
 router = APIRouter()
 
@@ -15,22 +52,173 @@ class ChatResponse(BaseModel):
     response: str
 
 
-@router.post("/api/chat", response_model=ChatResponse)
-async def post_chat_message(request: ChatRequest):
-    llm = InferenceLLMConfig(
-        model_name=settings.INFERENCE_DEPLOYMENT_NAME,
-        api_key=settings.INFERENCE_API_KEY,
-        base_url=settings.INFERENCE_BASE_URL,
-        api_version=settings.INFERENCE_API_VERSION,
-    )
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatHistory(BaseModel):
+    messages: list[ChatMessage]
+
+
+class ChatBatchRequest(BaseModel):
+    messages: list[str] = Field(min_length=1, max_length=settings.CHAT_BATCH_MAX_SIZE)
+
 
-    response_text = llm.generate_from_messages(
-        messages=[
-            {"role": "user", "content": request.message},
-        ],
+class ChatBatchItem(BaseModel):
+    response: str | None = None
+    error: str | None = None
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatBatchItem]
+
+
+def _sse_event(data: dict, event: str | None = None) -> str:
+    """Format a Server-Sent-Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+def _conversation_messages(session: str | None, message: str) -> list[dict]:
+    """The session's history followed by its new message."""
+    return [*conversation_store.history(session, message), {"role": "user", "content": message}]
+
+
+@router.post("/api/chat", response_model=ChatResponse, dependencies=[Depends(admit_generation)])
+async def post_chat_message(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    llm: InferenceLLMConfig = Depends(get_inference_llm),
+):
+    """Answer a message in the context of the session's conversation."""
+    session = current_session_id()
+    response_text = await llm.a_generate_from_messages(
+        messages=_conversation_messages(session, request.message),
     )
 
     if not response_text or response_text.startswith("Error:"):
         raise HTTPException(status_code=404, detail=response_text)
 
+    conversation_store.add_turn(session, request.message, response_text)
+    # trimmed turns are summarized once the reply is sent, when summary trimming is enabled
+    background_tasks.add_task(conversation_store.a_summarize, session, llm)
     return ChatResponse(response=response_text)
+
+
+@router.post(
+    "/api/chat/regenerate", response_model=ChatResponse, dependencies=[Depends(admit_generation)]
+)
+async def post_chat_regenerate(llm: InferenceLLMConfig = Depends(get_inference_llm)):
+    """Answer the session's latest message again, replacing a reply the user found wrong.
+
+    The new reply is generated without the caches and replaces the cached one, so that the
+    paraphrases of the message don't get the wrong reply either.
+    """
+    session = current_session_id()
+    last_turn = conversation_store.last_turn(session)
+    if last_turn is None:
+        raise HTTPException(status_code=404, detail="No reply to regenerate")
+    history, message = last_turn
+    response_text = await llm.a_regenerate_from_messages(
+        messages=[*history, {"role": "user", "content": message}],
+    )
+    if not response_text:
+        raise HTTPException(status_code=404, detail="The reply could not be regenerated")
+
+    conversation_store.replace_last_reply(session, response_text)
+    return ChatResponse(response=response_text)
+
+
+@router.post("/api/chat/batch", response_model=ChatBatchResponse)
+async def post_chat_batch(
+    request: ChatBatchRequest, llm: InferenceLLMConfig = Depends(get_inference_llm)
+):
+    """Answer several independent messages concurrently.
+
+    At most ``CHAT_BATCH_MAX_CONCURRENCY`` generations run at once, each taking its own admission
+    slot, so that a batch counts against the concurrency cap like as many single requests. Replies
+    are returned in the order of the messages, a failed one (rejected by the admission control
+    included) carrying its error instead of failing the whole batch.
+    """
+    results = await llm.a_generate_many(
+        [[{"role": "user", "content": message}] for message in request.messages],
+        max_concurrency=settings.CHAT_BATCH_MAX_CONCURRENCY,
+        slot=admission.slot,
+    )
+    return ChatBatchResponse(
+        results=[ChatBatchItem(response=result.output, error=result.error) for result in results]
+    )
+
+
+@router.post("/api/chat/stream", dependencies=[Depends(admit_generation)])
+async def post_chat_message_stream(
+    request: ChatRequest, llm: InferenceLLMConfig = Depends(get_inference_llm)
+):
+    """Stream the reply as Server-Sent-Events.
+
+    Each token delta is sent as a ``data`` frame, followed by a final ``usage`` event holding the
+    token usage, the time-to-first-token and the total latency (both in seconds). The exchange is
+    added to the session's conversation once the reply is complete.
+    """
+    session = current_session_id()
+    messages = _conversation_messages(session, request.message)
+
+    async def event_stream():
+        start_time = time.perf_counter()
+        time_to_first_token = None
+        usage = None
+        deltas = []
+        try:
+            async for chunk in llm.a_stream_from_messages(messages=messages, raw_response=True):
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                deltas.append(chunk.choices[0].delta.content)
+                yield _sse_event({"delta": chunk.choices[0].delta.content})
+        except Exception as e:
+            logger.error(f"Error in streaming response from LLM: {e}")
+            yield _sse_event({"detail": str(e)}, event="error")
+            return
+
+        conversation_store.add_turn(session, request.message, "".join(deltas))
+        latency = time.perf_counter() - start_time
+        logger.debug(f"Chat stream: time to first token {time_to_first_token}s, total {latency}s")
+        yield _sse_event(
+            {
+                "prompt_tokens": usage.prompt_tokens if usage else None,
+                "completion_tokens": usage.completion_tokens if usage else None,
+                "total_tokens": usage.total_tokens if usage else None,
+                "time_to_first_token": time_to_first_token,
+                "latency": latency,
+            },
+            event="usage",
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(conversation_store.a_summarize, session, llm),
+    )
+
+
+@router.get("/api/chat/history", response_model=ChatHistory)
+async def get_chat_history():
+    """Conversation of the caller's session, as it will be sent with its next message."""
+    return ChatHistory(messages=conversation_store.history(current_session_id()))
+
+
+@router.delete("/api/chat/history", status_code=204)
+async def delete_chat_history():
+    """Start a new conversation for the caller's session."""
+    conversation_store.clear(current_session_id())
+
+
+@router.get("/api/chat/admission")
+async def get_chat_admission_stats():
+    """Concurrency, queue depth and queue wait time of the chat generations."""
+    return admission.stats()
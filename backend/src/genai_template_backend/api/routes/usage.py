@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+
+from genai_template_backend.api.accounting import UsageTotals, current_session_id, usage_ledger
+
+router = APIRouter()
+
+
+@router.get("/api/usage")
+async def get_usage(top_sessions: int = Query(10, ge=0, le=1000)):
+    """Token usage and cost of the LLM calls, overall, per model, per route and per session."""
+    return usage_ledger.summary(top_sessions=top_sessions)
+
+
+@router.get("/api/usage/session", response_model=UsageTotals)
+async def get_session_usage():
+    """Token usage and cost of the LLM calls made for the caller's session."""
+    return usage_ledger.session_usage(current_session_id())
@@ -0,0 +1,160 @@
+"""Semantic cache answering paraphrases of prompts that were already answered."""
+
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+from pydantic import BaseModel
+
+from genai_template_backend.utils import numpy as np
+
+if TYPE_CHECKING:
+    from genai_template_backend.api.llm import EmbeddingLLMConfig
+
+
+class SemanticCache:
+    """Cache of LLM outputs looked up by embedding similarity instead of exact match.
+
+    Prompt embeddings are L2-normalized and stored as rows of one contiguous float32 matrix, so a
+    lookup is a single matrix-vector product giving the cosine similarity with every entry. The
+    best match is a hit when its similarity reaches ``similarity_threshold``. Once ``capacity``
+    entries are stored, the least recently used one is overwritten.
+
+    Entries are partitioned by namespace (model, schema and sampling parameters) so that a prompt
+    never gets an answer produced for another configuration.
+    """
+
+    def __init__(
+        self,
+        embedding_llm: "EmbeddingLLMConfig",
+        capacity: int = 4096,
+        similarity_threshold: float = 0.92,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.embedding_llm = embedding_llm
+        self.capacity = capacity
+        self.similarity_threshold = similarity_threshold
+
+        self._vectors: Optional[np.ndarray] = None  # allocated once the dimension is known
+        self._namespace_ids = np.full(capacity, -1, dtype=np.int32)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._outputs: list[Any] = [None] * capacity
+        self._namespaces: dict[str, int] = {}
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.false_positive_overrides = 0
+
+    def __len__(self) -> int:
+        """Number of cached entries."""
+        return self._size
+
+    @staticmethod
+    def _normalize(vector) -> "np.ndarray":
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _best_match(self, vector: "np.ndarray", namespace: str) -> tuple[int, float]:
+        """Return the index and similarity of the closest entry, or (-1, -inf) if there is none."""
+        namespace_id = self._namespaces.get(namespace)
+        if self._vectors is None or namespace_id is None or not self._size:
+            return -1, float("-inf")
+        similarities = self._vectors[: self._size] @ vector
+        similarities[self._namespace_ids[: self._size] != namespace_id] = -np.inf
+        index = int(np.argmax(similarities))
+        return index, float(similarities[index])
+
+    def lookup(self, vector, namespace: str = "") -> Any:
+        """Return the output cached for the closest prompt above the threshold, or None."""
+        vector = self._normalize(vector)
+        with self._lock:
+            index, similarity = self._best_match(vector, namespace)
+            if index < 0 or similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._clock += 1
+            self._last_used[index] = self._clock
+            output = self._outputs[index]
+
+        if isinstance(output, BaseModel):
+            return output.model_copy(deep=True)
+        return output
+
+    def add(self, vector, output: Any, namespace: str = ""):
+        if output is None:
+            return
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+            if self._size < self.capacity:
+                index = self._size
+                self._size += 1
+            else:
+                index = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._clock += 1
+            self._vectors[index] = vector
+            self._namespace_ids[index] = self._namespaces.setdefault(
+                namespace, len(self._namespaces)
+            )
+            self._last_used[index] = self._clock
+            self._outputs[index] = output
+
+    def override(self, vector, output: Any, namespace: str = "") -> bool:
+        """Replace the output of a hit that turned out to be wrong.
+
+        Returns False, and stores the output as a new entry, when no entry matched the vector.
+        """
+        vector = self._normalize(vector)
+        with self._lock:
+            index, similarity = self._best_match(vector, namespace)
+            if index >= 0 and similarity >= self.similarity_threshold:
+                self.false_positive_overrides += 1
+                self._outputs[index] = output
+                self._vectors[index] = vector
+                return True
+        self.add(vector, output, namespace)
+        return False
+
+    def get(self, text: str, namespace: str = "") -> tuple[Any, list[float]]:
+        """Embed the text and look it up; the embedding is returned to store the output later."""
+        vector = self.embedding_llm.embed_text(text)
+        return self.lookup(vector, namespace), vector
+
+    async def a_get(self, text: str, namespace: str = "") -> tuple[Any, list[float]]:
+        vector = await self.embedding_llm.a_embed_text(text)
+        return self.lookup(vector, namespace), vector
+
+    async def a_override(self, text: str, output: Any, namespace: str = "") -> bool:
+        vector = await self.embedding_llm.a_embed_text(text)
+        return self.override(vector, output, namespace)
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._outputs = [None] * self.capacity
+            self._namespace_ids[:] = -1
+            self._last_used[:] = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "false_positive_overrides": self.false_positive_overrides,
+            "hit_ratio": self.hit_ratio,
+        }
@@ -0,0 +1,67 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Shares one in-flight call between all the concurrent callers asking for the same key.
+
+    The first caller for a key starts the call, later callers wait for the same result (or
+    exception). A cancelled caller only stops waiting; the shared call is cancelled once no caller
+    is left waiting for it. The key is forgotten as soon as the call is done, so results are never
+    reused after the fact (that's the job of the response caches).
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        """Number of calls currently in flight."""
+        return len(self._flights)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        result, _ = await self.do_shared(key, call)
+        return result
+
+    async def do_shared(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Like :meth:`do`, also telling whether the result comes from another caller's call.
+
+        Only the caller that started the call gets False, e.g. to account for its usage once.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "calls": self.calls, "coalesced": self.coalesced}
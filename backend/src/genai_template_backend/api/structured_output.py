@@ -0,0 +1,49 @@
+"""Structured outputs: response formats, parsing and instructor clients, prepared once."""
+
+import functools
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+from genai_template_backend.api.rate_limit import NO_PROVIDER_RETRIES
+from genai_template_backend.utils import instructor, litellm
+
+
+@functools.lru_cache(maxsize=256)
+def response_format(schema: Type[BaseModel]) -> dict:
+    """``response_format`` asking for the JSON schema of ``schema``, built once per schema.
+
+    litellm would otherwise generate the JSON schema from the pydantic model on every call.
+    """
+    return litellm.utils.type_to_response_format_param(schema)
+
+
+def parse_json_output(schema: Type[BaseModel], content: Optional[str]) -> BaseModel:
+    """Parse and validate the JSON content of a completion in a single pass.
+
+    Raises:
+        ValueError: if the completion has no content.
+        pydantic.ValidationError: if the content isn't valid JSON matching the schema.
+    """
+    if content is None:
+        raise ValueError("The completion has no content to parse")
+    return schema.model_validate_json(content)
+
+
+async def _acompletion(*args, **kwargs):
+    # looked up on each call, so that the cached clients follow a replaced litellm.acompletion
+    return await litellm.acompletion(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+def _completion(*args, **kwargs):
+    return litellm.completion(*args, **NO_PROVIDER_RETRIES | kwargs)
+
+
+@functools.cache
+def instructor_client(
+    mode: str = "json_mode", use_async: bool = True
+) -> "instructor.Instructor | instructor.AsyncInstructor":
+    """Instructor client over litellm, built once per mode (an ``instructor.Mode`` value)."""
+    return instructor.from_litellm(
+        _acompletion if use_async else _completion, mode=instructor.Mode(mode)
+    )
@@ -7,9 +7,18 @@ import os
 
 from fastapi.responses import Response
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
-from genai_template_backend.api.routes import chat
+from genai_template_backend.api.accounting import (
+    UsageContextMiddleware,
+    open_usage_sink,
+    usage_ledger,
+)
+from genai_template_backend.api.clients import LLMRegistry
+from genai_template_backend.api.conversations import SqliteConversationBackend, conversation_store
+from genai_template_backend.api.metrics import REGISTRY, MetricsMiddleware
+from genai_template_backend.api.routes import chat, usage
 from genai_template_backend.backend_settings import settings, logger
 
 
@@ -18,9 +27,25 @@ async def lifespan(app: FastAPI):
     """This function is called when the server starts."""
     # Startup logic
     logger.info("Application startup: Initializing resources concurrently...")
+    app.state.llm_registry = await LLMRegistry.a_from_settings(settings)
+    flush_task = None
+    if settings.USAGE_SINK_PATH:
+        usage_ledger.sink = open_usage_sink(settings.USAGE_SINK_PATH)
+        flush_task = asyncio.create_task(
+            usage_ledger.run_periodic_flush(settings.USAGE_FLUSH_SECONDS)
+        )
+    if settings.CONVERSATION_STORE_PATH:
+        conversation_store.backend = SqliteConversationBackend(settings.CONVERSATION_STORE_PATH)
 
     yield
     # Shutdown logic
+    if flush_task is not None:
+        flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await flush_task
+    usage_ledger.close()
+    conversation_store.close()
+    app.state.llm_registry.close()
     logger.info("Application shutdown.")
 
 
@@ -36,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# inside the session middleware, to attribute LLM usage to the session
+app.add_middleware(UsageContextMiddleware)
+
 app.add_middleware(
     SessionMiddleware,
     secret_key=os.environ.get("SESSION_SECRET", "change_this_secret"),
@@ -43,6 +71,9 @@ app.add_middleware(
     https_only=False,  # Set to True in production with HTTPS
 )
 
+# outermost, so that the measured duration covers the other middlewares
+app.add_middleware(MetricsMiddleware)
+
 
 router = APIRouter()
 
@@ -59,6 +90,12 @@ async def favicon():
     return Response(content=b"", media_type="image/x-icon")
 
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @router.get("/api/")
 async def root():
     return {"message": f"API is running."}
@@ -66,6 +103,7 @@ async def root():
 
 app.include_router(router, prefix="/api", tags=["root"])
 app.include_router(chat.router, tags=["chat"])
+app.include_router(usage.router, tags=["usage"])
 
 
 if __name__ == "__main__":
@@ -3,13 +3,13 @@
 from __future__ import annotations
 
 import ast
+import os
 import sys
 import timeit
-from typing import Optional
+from typing import Literal, Optional
 
-import litellm
 from loguru import logger as _loguru_logger
-from pydantic import AliasChoices, Field, SecretStr
+from pydantic import AliasChoices, BaseModel, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,11 +19,34 @@ class BaseEnvironmentSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
+class InferenceDeployment(BaseModel):
+    """An extra deployment of the inference model, see ``INFERENCE_DEPLOYMENTS``."""
+
+    model_name: str
+    base_url: str
+    api_key: Optional[SecretStr] = None  # defaults to INFERENCE_API_KEY
+    api_version: Optional[str] = None  # defaults to INFERENCE_API_VERSION
+    fallback: bool = False  # only used when no primary deployment is available
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+
 class InferenceEnvironmentVariables(BaseEnvironmentSettings):
     INFERENCE_BASE_URL: str
     INFERENCE_API_KEY: SecretStr
     INFERENCE_DEPLOYMENT_NAME: str
     INFERENCE_API_VERSION: str = "2025-02-01-preview"
+    INFERENCE_SINGLE_FLIGHT: bool = True  # identical concurrent requests share one call
+    INFERENCE_REQUESTS_PER_MINUTE: Optional[int] = None  # client-side limits, unset = no limit
+    INFERENCE_TOKENS_PER_MINUTE: Optional[int] = None
+    INFERENCE_MAX_RETRIES: int = 6
+    INFERENCE_DEADLINE_SECONDS: Optional[float] = None
+    INFERENCE_HEDGING: bool = False  # hedge the calls slower than INFERENCE_HEDGE_PERCENTILE
+    INFERENCE_HEDGE_PERCENTILE: float = 95.0
+    INFERENCE_HEDGE_MAX_RATE: float = 0.1  # max fraction of the calls getting a hedge
+    # JSON list of deployments equivalent to the one above; requests are then routed over all of
+    # them, failing over instead of retrying
+    INFERENCE_DEPLOYMENTS: list[InferenceDeployment] = []
 
 
 class EmbeddingsEnvironmentVariables(BaseEnvironmentSettings):
@@ -31,6 +54,47 @@ class EmbeddingsEnvironmentVariables(BaseEnvironmentSettings):
     EMBEDDINGS_API_KEY: Optional[SecretStr] = "tt"
     EMBEDDINGS_DEPLOYMENT_NAME: Optional[str] = None
     EMBEDDINGS_API_VERSION: str = "2025-02-01-preview"
+    EMBEDDINGS_CACHE_PATH: Optional[str] = None  # SQLite file, the cache is disabled if unset
+    EMBEDDINGS_BATCH_SIZE: int = 256
+    EMBEDDINGS_BATCH_MAX_TOKENS: int = 100_000
+    EMBEDDINGS_MAX_CONCURRENCY: int = 4
+    EMBEDDINGS_MICRO_BATCHING: bool = False
+    EMBEDDINGS_MICRO_BATCH_MAX_SIZE: int = 64
+    EMBEDDINGS_MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+
+
+class ResponseCacheEnvironmentVariables(BaseEnvironmentSettings):
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: Optional[float] = 3600
+
+
+class SemanticCacheEnvironmentVariables(BaseEnvironmentSettings):
+    SEMANTIC_CACHE_ENABLED: bool = False  # requires an embedding model
+    SEMANTIC_CACHE_CAPACITY: int = 4096
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+
+
+class ChatEnvironmentVariables(BaseEnvironmentSettings):
+    CHAT_MAX_CONCURRENT_GENERATIONS: int = 32
+    CHAT_MAX_QUEUE_SIZE: int = 64
+    CHAT_MAX_QUEUE_SECONDS: float = 10.0
+    CHAT_BATCH_MAX_SIZE: int = 64
+    CHAT_BATCH_MAX_CONCURRENCY: int = 8
+
+
+class UsageEnvironmentVariables(BaseEnvironmentSettings):
+    USAGE_SINK_PATH: Optional[str] = None  # .jsonl or .sqlite3 file receiving every LLM call
+    USAGE_FLUSH_SECONDS: float = 30.0
+    USAGE_MAX_SESSIONS: int = 10000
+
+
+class ConversationEnvironmentVariables(BaseEnvironmentSettings):
+    CONVERSATION_MAX_CONTEXT_TOKENS: int = 4096  # history sent along with each chat message
+    CONVERSATION_TRIMMING: Literal["window", "summary"] = "window"
+    CONVERSATION_IDLE_TTL_SECONDS: Optional[float] = 3600
+    CONVERSATION_MAX_MEMORY_BYTES: int = 64 * 1024 * 1024
+    CONVERSATION_STORE_PATH: Optional[str] = None  # SQLite file, histories are in memory if unset
 
 
 class APIEnvironmentVariables(BaseEnvironmentSettings):
@@ -41,6 +105,11 @@ class APIEnvironmentVariables(BaseEnvironmentSettings):
 class ApplicationSettings(
     InferenceEnvironmentVariables,
     EmbeddingsEnvironmentVariables,
+    ResponseCacheEnvironmentVariables,
+    SemanticCacheEnvironmentVariables,
+    ChatEnvironmentVariables,
+    UsageEnvironmentVariables,
+    ConversationEnvironmentVariables,
     APIEnvironmentVariables,
 ):
     """Configuration for genai-template-backend.
@@ -57,7 +126,9 @@ class ApplicationSettings(
 
     def model_post_init(self, __context):
         """Called after model initialization."""
-        litellm.suppress_debug_info = True
+        # litellm downloads its price list when imported unless told to use the bundled one, which
+        # costs seconds (or hangs without network) on every worker start
+        os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
 
 
 def _initialize_logger(settings: ApplicationSettings):
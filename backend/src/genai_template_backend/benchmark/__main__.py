@@ -0,0 +1,167 @@
+"""Offline load tests of the LLM clients and the chat API, against a local stub provider.
+
+Commands::
+
+    # run the scenarios against a stub provider started in-process, results written as JSON
+    genai-benchmark run --output bench.json --concurrency 1 8 32 --requests 200 --latency-ms 200
+
+    # run them against an existing OpenAI-compatible endpoint instead
+    genai-benchmark run --base-url http://localhost:8001/v1 --scenarios inference embedding
+
+    # compare two runs, exits with 1 when a metric regressed by more than the threshold
+    genai-benchmark compare baseline.json bench.json --threshold 0.1
+
+    # serve the stub provider alone, e.g. to point the backend at it
+    genai-benchmark stub --port 8001 --rate-limit-probability 0.05
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+from genai_template_backend.benchmark.driver import (
+    SCENARIOS,
+    a_run_benchmark,
+    build_report,
+    compare_reports,
+    load_report,
+)
+from genai_template_backend.benchmark.stub_server import (
+    StubConfig,
+    create_stub_app,
+    run_stub_server,
+)
+
+
+def _add_stub_arguments(parser: argparse.ArgumentParser):
+    defaults = StubConfig()
+    parser.add_argument(
+        "--latency-distribution",
+        choices=["constant", "uniform", "lognormal"],
+        default=defaults.latency_distribution,
+    )
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--embedding-latency-ms", type=float, default=defaults.embedding_latency_ms)
+    parser.add_argument(
+        "--rate-limit-probability", type=float, default=defaults.rate_limit_probability
+    )
+    parser.add_argument("--retry-after-seconds", type=float, default=defaults.retry_after_seconds)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def _stub_config(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        embedding_latency_ms=args.embedding_latency_ms,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after_seconds=args.retry_after_seconds,
+        seed=args.seed,
+    )
+
+
+def _run(args: argparse.Namespace) -> int:
+    kwargs = dict(
+        scenarios=args.scenarios,
+        concurrency_levels=args.concurrency,
+        n_requests=args.requests,
+    )
+    if args.base_url:
+        stub = None
+        results = asyncio.run(
+            a_run_benchmark(
+                args.base_url,
+                model_name=args.model,
+                embedding_model_name=args.embedding_model,
+                api_key=args.api_key,
+                **kwargs,
+            )
+        )
+    else:
+        stub = _stub_config(args)
+        with run_stub_server(stub) as base_url:
+            results = asyncio.run(a_run_benchmark(base_url, **kwargs))
+
+    report = build_report(results, stub)
+    args.output.write_text(report.model_dump_json(indent=2))
+
+    print(f"{'scenario':<18}{'conc':>6}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'ttft p95':>10}")
+    for result in results:
+        latency, ttft = result.latency, result.time_to_first_token
+        print(
+            f"{result.scenario:<18}{result.concurrency:>6}{result.throughput_rps:>10.1f}"
+            + (
+                f"{latency.p50:>9.3f}{latency.p95:>9.3f}{latency.p99:>9.3f}"
+                if latency
+                else " " * 27
+            )
+            + (f"{ttft.p95:>10.3f}" if ttft else "")
+            + (f"  {result.errors} errors" if result.errors else "")
+        )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    changes = compare_reports(load_report(args.baseline), load_report(args.current), args.threshold)
+    regressions = [change for change in changes if change["regression"]]
+    for change in changes:
+        flag = "REGRESSION" if change["regression"] else ""
+        print(
+            f"{change['scenario']:<18}{change['concurrency']:>6}  {change['metric']:<26}"
+            f"{change['baseline']:>10.3f} -> {change['current']:<10.3f}{change['change']:>+8.1%}"
+            f"  {flag}"
+        )
+    print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _serve_stub(args: argparse.Namespace) -> int:
+    uvicorn.run(create_stub_app(_stub_config(args)), host=args.host, port=args.port)
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark scenarios")
+    run.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    run.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    run.add_argument("--base-url", help="OpenAI-compatible endpoint to use instead of the stub")
+    run.add_argument("--model", default="openai/stub-model")
+    run.add_argument("--embedding-model", default="openai/stub-embedding")
+    run.add_argument("--api-key", default="stub")
+    _add_stub_arguments(run)
+    run.set_defaults(function=_run)
+
+    compare = commands.add_parser("compare", help="compare two benchmark results")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("current", type=Path)
+    compare.add_argument("--threshold", type=float, default=0.1, help="tolerated change (0.1=10%%)")
+    compare.set_defaults(function=_compare)
+
+    stub = commands.add_parser("stub", help="serve the stub provider")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8001)
+    _add_stub_arguments(stub)
+    stub.set_defaults(function=_serve_stub)
+
+    args = parser.parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
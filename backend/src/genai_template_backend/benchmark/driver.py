@@ -0,0 +1,324 @@
+"""Load driver measuring throughput, latency percentiles and time to first token.
+
+Each scenario sends a fixed number of requests through ``concurrency`` workers and reports the
+throughput, the p50/p95/p99 latencies and, for streams, the time to first token. Prompts are
+unique per request so that caches and single-flight don't answer in place of the provider, and
+the chat requests each come from a new session, without any conversation history.
+"""
+
+import asyncio
+import json
+import math
+import platform
+import subprocess
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from pydantic import BaseModel, SecretStr
+
+from genai_template_backend.api.llm import EmbeddingLLMConfig, InferenceLLMConfig
+from genai_template_backend.backend_settings import logger
+from genai_template_backend.benchmark.stub_server import StubConfig, serve_in_thread
+
+# one request of a scenario: returns the time to first token for streams, None otherwise
+RequestFunction = Callable[[int], Awaitable[Optional[float]]]
+
+SCENARIOS = ("chat", "chat_stream", "inference", "inference_stream", "embedding")
+
+
+class Percentiles(BaseModel):
+    p50: float
+    p95: float
+    p99: float
+    mean: float
+    max: float
+
+
+class ScenarioResult(BaseModel):
+    scenario: str
+    concurrency: int
+    requests: int
+    errors: int
+    duration_seconds: float
+    throughput_rps: float
+    latency: Optional[Percentiles] = None
+    time_to_first_token: Optional[Percentiles] = None
+
+
+class BenchmarkReport(BaseModel):
+    created_at: str
+    commit: Optional[str] = None
+    python: str
+    platform: str
+    stub: Optional[StubConfig] = None
+    results: list[ScenarioResult]
+
+
+def percentiles(values: list[float]) -> Optional[Percentiles]:
+    """Nearest-rank percentiles of ``values``, None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    return Percentiles(
+        p50=rank(0.50),
+        p95=rank(0.95),
+        p99=rank(0.99),
+        mean=sum(ordered) / len(ordered),
+        max=ordered[-1],
+    )
+
+
+async def run_scenario(
+    name: str, request: RequestFunction, concurrency: int, n_requests: int
+) -> ScenarioResult:
+    """Send ``n_requests`` requests with at most ``concurrency`` of them in flight."""
+    latencies, first_token_latencies, errors = [], [], 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < n_requests:
+            index = next_index
+            next_index += 1
+            start_time = time.perf_counter()
+            try:
+                time_to_first_token = await request(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start_time)
+            if time_to_first_token is not None:
+                first_token_latencies.append(time_to_first_token)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, n_requests))))
+    duration = time.perf_counter() - start_time
+    return ScenarioResult(
+        scenario=name,
+        concurrency=concurrency,
+        requests=n_requests,
+        errors=errors,
+        duration_seconds=duration,
+        throughput_rps=len(latencies) / duration if duration > 0 else 0.0,
+        latency=percentiles(latencies),
+        time_to_first_token=percentiles(first_token_latencies),
+    )
+
+
+def _messages(index: int) -> list[dict]:
+    return [{"role": "user", "content": f"Benchmark request {index}: say hello."}]
+
+
+def inference_request(llm: InferenceLLMConfig) -> RequestFunction:
+    async def request(index: int) -> None:
+        if await llm.a_generate_from_messages(_messages(index)) is None:
+            raise RuntimeError("generation failed")
+
+    return request
+
+
+def inference_stream_request(llm: InferenceLLMConfig) -> RequestFunction:
+    async def request(index: int) -> Optional[float]:
+        start_time, time_to_first_token = time.perf_counter(), None
+        async for _ in llm.a_stream_from_messages(_messages(index)):
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - start_time
+        return time_to_first_token
+
+    return request
+
+
+def embedding_request(llm: EmbeddingLLMConfig) -> RequestFunction:
+    async def request(index: int) -> None:
+        await llm.a_embed_text(f"Benchmark text {index}")
+
+    return request
+
+
+def chat_request(client: httpx.AsyncClient) -> RequestFunction:
+    async def request(index: int) -> None:
+        response = await client.post("/api/chat", json={"message": _messages(index)[0]["content"]})
+        response.raise_for_status()
+
+    return request
+
+
+def chat_stream_request(client: httpx.AsyncClient) -> RequestFunction:
+    async def request(index: int) -> Optional[float]:
+        start_time, time_to_first_token = time.perf_counter(), None
+        payload = {"message": _messages(index)[0]["content"]}
+        async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("event: error"):
+                    raise RuntimeError("the stream failed")
+                if time_to_first_token is None and line.startswith("data: "):
+                    time_to_first_token = time.perf_counter() - start_time
+        return time_to_first_token
+
+    return request
+
+
+async def a_run_benchmark(
+    base_url: str,
+    scenarios: list[str],
+    concurrency_levels: list[int],
+    n_requests: int,
+    model_name: str = "openai/stub-model",
+    embedding_model_name: str = "openai/stub-embedding",
+    api_key: str = "stub",
+) -> list[ScenarioResult]:
+    """Run every scenario at every concurrency level against the provider at ``base_url``.
+
+    The ``chat`` scenarios go through the FastAPI application in-process, with its settings
+    pointed at the provider, so they measure the API overhead on top of the client's.
+    """
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {sorted(unknown)}, expected some of {SCENARIOS}")
+
+    llm = InferenceLLMConfig(model_name=model_name, api_key=api_key, base_url=base_url)
+    embedding_llm = EmbeddingLLMConfig(
+        model_name=embedding_model_name, api_key=api_key, base_url=base_url
+    )
+    requests = {
+        "inference": inference_request(llm),
+        "inference_stream": inference_stream_request(llm),
+        "embedding": embedding_request(embedding_llm),
+    }
+
+    results = []
+    async with AsyncExitStack() as stack:
+        if any(scenario.startswith("chat") for scenario in scenarios):
+            client = await stack.enter_async_context(_app_client(base_url, model_name, api_key))
+            requests["chat"] = chat_request(client)
+            requests["chat_stream"] = chat_stream_request(client)
+        for scenario in scenarios:
+            for concurrency in concurrency_levels:
+                result = await run_scenario(scenario, requests[scenario], concurrency, n_requests)
+                logger.info(
+                    f"{scenario} x{concurrency}: {result.throughput_rps:.1f} req/s,"
+                    f" {result.errors} errors"
+                )
+                results.append(result)
+    return results
+
+
+@asynccontextmanager
+async def _app_client(base_url: str, model_name: str, api_key: str):
+    """HTTP client of the FastAPI application, served by uvicorn with its settings overridden.
+
+    The application runs on its own event loop in a background thread, as it would in its own
+    process, and responses are really streamed (an in-process ASGI transport buffers them).
+
+    The client keeps no cookies, so every request is sent by a new user with a new session: were
+    the session cookie kept, every request would add to one conversation, sent with each message.
+    """
+    from genai_template_backend.app import app
+    from genai_template_backend.backend_settings import settings
+
+    overrides = {
+        "INFERENCE_DEPLOYMENT_NAME": model_name,
+        "INFERENCE_BASE_URL": base_url,
+        "INFERENCE_API_KEY": SecretStr(api_key),
+        "INFERENCE_DEPLOYMENTS": [],
+        "EMBEDDINGS_DEPLOYMENT_NAME": None,
+    }
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        with serve_in_thread(app) as app_url:
+            async with httpx.AsyncClient(
+                base_url=app_url,
+                timeout=300,
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            ) as client:
+                yield client
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def build_report(results: list[ScenarioResult], stub: Optional[StubConfig]) -> BenchmarkReport:
+    return BenchmarkReport(
+        created_at=datetime.now(timezone.utc).isoformat(),
+        commit=git_commit(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        stub=stub,
+        results=results,
+    )
+
+
+def compare_reports(
+    baseline: BenchmarkReport, current: BenchmarkReport, threshold: float = 0.1
+) -> list[dict[str, Any]]:
+    """Changes between two reports, for every scenario and concurrency level found in both.
+
+    A change is a regression when the throughput drops, or a p95 latency (or time to first
+    token) grows, by more than ``threshold`` (a fraction), or when errors appear.
+    """
+    baseline_results = {(r.scenario, r.concurrency): r for r in baseline.results}
+    changes = []
+    for result in current.results:
+        before = baseline_results.get((result.scenario, result.concurrency))
+        if before is None:
+            continue
+        metrics = {"throughput_rps": (before.throughput_rps, result.throughput_rps, True)}
+        for field in ("latency", "time_to_first_token"):
+            if getattr(before, field) and getattr(result, field):
+                metrics[f"{field}_p95"] = (
+                    getattr(before, field).p95,
+                    getattr(result, field).p95,
+                    False,
+                )
+        for metric, (old, new, higher_is_better) in metrics.items():
+            change = (new - old) / old if old else 0.0
+            regression = -change > threshold if higher_is_better else change > threshold
+            changes.append(
+                {
+                    "scenario": result.scenario,
+                    "concurrency": result.concurrency,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                    "regression": regression,
+                }
+            )
+        changes.append(
+            {
+                "scenario": result.scenario,
+                "concurrency": result.concurrency,
+                "metric": "errors",
+                "baseline": before.errors,
+                "current": result.errors,
+                "change": result.errors - before.errors,
+                "regression": result.errors > before.errors,
+            }
+        )
+    return changes
+
+
+def load_report(path) -> BenchmarkReport:
+    with open(path, encoding="utf-8") as f:
+        return BenchmarkReport.model_validate(json.load(f))
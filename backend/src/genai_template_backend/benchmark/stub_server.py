@@ -0,0 +1,243 @@
+"""Local stub of an OpenAI-compatible provider, for benchmarks that don't depend on a live LLM.
+
+It serves ``/v1/chat/completions`` (streamed or not) and ``/v1/embeddings`` with simulated
+latencies: the time to first token is drawn from a configurable distribution, then completion
+tokens come at a fixed rate. A fraction of the requests can be answered with a 429 and a
+``Retry-After`` header to exercise the clients' rate-limit handling.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Literal, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+
+class StubConfig(BaseModel):
+    """Behaviour of the stub provider."""
+
+    # time to first token, in milliseconds: median of a lognormal, bounds of a uniform, or fixed
+    latency_distribution: Literal["constant", "uniform", "lognormal"] = "lognormal"
+    latency_ms: float = 200.0
+    latency_spread: float = 0.5  # lognormal sigma, or +/- fraction of latency_ms when uniform
+    tokens_per_second: float = 100.0  # completion tokens generation rate, 0 for instantaneous
+    completion_tokens: int = 64
+
+    embedding_latency_ms: float = 20.0
+    embedding_dimensions: int = 384
+
+    rate_limit_probability: float = 0.0  # fraction of the requests answered with a 429
+    retry_after_seconds: float = 0.1
+    seed: Optional[int] = None
+
+
+class StubProvider:
+    """Simulated provider state: the configuration, its random source and request counters."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self.requests = 0
+        self.rate_limited = 0
+
+    def first_token_delay(self) -> float:
+        config = self.config
+        if config.latency_distribution == "constant":
+            milliseconds = config.latency_ms
+        elif config.latency_distribution == "uniform":
+            spread = config.latency_ms * config.latency_spread
+            milliseconds = self._random.uniform(
+                config.latency_ms - spread, config.latency_ms + spread
+            )
+        else:
+            milliseconds = config.latency_ms * math.exp(
+                self._random.gauss(0, config.latency_spread)
+            )
+        return max(milliseconds, 0.0) / 1000
+
+    def token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1 / rate if rate > 0 else 0.0
+
+    def rate_limit_response(self) -> Optional[JSONResponse]:
+        """A 429 response for the requests drawn to be rate limited, None for the others."""
+        self.requests += 1
+        if self._random.random() >= self.config.rate_limit_probability:
+            return None
+        self.rate_limited += 1
+        return JSONResponse(
+            {
+                "error": {
+                    "message": "Rate limit reached (stub provider)",
+                    "type": "rate_limit_error",
+                    "code": "rate_limit_exceeded",
+                }
+            },
+            status_code=429,
+            headers={"Retry-After": str(self.config.retry_after_seconds)},
+        )
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(len(str(message.get("content", ""))) // 4 + 1 for message in messages)
+
+
+def _stub_embedding(text: str, dimensions: int) -> list[float]:
+    """Deterministic unit vector derived from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    generator = random.Random(seed)
+    vector = [generator.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """FastAPI application of a stub provider behaving as described by ``config``."""
+    provider = StubProvider(config or StubConfig())
+    app = FastAPI(title="Stub OpenAI-compatible provider")
+    app.state.provider = provider
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        rejection = provider.rate_limit_response()
+        if rejection is not None:
+            return rejection
+
+        model = body.get("model", "stub-model")
+        n_tokens = body.get("max_tokens") or provider.config.completion_tokens
+        n_tokens = min(n_tokens, provider.config.completion_tokens)
+        tokens = [f"tok{i} " for i in range(n_tokens)]
+        usage = {
+            "prompt_tokens": _prompt_tokens(body.get("messages", [])),
+            "completion_tokens": n_tokens,
+            "total_tokens": _prompt_tokens(body.get("messages", [])) + n_tokens,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        first_token_delay, token_delay = provider.first_token_delay(), provider.token_delay()
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay + token_delay * max(n_tokens - 1, 0))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(first_token_delay)
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(token_delay)
+                yield chunk(
+                    {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                )
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                data = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        rejection = provider.rate_limit_response()
+        if rejection is not None:
+            return rejection
+
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        await asyncio.sleep(provider.config.embedding_latency_ms / 1000)
+        prompt_tokens = sum(len(text) // 4 + 1 for text in texts)
+        return {
+            "object": "list",
+            "model": body.get("model", "stub-embedding"),
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": _stub_embedding(text, provider.config.embedding_dimensions),
+                }
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": provider.requests, "rate_limited": provider.rate_limited}
+
+    return app
+
+
+@contextmanager
+def serve_in_thread(app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve an ASGI application with uvicorn from a background thread, yielding its URL.
+
+    With ``port=0`` a free port is picked.
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-server", daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 60
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("The server failed to start")
+            time.sleep(0.01)
+        bound_port = server.servers[0].sockets[0].getsockname()[1]
+        yield f"http://{host}:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+@contextmanager
+def run_stub_server(
+    config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[str]:
+    """Serve a stub provider from a background thread, yielding its OpenAI base URL."""
+    with serve_in_thread(create_stub_app(config), host, port) as url:
+        yield f"{url}/v1"
@@ -0,0 +1,262 @@
+"""Resumable bulk inference over a JSONL file of prompts.
+
+Each input line is a JSON object with a unique ``id`` and either a ``prompt`` or a list of chat
+``messages``. Every line gets one output line, written as soon as its request completes::
+
+    {"id": ..., "index": 12, "output": ..., "error": null, "total_tokens": 87}
+
+where ``index`` is the line number in the input, which is also the id of items without one.
+The output is the progress: an interrupted run can be started again with the same arguments and
+only sends the items whose id is not in the output yet, even if the input was edited in between.
+Items that failed are done as well, unless ``--retry-errors`` is given. The input is streamed and
+at most ``--concurrency`` requests are in flight; only the ids of the done items are kept in
+memory.
+
+Usage::
+
+    genai-bulk-inference prompts.jsonl results.jsonl --concurrency 32 --schema my_module:Person
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+from genai_template_backend.api.llm import GenerationResult, InferenceLLMConfig
+from genai_template_backend.backend_settings import logger, settings
+
+
+class BulkInferenceStats(BaseModel):
+    """Counters of a bulk inference run."""
+
+    completed: int = 0
+    errors: int = 0
+    skipped: int = 0  # already done by a previous run
+    total_tokens: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def items_per_second(self) -> float:
+        return self.completed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.total_tokens / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.completed} items ({self.errors} errors, {self.skipped} skipped) in "
+            f"{self.elapsed_seconds:.1f}s: {self.items_per_second:.2f} items/s, "
+            f"{self.tokens_per_second:.1f} tokens/s"
+        )
+
+
+def load_schema(path: str) -> Type[BaseModel]:
+    """Import a pydantic model from a ``module:Class`` path."""
+    module_name, _, class_name = path.partition(":")
+    if not module_name or not class_name:
+        raise ValueError(f"Expected a schema path like 'module:Class', got {path!r}")
+    schema = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(schema, type) and issubclass(schema, BaseModel)):
+        raise ValueError(f"{path} is not a pydantic model")
+    return schema
+
+
+def _load_done(output_path: Path, retry_errors: bool = False) -> set:
+    """Ids of the items already in the output file, without the failed ones if ``retry_errors``.
+
+    A retried item gets a new record appended, so the latest record of an id is the one that
+    counts.
+    """
+    done = set()
+    if not output_path.exists():
+        return done
+    _truncate_partial_line(output_path)
+    with output_path.open(encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            if record["error"] is None or not retry_errors:
+                done.add(_id_key(record["id"]))
+            else:
+                done.discard(_id_key(record["id"]))
+    return done
+
+
+def _id_key(item_id: Any) -> str:
+    """Hashable form of an item id, which can be any JSON value."""
+    return json.dumps(item_id, sort_keys=True)
+
+
+def _truncate_partial_line(path: Path):
+    """Drop the last line of a file if a crash left it half written."""
+    with path.open("rb+") as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if not size:
+            return
+        file.seek(size - 1)
+        if file.read(1) == b"\n":
+            return
+        end = size
+        while end > 0:
+            chunk_start = max(0, end - 65536)
+            file.seek(chunk_start)
+            newline = file.read(end - chunk_start).rfind(b"\n")
+            if newline != -1:
+                file.truncate(chunk_start + newline + 1)
+                return
+            end = chunk_start
+        file.truncate(0)
+
+
+def _parse_item(line: str) -> Optional[dict]:
+    """The item of an input line, or None if the line is not a JSON object."""
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _item_messages(item: dict) -> list:
+    if "messages" in item:
+        return item["messages"]
+    if "prompt" in item:
+        return [{"role": "user", "content": item["prompt"]}]
+    raise ValueError("An input item needs a 'prompt' or 'messages' field")
+
+
+async def a_run_bulk_inference(
+    llm: InferenceLLMConfig,
+    input_path: Path,
+    output_path: Path,
+    schema: Optional[Type[BaseModel]] = None,
+    concurrency: int = 16,
+    progress_every_seconds: float = 10.0,
+    retry_errors: bool = False,
+) -> BulkInferenceStats:
+    """Run every item of ``input_path`` through ``llm`` and append the results to ``output_path``.
+
+    Items already present in the output (from an interrupted run) are skipped, unless they failed
+    and ``retry_errors`` is set.
+    """
+    if concurrency <= 0:
+        raise ValueError("concurrency must be positive")
+    done = _load_done(output_path, retry_errors)
+    stats = BulkInferenceStats()
+    start_time = last_report = time.monotonic()
+
+    with (
+        input_path.open(encoding="utf-8") as input_file,
+        output_path.open("a", encoding="utf-8") as output,
+    ):
+
+        async def process(index: int, item_id: Any, item: Optional[dict]):
+            try:
+                if item is None:
+                    raise ValueError("An input line must be a JSON object")
+                messages = _item_messages(item)
+            except ValueError as e:
+                result = GenerationResult(error=f"{type(e).__name__}: {e}")
+            else:
+                result = await llm.a_generate_result(messages, schema)
+            stats.completed += 1
+            stats.errors += result.error is not None
+            stats.total_tokens += result.total_tokens
+            output_value = result.output
+            if isinstance(output_value, BaseModel):
+                output_value = output_value.model_dump(mode="json")
+            record = {
+                "id": item_id,
+                "index": index,
+                "output": output_value,
+                "error": result.error,
+                "total_tokens": result.total_tokens,
+            }
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+
+        in_flight: set[asyncio.Task] = set()
+        try:
+            for index, line in enumerate(input_file):
+                if not line.strip():
+                    continue
+                item = _parse_item(line)
+                item_id = item.get("id") if item is not None else None
+                if item_id is None:
+                    item_id = index
+                if _id_key(item_id) in done:
+                    stats.skipped += 1
+                    continue
+                if len(in_flight) >= concurrency:
+                    finished, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    _raise_failed(finished)
+                in_flight.add(asyncio.create_task(process(index, item_id, item)))
+
+                now = time.monotonic()
+                if now - last_report >= progress_every_seconds:
+                    stats.elapsed_seconds = now - start_time
+                    logger.info(f"Bulk inference progress: {stats.summary()}")
+                    last_report = now
+            if in_flight:
+                finished, in_flight = await asyncio.wait(in_flight)
+                _raise_failed(finished)
+        finally:
+            # a failed run stops the requests still in flight before closing the output
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    stats.elapsed_seconds = time.monotonic() - start_time
+    return stats
+
+
+def _raise_failed(tasks: set[asyncio.Task]):
+    """Fail the run if processing an item raised, e.g. because the output can't be written.
+
+    Provider errors don't get here: they are written to the output as the item's error.
+    """
+    for task in tasks:
+        task.result()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL file of {id, prompt | messages} items")
+    parser.add_argument("output", type=Path, help="JSONL file the results are appended to")
+    parser.add_argument("--schema", help="pydantic model of the outputs, as module:Class")
+    parser.add_argument("--concurrency", type=int, default=16, help="max requests in flight")
+    parser.add_argument(
+        "--retry-errors", action="store_true", help="send again the items that failed before"
+    )
+    args = parser.parse_args(argv)
+
+    llm = InferenceLLMConfig(
+        model_name=settings.INFERENCE_DEPLOYMENT_NAME,
+        api_key=settings.INFERENCE_API_KEY,
+        base_url=settings.INFERENCE_BASE_URL,
+        api_version=settings.INFERENCE_API_VERSION,
+        requests_per_minute=settings.INFERENCE_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.INFERENCE_TOKENS_PER_MINUTE,
+        max_retries=settings.INFERENCE_MAX_RETRIES,
+        deadline_seconds=settings.INFERENCE_DEADLINE_SECONDS,
+    )
+    schema = load_schema(args.schema) if args.schema else None
+    stats = asyncio.run(
+        a_run_bulk_inference(
+            llm, args.input, args.output, schema, args.concurrency, retry_errors=args.retry_errors
+        )
+    )
+    logger.info(f"Bulk inference done: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,78 @@
+import importlib
 import random
-import numpy as np
-import torch
+import threading
+from types import ModuleType
+from typing import Callable, Optional
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported when one of its attributes is first used.
+
+    Heavy dependencies (litellm, instructor, numpy) are referenced through lazy modules so that
+    importing the application doesn't pay for them: they load when the first request needs them,
+    or while the LLM clients are built in the background at startup.
+    """
+
+    def __init__(self, name: str, on_import: Optional[Callable[[ModuleType], None]] = None):
+        self._name = name
+        self._on_import = on_import
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                module = importlib.import_module(self._name)
+                if self._on_import is not None:
+                    self._on_import(module)
+                self._module = module
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        """Attribute of the module, imported on first use (the proxy's own are found first)."""
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        """Name of the module and whether it was imported."""
+        state = "imported" if self._module is not None else "not imported yet"
+        return f"<lazy module {self._name!r}, {state}>"
+
+
+def _configure_litellm(module: ModuleType):
+    module.suppress_debug_info = True
+
+
+litellm = LazyModule("litellm", on_import=_configure_litellm)
+instructor = LazyModule("instructor")
+numpy = LazyModule("numpy")
 
 
 def set_seed(seed_value: int):
     """Sets the seed for torch, random, and numpy for reproducibility.
 
-    This is called if a non-zero seed is provided for generation.
+    This is called if a non-zero seed is provided for generation. torch is an optional extra, it is
+    only seeded when installed.
     """
+    import numpy as np
+
+    random.seed(seed_value)
+    np.random.seed(seed_value)
+    try:
+        import torch
+    except ImportError:
+        return
     torch.manual_seed(seed_value)
     if torch.cuda.is_available():
         torch.cuda.manual_seed(seed_value)
         torch.cuda.manual_seed_all(seed_value)  # if using multi-GPU
-    random.seed(seed_value)
-    np.random.seed(seed_value)
 
 
 def get_device_type():
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
     return (
         "cuda"
         if torch.cuda.is_available()
@@ -0,0 +1,118 @@
+"""Asynchronous client of the backend API, shared by all the users of the frontend."""
+
+import json
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from genai_template_frontend.frontend_settings import logger, settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_backend_client(base_url: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+    """HTTP client of the backend keeping a pool of keep-alive connections.
+
+    The client's cookie jar rejects every cookie: it is shared by all the users, whose backend
+    sessions are kept apart by ``BackendSession`` instead.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.BACKEND_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.BACKEND_KEEPALIVE_SECONDS,
+    )
+    timeout = httpx.Timeout(
+        settings.BACKEND_TIMEOUT_SECONDS, connect=settings.BACKEND_CONNECT_TIMEOUT_SECONDS
+    )
+    return httpx.AsyncClient(
+        base_url=base_url or settings.BACKEND_URL,
+        limits=limits,
+        timeout=timeout,
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        **kwargs,
+    )
+
+
+async def start_backend_client():
+    """Open the shared client, on application startup."""
+    global _client
+    if _client is None:
+        _client = create_backend_client()
+        logger.info(f"Backend client connected to {settings.BACKEND_URL}")
+
+
+async def stop_backend_client():
+    """Close the shared client and its connections, on application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_backend_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("The backend client is not started, call start_backend_client() first")
+    return _client
+
+
+class BackendSession:
+    """Requests to the backend on behalf of one user, who keeps their own backend session.
+
+    The cookies set by the backend (its session cookie holding the conversation) are stored here
+    and sent back with this user's requests only.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+        self.cookies: dict[str, str] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_backend_client()
+
+    def _headers(self) -> dict[str, str]:
+        if not self.cookies:
+            return {}
+        return {"Cookie": "; ".join(f"{name}={value}" for name, value in self.cookies.items())}
+
+    def _keep_cookies(self, response: httpx.Response):
+        self.cookies.update(response.cookies.items())
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = await self.client.request(method, path, headers=self._headers(), **kwargs)
+        self._keep_cookies(response)
+        return response
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Send a request whose response body is read as it arrives.
+
+        Leaving the context closes the connection, which stops the backend's generation.
+        """
+        async with self.client.stream(method, path, headers=self._headers(), **kwargs) as response:
+            self._keep_cookies(response)
+            yield response
+
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[tuple[str, dict]]:
+    """Server-Sent-Events of a streamed response, as ``(event name, JSON data)`` pairs.
+
+    Events without a name are named ``message``, as browsers do.
+    """
+    event, data_lines = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line.removeprefix("event:").strip()
+        elif line.startswith("data:"):
+            data_lines.append(line.removeprefix("data:").removeprefix(" "))
+    if data_lines:
+        yield event, json.loads("\n".join(data_lines))
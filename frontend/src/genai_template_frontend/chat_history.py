@@ -0,0 +1,68 @@
+"""Messages of a chat page, bounded, and the window of them rendered on the page."""
+
+import datetime
+from collections import deque
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class ChatMessage(BaseModel):
+    id: int
+    role: Literal["user", "bot"]
+    text: str
+    timestamp: str
+
+
+class ChatHistory:
+    """The latest ``max_messages`` messages of a chat, of which the latest ones are rendered.
+
+    At most ``render_window`` messages are rendered, plus those the user asked for by loading
+    earlier messages. Message ids are consecutive, so the rendered messages are those from
+    ``first_rendered_id`` on.
+    """
+
+    def __init__(self, max_messages: int = 1000, render_window: int = 50):
+        if max_messages <= 0 or render_window <= 0:
+            raise ValueError("max_messages and render_window must be positive")
+        self.messages: deque[ChatMessage] = deque(maxlen=max_messages)
+        self.render_window = render_window
+        self.render_limit = render_window
+        self.first_rendered_id = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        """Number of messages kept."""
+        return len(self.messages)
+
+    def add(self, role: Literal["user", "bot"], text: str) -> tuple[ChatMessage, list[int]]:
+        """Add a message, and return it with the ids of the messages to stop rendering."""
+        message = ChatMessage(
+            id=self._next_id,
+            role=role,
+            text=text,
+            timestamp=datetime.datetime.now().strftime("%H:%M"),
+        )
+        self._next_id += 1
+        self.messages.append(message)
+
+        unrendered = []
+        while self._next_id - self.first_rendered_id > self.render_limit:
+            unrendered.append(self.first_rendered_id)
+            self.first_rendered_id += 1
+        return message, unrendered
+
+    def has_earlier(self) -> bool:
+        """Whether messages older than the rendered ones are still kept."""
+        return bool(self.messages) and self.messages[0].id < self.first_rendered_id
+
+    def load_earlier(self) -> list[ChatMessage]:
+        """Up to ``render_window`` messages preceding the rendered ones, oldest first, to render."""
+        if not self.has_earlier():
+            return []
+        oldest_id = self.messages[0].id
+        start_id = max(oldest_id, self.first_rendered_id - self.render_window)
+        earlier = [self.messages[i - oldest_id] for i in range(start_id, self.first_rendered_id)]
+        self.render_limit += len(earlier)
+        self.first_rendered_id = start_id
+        return earlier
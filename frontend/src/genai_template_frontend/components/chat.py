@@ -1,18 +1,93 @@
 import asyncio
-import datetime
+import time
 
-import requests
+import httpx
 from nicegui import ui
 
-from genai_template_frontend.utils import settings, logger
+from genai_template_frontend.backend_client import BackendSession, iter_sse_events
+from genai_template_frontend.chat_history import ChatHistory, ChatMessage
+from genai_template_frontend.frontend_settings import logger, settings
+
+AVATARS = {
+    "user": "https://robohash.org/user?set=set2",
+    "bot": "https://robohash.org/bot?set=set2",
+}
 
 
 class Chat:
+    """Chat page component.
+
+    Messages are rendered one element each, added, patched and removed individually as the
+    conversation goes, so that a new message costs the same however long the chat is. Only the
+    latest ones are rendered; earlier ones are rendered on demand.
+
+    Replies are streamed: the bot message is patched with the tokens received, at most every
+    ``CHAT_STREAM_UPDATE_SECONDS``, until the reply is complete or the user stops it.
+    """
+
     def __init__(self):
-        self.messages = []
+        self.history = ChatHistory(
+            max_messages=settings.CHAT_MAX_MESSAGES, render_window=settings.CHAT_RENDER_WINDOW
+        )
         self.text_input = None
         self.scroll_area = None
-        self._render_chat_messages_fn = None  # To hold the refreshable function instance
+        self.messages_container = None
+        self.empty_label = None
+        self.load_earlier_button = None
+        self.stop_button = None
+        # rendered messages by id, and the label holding their text
+        self._rendered: dict[int, tuple[ui.chat_message, ui.label]] = {}
+        self.backend = BackendSession()  # the user's own backend session, over the shared client
+        self._pending_requests: set[asyncio.Task] = set()
+
+    def _cancel_pending_requests(self):
+        """Stop the replies being generated, when the user stops them or leaves the page."""
+        for task in self._pending_requests:
+            task.cancel()
+
+    async def _stream_reply(self, user_text: str, message: ChatMessage):
+        """Stream the reply to ``user_text`` into ``message``, batching the updates of the page."""
+        deltas = []
+        last_update = time.monotonic()
+        try:
+            async with self.backend.stream(
+                "POST", "/api/chat/stream", json={"message": user_text}
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()  # Raise an exception for bad status codes
+                async for event, data in iter_sse_events(response):
+                    if event == "error":
+                        logger.error(f"The backend failed to generate the reply: {data}")
+                        deltas.append("\nError: The reply was interrupted.")
+                        break
+                    if event == "message" and data.get("delta"):
+                        deltas.append(data["delta"])
+                        if time.monotonic() - last_update >= settings.CHAT_STREAM_UPDATE_SECONDS:
+                            self._update_message(message, "".join(deltas))
+                            last_update = time.monotonic()
+            text = "".join(deltas) or "Sorry, I could not get a response."
+        except asyncio.CancelledError:
+            self._update_message(message, "".join(deltas) + " [stopped]")
+            raise
+        except httpx.TimeoutException as e:
+            logger.error(f"The backend did not answer in time: {e}")
+            text = "".join(deltas) + "\nError: The backend took too long to answer."
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (429, 503):
+                # rejected by the admission control of the backend, not failed
+                logger.warning(f"The backend is busy: {e}")
+                retry_after = e.response.headers.get("Retry-After")
+                text = "Error: The server is busy, please retry " + (
+                    f"in {retry_after} seconds." if retry_after else "shortly."
+                )
+            else:
+                logger.error(f"The backend failed to answer: {e}")
+                text = "Error: The backend failed to answer."
+        except httpx.HTTPError as e:
+            logger.error(f"Could not connect to backend: {e}")
+            text = "Error: Could not connect to the backend."
+        self._update_message(message, text.strip())
 
     async def _send_message_and_reply(self):
         user_text = self.text_input.value.strip()
@@ -20,38 +95,66 @@ class Chat:
             ui.notify("Message cannot be empty!", type="warning")
             return
 
-        self.messages.append(
-            {
-                "role": "user",
-                "text": user_text,
-                "timestamp": datetime.datetime.now().strftime("%H:%M"),
-            }
-        )
         self.text_input.value = ""
-        self._render_chat_messages_fn.refresh()
+        self._add_message("user", user_text)
+        # shown until the first tokens arrive, then patched in place
+        bot_message = self._add_message("bot", "...")
 
-        await asyncio.sleep(0.5)  # Simulate bot thinking
+        request = asyncio.create_task(self._stream_reply(user_text, bot_message))
+        self._pending_requests.add(request)
+        self.stop_button.set_visibility(True)
         try:
-            response = requests.post(
-                f"{settings.BACKEND_URL}/api/chat", json={"message": user_text}
-            )
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-            bot_reply_text = response.json().get("response", "Sorry, I could not get a response.")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Could not connect to backend: {e}")
-            bot_reply_text = "Error: Could not connect to the backend."
-
-        bot_timestamp = datetime.datetime.now().strftime("%H:%M")
-        self.messages.append(
-            {
-                "role": "bot",
-                "text": bot_reply_text,
-                "timestamp": bot_timestamp,
-            }
-        )
-        self._render_chat_messages_fn.refresh()
+            await request
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise  # this handler is cancelled, not only its request
+            logger.debug("Reply stopped")
+        finally:
+            self._pending_requests.discard(request)
+            self.stop_button.set_visibility(bool(self._pending_requests))
+
+    def _add_message(self, role: str, text: str) -> ChatMessage:
+        """Add a message to the chat and render it, un-rendering the oldest past the window."""
+        message, unrendered = self.history.add(role, text)
+        self._render_message(message)
+        for message_id in unrendered:
+            self._unrender_message(message_id)
+        self.empty_label.set_visibility(False)
+        self.load_earlier_button.set_visibility(self.history.has_earlier())
+        self.scroll_area.scroll_to(percent=1.0)
+        return message
+
+    def _render_message(self, message: ChatMessage, index: int = -1):
+        with self.messages_container:
+            with ui.chat_message(
+                sent=message.role == "user", stamp=message.timestamp, avatar=AVATARS[message.role]
+            ) as element:
+                label = ui.label(message.text).classes("whitespace-pre-wrap")
+        if index >= 0:
+            element.move(target_index=index)
+        self._rendered[message.id] = (element, label)
+
+    def _update_message(self, message: ChatMessage, text: str):
+        """Patch the text of a message, in place if it is rendered."""
+        message.text = text
+        rendered = self._rendered.get(message.id)
+        if rendered is not None:
+            rendered[1].set_text(text)
+            self.scroll_area.scroll_to(percent=1.0)
+
+    def _unrender_message(self, message_id: int):
+        rendered = self._rendered.pop(message_id, None)
+        if rendered is not None:
+            rendered[0].delete()
+
+    def _load_earlier(self):
+        """Render the page of messages preceding the rendered ones, above them."""
+        for index, message in enumerate(self.history.load_earlier()):
+            self._render_message(message, index=index)
+        self.load_earlier_button.set_visibility(self.history.has_earlier())
 
     def build(self):
+        ui.context.client.on_disconnect(self._cancel_pending_requests)
         with ui.column().classes("w-full max-w-2xl mx-auto"):
             # Chat interface container (card)
             with ui.card().classes("w-full max-w-lg shadow-lg rounded-borders"):
@@ -60,8 +163,17 @@ class Chat:
                     "flex-grow h-96 p-4 border rounded-borders bg-grey-1 q-mb-md"
                 )
                 with self.scroll_area:
-                    # This column will be populated by the refreshable function
-                    messages_ui_container = ui.column().classes("w-full items-stretch space-y-2")
+                    self.load_earlier_button = (
+                        ui.button("Load earlier messages", on_click=self._load_earlier)
+                        .props("flat dense no-caps")
+                        .classes("self-center")
+                    )
+                    self.load_earlier_button.set_visibility(False)
+                    self.empty_label = ui.label("No messages yet. Say something!").classes(
+                        "text-center text-grey-6 q-pa-md"
+                    )
+                    # one element per rendered message, oldest first
+                    self.messages_container = ui.column().classes("w-full items-stretch space-y-2")
 
                 # Input area (row with input and button)
                 with ui.row().classes("w-full items-center q-px-sm q-pb-sm"):
@@ -74,25 +186,8 @@ class Chat:
                     ui.button(icon="send", on_click=self._send_message_and_reply).props(
                         "flat round dense color=primary"
                     )
-
-                # Define the refreshable function for rendering messages
-                @ui.refreshable
-                def render_chat_messages_impl():
-                    messages_ui_container.clear()
-                    with messages_ui_container:
-                        if not self.messages:
-                            ui.label("No messages yet. Say something!").classes(
-                                "text-center text-grey-6 q-pa-md"
-                            )
-                        for msg_data in self.messages:
-                            with ui.chat_message(
-                                sent=msg_data["role"] == "user",
-                                stamp=msg_data["timestamp"],
-                                avatar="https://robohash.org/user?set=set2"
-                                if msg_data["role"] == "user"
-                                else "https://robohash.org/bot?set=set2",
-                            ):
-                                ui.html(msg_data["text"])
-
-                self._render_chat_messages_fn = render_chat_messages_impl  # Store the function
-                self._render_chat_messages_fn()  # Initial render
+                    # stops the replies being generated, shown while there are some
+                    self.stop_button = ui.button(
+                        icon="stop", on_click=self._cancel_pending_requests
+                    ).props("flat round dense color=negative")
+                    self.stop_button.set_visibility(False)
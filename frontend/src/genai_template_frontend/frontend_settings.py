@@ -19,9 +19,22 @@ class APIEnvironmentVariables(BaseEnvironmentSettings):
     """API configuration for frontend."""
 
     BACKEND_URL: str = "http://localhost:8000"
+    BACKEND_TIMEOUT_SECONDS: float = 120.0  # a reply can take a while to generate
+    BACKEND_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    BACKEND_MAX_CONNECTIONS: int = 100
+    BACKEND_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    BACKEND_KEEPALIVE_SECONDS: float = 30.0
 
 
-class ApplicationSettings(APIEnvironmentVariables):
+class ChatEnvironmentVariables(BaseEnvironmentSettings):
+    """Chat page configuration."""
+
+    CHAT_MAX_MESSAGES: int = 1000  # kept per page, the oldest are forgotten
+    CHAT_RENDER_WINDOW: int = 50  # rendered at once, earlier ones are loaded on demand
+    CHAT_STREAM_UPDATE_SECONDS: float = 0.05  # minimum interval between updates of a reply
+
+
+class ApplicationSettings(APIEnvironmentVariables, ChatEnvironmentVariables):
     """Configuration for genai-template-frontend.
 
     Values are read from environment variables and optionally
@@ -3,8 +3,13 @@
 from nicegui import ui, app
 from starlette.responses import FileResponse, PlainTextResponse
 
+from genai_template_frontend.backend_client import start_backend_client, stop_backend_client
 from genai_template_frontend.components.chat import Chat
 
+# one pool of connections to the backend, shared by all the users
+app.on_startup(start_backend_client)
+app.on_shutdown(stop_backend_client)
+
 
 @app.get("/favicon.ico")
 async def favicon():
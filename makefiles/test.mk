@@ -14,3 +14,11 @@ test-inference-llm: ## Test LLM inference endpoint
 	# llm that generate answers (used in chat, rag and promptfoo)
 	@echo "${YELLOW}=========> Testing LLM client...${NC}"
 	@$(UV) run pytest tests/test_llm_endpoint.py -k test_inference_llm --disable-warnings
+
+bench-startup: ## Measure import time and time to first 200 of the backend and frontend
+	@echo "${YELLOW}Measuring startup time...${NC}"
+	@$(UV) run python scripts/bench_startup.py --import-budget 2 --first-200-budget 15 $(ARGS)
+
+bench-load: ## Load test the LLM clients and the chat API against a local stub provider
+	@echo "${YELLOW}Running the load test scenarios...${NC}"
+	@$(UV) run python -m genai_template_backend.benchmark run $(ARGS)
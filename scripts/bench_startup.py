@@ -0,0 +1,176 @@
+"""Cold start benchmark of the backend and the frontend, failing when a budget is exceeded.
+
+For each target, measures:
+
+* import time: ``python -X importtime -c "import <module>"``, with the heaviest imports;
+* time to first 200: from spawning the server to the first successful response, which for the
+  backend includes building the LLM clients in the lifespan.
+
+Usage::
+
+    uv run python scripts/bench_startup.py --target backend --runs 3
+    uv run python scripts/bench_startup.py --import-budget 1.5 --first-200-budget 10
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "backend": {
+        "module": "genai_template_backend.app",
+        "command": [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "genai_template_backend.app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            "{port}",
+        ],
+        "first_200_path": "/",
+        "cwd": ROOT,
+    },
+    "frontend": {
+        "module": "genai_template_frontend.main",
+        "command": [sys.executable, "src/genai_template_frontend/main.py"],
+        # NiceGUI's default port
+        "port": 8080,
+        "first_200_path": "/robots.txt",
+        "cwd": ROOT / "frontend",
+    },
+}
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(module: str) -> tuple[float, list[tuple[str, float]]]:
+    """Import time of ``module`` in a fresh interpreter, and its heaviest direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    total, packages = 0.0, {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, depth, name = int(match[2]) / 1e6, len(match[3]) // 2, match[4]
+        if name == module:
+            total = cumulative
+        elif depth <= 1:
+            # top-level packages imported along the way, whoever imported them first
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + cumulative
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:10]
+    return total, heaviest
+
+
+def _get_status(url: str) -> int | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        # not listening yet
+        return None
+
+
+def measure_first_200(target: dict, timeout: float) -> float:
+    """Seconds from spawning the server to its first 200."""
+    port = target.get("port") or _free_port()
+    command = [part.format(port=port) for part in target["command"]]
+    url = f"http://127.0.0.1:{port}{target['first_200_path']}"
+
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=target["cwd"],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        while _get_status(url) != 200:
+            if process.poll() is not None:
+                raise RuntimeError(f"{command} exited:\n{process.stderr.read()[-2000:]}")
+            if time.perf_counter() - start_time > timeout:
+                raise TimeoutError(f"{command} didn't answer within {timeout}s")
+            time.sleep(0.02)
+        return time.perf_counter() - start_time
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=[*TARGETS, "all"], default="all")
+    parser.add_argument("--runs", type=int, default=3, help="runs per measurement, best is kept")
+    parser.add_argument(
+        "--import-budget", type=float, default=None, help="maximum import time in seconds"
+    )
+    parser.add_argument(
+        "--first-200-budget", type=float, default=None, help="maximum time to first 200 in seconds"
+    )
+    parser.add_argument("--timeout", type=float, default=120, help="server start timeout")
+    parser.add_argument("--json", type=Path, default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    results, failures = {}, []
+    for name in TARGETS if args.target == "all" else [args.target]:
+        target = TARGETS[name]
+        try:
+            imports = [measure_import(target["module"]) for _ in range(args.runs)]
+            import_seconds, heaviest = min(imports, key=lambda result: result[0])
+            first_200 = min(measure_first_200(target, args.timeout) for _ in range(args.runs))
+        except (RuntimeError, TimeoutError) as e:
+            failures.append(f"{name} didn't start: {e}")
+            continue
+        results[name] = {"import_seconds": import_seconds, "first_200_seconds": first_200}
+
+        print(f"{name}: import {import_seconds:.3f}s, first 200 {first_200:.3f}s")
+        for package, seconds in heaviest:
+            print(f"    {package:<30}{seconds:>8.3f}s")
+
+        if args.import_budget is not None and import_seconds > args.import_budget:
+            failures.append(f"{name} import {import_seconds:.3f}s > {args.import_budget}s")
+        if args.first_200_budget is not None and first_200 > args.first_200_budget:
+            failures.append(f"{name} first 200 {first_200:.3f}s > {args.first_200_budget}s")
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f"Startup budget exceeded: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Micro-benchmark of the per-call overhead of the structured output path.
+
+Compares, for a response listing extracted entities, the previous per-call work with the current
+one:
+
+* parsing: ``ast.literal_eval`` then ``schema(**data)``, versus ``schema.model_validate_json``;
+* response format: the JSON schema built from the pydantic model on every call, versus cached;
+* instructor fallback: a client built on every call, versus one client per mode.
+
+Usage::
+
+    uv run python scripts/bench_structured_output.py --entities 50
+"""
+
+import argparse
+import ast
+import json
+import timeit
+
+import instructor
+import litellm
+from litellm.utils import type_to_response_format_param
+from pydantic import BaseModel
+
+from genai_template_backend.api.structured_output import (
+    instructor_client,
+    parse_json_output,
+    response_format,
+)
+
+
+class Entity(BaseModel):
+    name: str
+    kind: str
+    confidence: float
+    aliases: list[str]
+
+
+class Extraction(BaseModel):
+    entities: list[Entity]
+
+
+def _content(n_entities: int, json_literals: bool) -> str:
+    entities = [
+        {
+            "name": f"Entity {i}",
+            "kind": "organization" if i % 2 else "person",
+            "confidence": 0.5 + i / (2 * n_entities),
+            "aliases": [f"E{i}", f"Ent-{i}"],
+        }
+        for i in range(n_entities)
+    ]
+    if json_literals:
+        # valid JSON that ast.literal_eval can't parse
+        entities[0]["aliases"] = []
+        return json.dumps({"entities": entities, "complete": True, "source": None})
+    return json.dumps({"entities": entities})
+
+
+def _per_call_microseconds(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=50, help="entities in the response")
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    content = _content(args.entities, json_literals=False)
+    number = args.number
+    results = {
+        "parsing": (
+            _per_call_microseconds(lambda: Extraction(**ast.literal_eval(content)), number),
+            _per_call_microseconds(lambda: parse_json_output(Extraction, content), number),
+        ),
+        "response_format": (
+            _per_call_microseconds(lambda: type_to_response_format_param(Extraction), number),
+            _per_call_microseconds(lambda: response_format(Extraction), number),
+        ),
+        "instructor_client": (
+            _per_call_microseconds(
+                lambda: instructor.from_litellm(litellm.acompletion, mode=instructor.Mode.JSON),
+                max(number // 10, 1),
+            ),
+            _per_call_microseconds(lambda: instructor_client(instructor.Mode.JSON), number),
+        ),
+    }
+
+    print(f"{'step':<20}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for step, (before, after) in results.items():
+        print(f"{step:<20}{before:>14.1f}{after:>14.1f}{before / after:>9.1f}x")
+
+    try:
+        ast.literal_eval(_content(args.entities, json_literals=True))
+    except ValueError:
+        print("ast.literal_eval rejects JSON with true/false/null, model_validate_json doesn't:")
+    print(parse_json_output(Extraction, _content(args.entities, json_literals=True)).entities[0])
+
+
+if __name__ == "__main__":
+    main()
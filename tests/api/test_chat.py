@@ -1,14 +1,23 @@
+import asyncio
+import json
+import time
+
+import httpx
+import litellm
 import pytest
 from fastapi.testclient import TestClient
 
+from genai_template_backend.api.admission import AdmissionController
+from genai_template_backend.api.routes import chat
 from genai_template_backend.app import app
 from tests.conftest import is_llm_configured
 
 
 @pytest.fixture
 def client():
-    """Create a TestClient instance for the FastAPI app."""
-    return TestClient(app)
+    """Create a TestClient instance for the FastAPI app, running its lifespan."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.mark.integration
@@ -29,3 +38,183 @@ def test_post_chat_message_integration(client):
     assert isinstance(response_data["response"], str)
     assert len(response_data["response"]) > 0
     assert not response_data["response"].lower().startswith("error")
+
+
+def test_post_chat_message_stream(client, fake_llm_provider):
+    """Test that /api/chat/stream sends token deltas followed by a usage frame."""
+    fake_llm_provider("Hello streaming world")
+
+    with client.stream("POST", "/api/chat/stream", json={"message": "Hi"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = "".join(response.iter_text()).strip().split("\n\n")
+
+    deltas = [json.loads(frame.removeprefix("data: ")) for frame in frames[:-1]]
+    assert "".join(delta["delta"] for delta in deltas) == "Hello streaming world"
+
+    event, data = frames[-1].split("\n")
+    assert event == "event: usage"
+    usage = json.loads(data.removeprefix("data: "))
+    assert usage["completion_tokens"] > 0
+    assert 0 <= usage["time_to_first_token"] <= usage["latency"]
+
+
+@pytest.mark.asyncio
+async def test_post_chat_message_does_not_block_event_loop(fake_llm_provider):
+    """Test that concurrent /api/chat calls overlap instead of running one after the other."""
+    delay, n_requests = 0.5, 8
+    fake_llm_provider("Hello!", delay=delay)
+
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(transport=transport, base_url="http://test") as async_client,
+    ):
+        start_time = time.perf_counter()
+        responses = await asyncio.gather(
+            *(async_client.post("/api/chat", json={"message": "Hi"}) for _ in range(n_requests))
+        )
+        elapsed = time.perf_counter() - start_time
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json()["response"] == "Hello!" for response in responses)
+    assert elapsed < 2 * delay
+
+
+def test_post_chat_message_rejects_when_overloaded(client, fake_llm_provider, monkeypatch):
+    """Test that /api/chat answers 429 with a Retry-After when the queue is full."""
+    monkeypatch.setattr(chat.admission, "in_flight", chat.admission.max_concurrent)
+    monkeypatch.setattr(chat.admission, "max_queue_size", 0)
+
+    response = client.post("/api/chat", json={"message": "Hi"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/api/chat/admission").json()["rejected_queue_full"] >= 1
+
+
+def test_post_chat_batch(client, fake_llm_provider):
+    """Test that /api/chat/batch answers every message, in order."""
+    fake_llm_provider("Batched hello")
+
+    response = client.post("/api/chat/batch", json={"messages": ["Hi", "Hello", "Hey"]})
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [{"response": "Batched hello", "error": None}] * 3
+
+
+def test_post_chat_batch_respects_the_concurrency_cap(client, fake_llm_provider, monkeypatch):
+    """Test that each generation of a batch takes its own admission slot."""
+    fake_llm_provider("Batched hello", delay=0.05)
+    controller = AdmissionController(max_concurrent=2, max_queue_size=64, max_queue_seconds=10)
+    monkeypatch.setattr(chat, "admission", controller)
+    in_flight, peak = 0, 0
+    acompletion = litellm.acompletion
+
+    async def counting_acompletion(*args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await acompletion(*args, **kwargs)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(litellm, "acompletion", counting_acompletion)
+
+    response = client.post("/api/chat/batch", json={"messages": [f"Hi {i}" for i in range(6)]})
+
+    assert response.status_code == 200
+    assert all(result["response"] == "Batched hello" for result in response.json()["results"])
+    assert peak == 2
+    assert controller.admitted == 6 and controller.in_flight == 0
+
+
+def test_post_chat_batch_size_is_capped(client, fake_llm_provider):
+    """Test that empty and oversized batches are rejected."""
+    assert client.post("/api/chat/batch", json={"messages": []}).status_code == 422
+    too_many = ["Hi"] * (chat.settings.CHAT_BATCH_MAX_SIZE + 1)
+    assert client.post("/api/chat/batch", json={"messages": too_many}).status_code == 422
+
+
+def test_metrics_endpoint(client, fake_llm_provider):
+    """Test that /metrics exposes request latencies by route, LLM metrics and collectors."""
+    client.post("/api/chat", json={"message": "Hi"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/api/chat",status="200"}' in text
+    )
+    assert "llm_request_duration_seconds_bucket{" in text
+    assert "genai_chat_admission_in_flight" in text
+
+
+def test_usage_is_accounted_per_route_and_session(client, fake_llm_provider):
+    """Test that the usage of chat calls is attributed to the route and the caller's session."""
+    assert client.get("/api/usage/session").json()["calls"] == 0
+
+    client.post("/api/chat", json={"message": "Hi"})
+    client.post("/api/chat", json={"message": "Hello"})
+
+    session_usage = client.get("/api/usage/session").json()
+    assert session_usage["calls"] == 2
+    assert session_usage["completion_tokens"] > 0
+    usage = client.get("/api/usage").json()
+    assert usage["by_route"]["/api/chat"]["calls"] >= 2
+
+
+def test_chat_keeps_the_session_conversation(client, fake_llm_provider, monkeypatch):
+    """Test that each message is sent with the session's history, streamed replies included."""
+    sent = []
+    acompletion = litellm.acompletion
+
+    async def recording_acompletion(*args, messages, **kwargs):
+        sent.append(messages)
+        return await acompletion(*args, messages=messages, **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", recording_acompletion)
+    reply = "Hello from the fake provider!"
+
+    client.post("/api/chat", json={"message": "My name is Ada."})
+    with client.stream("POST", "/api/chat/stream", json={"message": "Nice to meet you."}) as r:
+        r.read()
+    client.post("/api/chat", json={"message": "What is my name?"})
+
+    assert [message["content"] for message in sent[-1]] == [
+        "My name is Ada.",
+        reply,
+        "Nice to meet you.",
+        reply,
+        "What is my name?",
+    ]
+    history = client.get("/api/chat/history").json()["messages"]
+    assert len(history) == 6
+
+    # another session starts from scratch
+    with TestClient(app) as other_client:
+        assert other_client.get("/api/chat/history").json()["messages"] == []
+
+    assert client.delete("/api/chat/history").status_code == 204
+    assert client.get("/api/chat/history").json()["messages"] == []
+
+
+def test_post_chat_regenerate_replaces_the_latest_reply(client, fake_llm_provider):
+    """Test that the latest reply is generated again and replaced in the conversation."""
+    assert client.post("/api/chat/regenerate").status_code == 404
+
+    fake_llm_provider("wrong reply")
+    client.post("/api/chat", json={"message": "Hi"})
+    fake_llm_provider("better reply")
+
+    response = client.post("/api/chat/regenerate")
+
+    assert response.status_code == 200
+    assert response.json()["response"] == "better reply"
+    assert client.get("/api/chat/history").json()["messages"] == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "better reply"},
+    ]
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from genai_template_backend.api import llm as llm_module
+from genai_template_backend.api.clients import LLMRegistry
+from genai_template_backend.api.deployment_router import LLMRouter
+from genai_template_backend.api.llm import EmbeddingLLMConfig, InferenceLLMConfig
+from genai_template_backend.app import app
+from genai_template_backend.backend_settings import ApplicationSettings
+
+
+@pytest.mark.asyncio
+async def test_registry_from_settings(monkeypatch):
+    """Test that the registry builds both clients from the settings."""
+    monkeypatch.setenv("EMBEDDINGS_DEPLOYMENT_NAME", "ollama/all-minilm:l6-v2")
+    monkeypatch.setenv("EMBEDDINGS_BASE_URL", "http://localhost:11434")
+    settings = ApplicationSettings()
+
+    registry = await LLMRegistry.a_from_settings(settings)
+
+    assert isinstance(registry.inference, InferenceLLMConfig)
+    assert registry.inference.model_name == settings.INFERENCE_DEPLOYMENT_NAME
+    assert isinstance(registry.embedding, EmbeddingLLMConfig)
+    assert registry.embedding.model_name == "ollama/all-minilm:l6-v2"
+
+
+@pytest.mark.asyncio
+async def test_registry_without_embedding_model(monkeypatch):
+    """Test that the embedding client is optional."""
+    monkeypatch.setenv("EMBEDDINGS_DEPLOYMENT_NAME", "")
+    registry = await LLMRegistry.a_from_settings(ApplicationSettings())
+
+    assert registry.embedding is None
+
+
+def test_chat_reuses_registry_client(fake_llm_provider, monkeypatch):
+    """Test that chat requests reuse the client built at startup instead of building new ones."""
+    model_lookups = []
+    monkeypatch.setattr(
+        llm_module, "supports_response_schema", lambda model: model_lookups.append(model)
+    )
+
+    with TestClient(app) as client:
+        lookups_at_startup = len(model_lookups)
+        for _ in range(3):
+            assert client.post("/api/chat", json={"message": "Hi"}).status_code == 200
+
+    assert lookups_at_startup > 0
+    assert len(model_lookups) == lookups_at_startup
+
+
+@pytest.mark.asyncio
+async def test_registry_routes_over_deployments(monkeypatch):
+    """Test that extra deployments turn the inference client into a router."""
+    monkeypatch.setenv(
+        "INFERENCE_DEPLOYMENTS",
+        '[{"model_name": "ollama/qwen3:0.6b", "base_url": "http://other:11434"},'
+        ' {"model_name": "ollama/qwen3:0.6b", "base_url": "http://ollama:11434", "fallback": true}]',
+    )
+    monkeypatch.setenv("INFERENCE_DEADLINE_SECONDS", "30")
+    registry = await LLMRegistry.a_from_settings(ApplicationSettings())
+
+    router = registry.inference
+    assert isinstance(router, LLMRouter)
+    assert [d.base_url for d in router.deployments] == [
+        ApplicationSettings().INFERENCE_BASE_URL,
+        "http://other:11434",
+    ]
+    assert [d.base_url for d in router.fallback_deployments] == ["http://ollama:11434"]
+    assert all(d.max_retries == 0 for d in router.deployments + router.fallback_deployments)
+    assert all(d.deadline_seconds == 30 for d in router.deployments + router.fallback_deployments)
@@ -1,3 +1,8 @@
+import asyncio
+import functools
+from types import SimpleNamespace
+
+import litellm
 import requests
 import pytest
 
@@ -20,3 +25,59 @@ skip_if_llm_not_configured = pytest.mark.skipif(
     not is_llm_configured(),
     reason=f"LLM endpoint not reachable at {settings.INFERENCE_BASE_URL}",
 )
+
+
+@pytest.fixture
+def fake_llm_provider(monkeypatch):
+    """Answer litellm completions locally using litellm's built-in mock provider.
+
+    Returns a function that can be called to change the mocked answer or add a delay (in seconds).
+    """
+    acompletion, completion = litellm.acompletion, litellm.completion
+
+    def configure(response: str = "Hello from the fake provider!", delay: float | None = None):
+        monkeypatch.setattr(
+            litellm,
+            "acompletion",
+            functools.partial(acompletion, mock_response=response, mock_delay=delay),
+        )
+        monkeypatch.setattr(
+            litellm,
+            "completion",
+            functools.partial(completion, mock_response=response, mock_delay=delay),
+        )
+
+    configure()
+    return configure
+
+
+def fake_vector(text: str) -> list[float]:
+    """Deterministic embedding returned by the fake embedding provider."""
+    return [float(len(text)), float(text.count("a")), 0.5]
+
+
+@pytest.fixture
+def fake_embedding_provider(monkeypatch):
+    """Answer embedding calls locally with :func:`fake_vector`.
+
+    Returns the list of inputs sent to the provider, one entry per call. Set its ``delay``
+    attribute to make async calls take that long (in seconds).
+    """
+    from genai_template_backend.api import llm as llm_module
+
+    class ProviderInputs(list):
+        delay = 0.0
+
+    inputs = ProviderInputs()
+
+    def fake_embedding(input, **kwargs):
+        inputs.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=fake_vector(t)) for t in input])
+
+    async def fake_aembedding(input, **kwargs):
+        await asyncio.sleep(inputs.delay)
+        return fake_embedding(input, **kwargs)
+
+    monkeypatch.setattr(llm_module, "embedding", fake_embedding)
+    monkeypatch.setattr(llm_module, "aembedding", fake_aembedding)
+    return inputs
@@ -0,0 +1,110 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import litellm
+import pytest
+
+from genai_template_backend.api import accounting
+from genai_template_backend.api.accounting import (
+    UsageLedger,
+    open_usage_sink,
+    usage_cost,
+    usage_ledger,
+)
+from genai_template_backend.api.llm import InferenceLLMConfig
+
+USAGE = SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+
+
+def test_usage_cost():
+    """Test that costs come from litellm's price list, and unknown models cost nothing."""
+    prompt_cost, completion_cost = litellm.cost_per_token(
+        model="gpt-4o-mini", prompt_tokens=1000, completion_tokens=500
+    )
+    assert usage_cost("gpt-4o-mini", "completion", 1000, 500) == pytest.approx(
+        prompt_cost + completion_cost
+    )
+    assert usage_cost("ollama/qwen3:0.6b", "completion", 1000, 500) == 0.0
+    assert usage_cost("unknown-provider/model", "completion", 1000, 500) == 0.0
+
+
+def test_ledger_aggregates_per_model_route_and_session():
+    """Test that calls are aggregated per model, and per route and session when known."""
+    ledger = UsageLedger(max_sessions=2)
+    ledger.record("gpt-4o-mini", "completion", USAGE)
+    for session in ("a", "b", "a", "c"):
+        token = accounting._request_scope.set(
+            {
+                "route": SimpleNamespace(path="/api/chat"),
+                "session": {accounting.SESSION_ID_KEY: session},
+            }
+        )
+        ledger.record("gpt-4o-mini", "completion", USAGE, outcome="error")
+        accounting._request_scope.reset(token)
+
+    summary = ledger.summary()
+
+    assert summary["totals"]["calls"] == 5
+    assert summary["totals"]["failed_calls"] == 4
+    assert summary["totals"]["prompt_tokens"] == 5000
+    assert summary["by_model"]["gpt-4o-mini"]["cost"] == pytest.approx(
+        5 * usage_cost("gpt-4o-mini", "completion", 1000, 500)
+    )
+    assert summary["by_route"]["/api/chat"]["calls"] == 4
+    # "b" was the least recently used session
+    assert list(ledger.by_session) == ["a", "c"]
+    assert ledger.session_usage("a").calls == 2
+    # session ids give access to the session, only their hashes are listed
+    assert set(summary["top_sessions"]) == {accounting.session_label(s) for s in ("a", "c")}
+    assert "a" not in summary["top_sessions"]
+
+
+@pytest.mark.parametrize("file_name", ["usage.jsonl", "usage.sqlite3"])
+def test_flush_to_sink(tmp_path, file_name):
+    """Test that records are buffered only with a sink, and written on flush."""
+    path = tmp_path / file_name
+    ledger = UsageLedger()
+    ledger.record("gpt-4o-mini", "completion", USAGE)
+    assert ledger.summary()["pending_records"] == 0
+
+    ledger.sink = open_usage_sink(path)
+    ledger.record("gpt-4o-mini", "completion", USAGE)
+    ledger.record("gpt-4o-mini", "embedding", USAGE, outcome="rate_limited")
+    assert ledger.flush() == 2
+    assert ledger.flush() == 0
+    ledger.close()
+
+    if path.suffix == ".jsonl":
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        outcomes = [row["outcome"] for row in rows]
+    else:
+        with sqlite3.connect(path) as connection:
+            outcomes = [row[0] for row in connection.execute("SELECT outcome FROM llm_usage")]
+    assert outcomes == ["success", "rate_limited"]
+
+
+def test_retried_attempts_are_accounted(monkeypatch):
+    """Test that rate-limited attempts are accounted along with the one that succeeds."""
+    usage_ledger.reset()
+    completion = litellm.completion
+    calls = []
+
+    def flaky_completion(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise litellm.exceptions.RateLimitError("slow down", "ollama", "ollama/qwen3:0.6b")
+        return completion(*args, mock_response="Hello", **kwargs)
+
+    monkeypatch.setattr(litellm, "completion", flaky_completion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b", api_key="t", base_url="http://localhost:11434"
+    )
+    monkeypatch.setattr(llm.rate_limiter, "backoff", lambda error, attempt: 0.0)
+
+    assert llm.generate_from_messages([{"role": "user", "content": "Hi"}]) == "Hello"
+
+    totals = usage_ledger.summary()["by_model"]["ollama/qwen3:0.6b"]
+    assert totals["calls"] == 2
+    assert totals["failed_calls"] == 1
+    assert totals["completion_tokens"] > 0
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from genai_template_backend.api.admission import AdmissionController, AdmissionRejected
+
+
+async def hold_slot(controller: AdmissionController, seconds: float):
+    await controller.acquire()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        controller.release(seconds)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_and_queue_is_fifo():
+    """Test that requests beyond the limit wait and are admitted in arrival order."""
+    controller = AdmissionController(max_concurrent=2, max_queue_size=10, max_queue_seconds=5)
+    admitted = []
+
+    async def request(name):
+        await controller.acquire()
+        admitted.append(name)
+        await asyncio.sleep(0.05)
+        controller.release()
+
+    tasks = [asyncio.ensure_future(request(i)) for i in range(5)]
+    await asyncio.sleep(0.01)
+    assert (controller.in_flight, controller.queue_depth) == (2, 3)
+
+    await asyncio.gather(*tasks)
+    assert admitted == [0, 1, 2, 3, 4]
+    assert (controller.in_flight, controller.queue_depth) == (0, 0)
+    assert controller.stats()["average_queue_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_429():
+    """Test that a request arriving on a full queue is rejected without waiting."""
+    controller = AdmissionController(max_concurrent=1, max_queue_size=1, max_queue_seconds=5)
+    holder = asyncio.ensure_future(hold_slot(controller, 0.1))
+    queued = asyncio.ensure_future(hold_slot(controller, 0))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+
+    await asyncio.gather(holder, queued)
+    assert controller.rejected_queue_full == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejects_with_503():
+    """Test that a request waiting longer than the max queue time is rejected."""
+    controller = AdmissionController(max_concurrent=1, max_queue_size=5, max_queue_seconds=0.05)
+    holder = asyncio.ensure_future(hold_slot(controller, 0.2))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+    assert rejected.value.status_code == 503
+
+    await holder
+    assert (controller.in_flight, controller.queue_depth) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    """Test that a client giving up while queued doesn't leak its place."""
+    controller = AdmissionController(max_concurrent=1, max_queue_size=5, max_queue_seconds=5)
+    holder = asyncio.ensure_future(hold_slot(controller, 0.05))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0.01)
+
+    waiter.cancel()
+    await holder
+    assert (controller.in_flight, controller.queue_depth) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_release_skips_a_waiter_cancelled_before_it_resumes():
+    """Test that a slot released right after a queued request is cancelled isn't lost."""
+    controller = AdmissionController(max_concurrent=1, max_queue_size=5, max_queue_seconds=5)
+    await controller.acquire()
+    queued = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+
+    queued.cancel()
+    controller.release()  # before the cancelled request resumes
+
+    try:
+        await queued
+    except asyncio.CancelledError:
+        pass
+    else:
+        # before 3.12, wait_for returns a result that arrives along with the cancellation
+        controller.release()
+    assert (controller.in_flight, controller.queue_depth) == (0, 0)
+    await asyncio.wait_for(controller.acquire(), 1)
+    assert controller.in_flight == 1
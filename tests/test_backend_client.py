@@ -0,0 +1,79 @@
+import httpx
+import pytest
+
+from genai_template_frontend import backend_client
+from genai_template_frontend.backend_client import (
+    BackendSession,
+    create_backend_client,
+    iter_sse_events,
+)
+
+
+def echo_cookie(request: httpx.Request) -> httpx.Response:
+    """Return the cookie header received, and set a session cookie."""
+    return httpx.Response(
+        200,
+        json={"cookie": request.headers.get("cookie")},
+        headers={"set-cookie": "jym_session=abc; path=/; httponly"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_sessions_keep_their_own_cookies_over_the_shared_client():
+    """Test that a user's backend session cookie is never sent with another user's requests."""
+    async with create_backend_client(
+        "http://backend", transport=httpx.MockTransport(echo_cookie)
+    ) as client:
+        alice, bob = BackendSession(client), BackendSession(client)
+
+        assert (await alice.post("/api/chat")).json()["cookie"] is None
+        assert (await alice.post("/api/chat")).json()["cookie"] == "jym_session=abc"
+        assert (await bob.post("/api/chat")).json()["cookie"] is None
+        assert len(client.cookies.jar) == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_client_lifecycle():
+    with pytest.raises(RuntimeError):
+        backend_client.get_backend_client()
+
+    await backend_client.start_backend_client()
+    client = backend_client.get_backend_client()
+    await backend_client.start_backend_client()
+    assert backend_client.get_backend_client() is client
+    assert BackendSession().client is client
+
+    await backend_client.stop_backend_client()
+    assert client.is_closed
+
+
+def chat_stream(request: httpx.Request) -> httpx.Response:
+    """Answer like the backend's /api/chat/stream."""
+    body = (
+        'data: {"delta": "Hello"}\n\n'
+        'data: {"delta": " world"}\n\n'
+        'event: usage\ndata: {"completion_tokens": 2}\n\n'
+    )
+    return httpx.Response(
+        200,
+        content=body.encode(),
+        headers={"content-type": "text/event-stream", "set-cookie": "jym_session=abc; path=/"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_streamed_replies_are_parsed_as_server_sent_events():
+    """Test that a streamed reply yields its deltas then its usage, and keeps the session cookie."""
+    async with create_backend_client(
+        "http://backend", transport=httpx.MockTransport(chat_stream)
+    ) as client:
+        session = BackendSession(client)
+        async with session.stream("POST", "/api/chat/stream", json={"message": "Hi"}) as response:
+            events = [event async for event in iter_sse_events(response)]
+
+    assert events == [
+        ("message", {"delta": "Hello"}),
+        ("message", {"delta": " world"}),
+        ("usage", {"completion_tokens": 2}),
+    ]
+    assert session.cookies == {"jym_session": "abc"}
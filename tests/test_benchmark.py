@@ -0,0 +1,231 @@
+import time
+
+import httpx
+import pytest
+
+from genai_template_backend.api.conversations import conversation_store
+from genai_template_backend.api.llm import EmbeddingLLMConfig, InferenceLLMConfig
+from genai_template_backend.benchmark.__main__ import main
+from genai_template_backend.benchmark.driver import (
+    BenchmarkReport,
+    ScenarioResult,
+    a_run_benchmark,
+    compare_reports,
+    percentiles,
+    run_scenario,
+)
+from genai_template_backend.benchmark.stub_server import StubConfig, run_stub_server
+
+FAST_STUB = StubConfig(
+    latency_distribution="constant",
+    latency_ms=5,
+    tokens_per_second=0,
+    completion_tokens=8,
+    embedding_latency_ms=1,
+    embedding_dimensions=16,
+    seed=0,
+)
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    with run_stub_server(FAST_STUB) as base_url:
+        yield base_url
+
+
+def _llm(base_url: str, **kwargs) -> InferenceLLMConfig:
+    return InferenceLLMConfig(
+        model_name="openai/stub-model", api_key="stub", base_url=base_url, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_stub_serves_completions_streams_and_embeddings(stub_url):
+    """Test that the LLM clients work unchanged against the stub provider."""
+    llm = _llm(stub_url)
+
+    answer = await llm.a_generate_from_messages([{"role": "user", "content": "hi"}])
+    chunks = [
+        chunk async for chunk in llm.a_stream_from_messages([{"role": "user", "content": "hi"}])
+    ]
+    embedding_llm = EmbeddingLLMConfig(
+        model_name="openai/stub-embedding", api_key="stub", base_url=stub_url
+    )
+    vector = await embedding_llm.a_embed_text("some text")
+
+    assert answer == "".join(f"tok{i} " for i in range(8))
+    assert "".join(chunks) == answer
+    assert len(vector) == 16
+    assert vector == await embedding_llm.a_embed_text("some text")
+
+
+@pytest.mark.asyncio
+async def test_stub_rate_limits_with_retry_after():
+    """Test that the injected 429s carry a Retry-After header and surface as rate-limit errors."""
+    config = FAST_STUB.model_copy(
+        update={"rate_limit_probability": 1.0, "retry_after_seconds": 0.01}
+    )
+    with run_stub_server(config) as base_url:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{base_url}/chat/completions", json={"model": "m", "messages": []}
+            )
+            assert response.status_code == 429
+            assert response.headers["retry-after"] == "0.01"
+
+            llm = _llm(base_url, max_retries=1)
+            assert await llm.a_generate_from_messages([{"role": "user", "content": "hi"}]) is None
+
+            stats = (await client.get(base_url.removesuffix("/v1") + "/stats")).json()
+    # the direct request, then the client's two attempts, which the provider SDK doesn't retry
+    assert stats["rate_limited"] == stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_storm_ends_within_the_deadline():
+    """Test that a deployment answering only 429s fails the call by its deadline."""
+    config = FAST_STUB.model_copy(
+        update={"rate_limit_probability": 1.0, "retry_after_seconds": 0.2}
+    )
+    with run_stub_server(config) as base_url:
+        llm = _llm(base_url, max_retries=100, deadline_seconds=1.0)
+
+        start_time = time.perf_counter()
+        assert await llm.a_generate_from_messages([{"role": "user", "content": "hi"}]) is None
+        elapsed = time.perf_counter() - start_time
+
+        async with httpx.AsyncClient() as client:
+            stats = (await client.get(base_url.removesuffix("/v1") + "/stats")).json()
+    assert elapsed < 1.5  # the deadline, and some slack for the first call's warm-up
+    # one attempt per Retry-After, none added by litellm or the provider SDK
+    assert stats["requests"] <= 1.0 / 0.2 + 1
+
+
+def test_percentiles():
+    """Test the nearest-rank percentiles."""
+    result = percentiles([float(i) for i in range(1, 101)])
+
+    assert (result.p50, result.p95, result.p99, result.max) == (50.0, 95.0, 99.0, 100.0)
+    assert result.mean == 50.5
+    assert percentiles([]) is None
+
+
+@pytest.mark.asyncio
+async def test_run_scenario_counts_errors():
+    """Test that every request is sent once, failures counted apart from the latencies."""
+    sent = []
+
+    async def request(index: int):
+        sent.append(index)
+        if index % 5 == 0:
+            raise RuntimeError("failed")
+        return 0.001
+
+    result = await run_scenario("fake", request, concurrency=3, n_requests=20)
+
+    assert sorted(sent) == list(range(20))
+    assert result.errors == 4
+    assert result.throughput_rps > 0
+    assert result.time_to_first_token.max == 0.001
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_against_stub(stub_url):
+    """Test a short run of every scenario, the chat ones going through the API."""
+    results = await a_run_benchmark(
+        stub_url,
+        scenarios=["chat", "chat_stream", "inference", "inference_stream", "embedding"],
+        concurrency_levels=[1, 4],
+        n_requests=4,
+    )
+
+    assert [(r.scenario, r.concurrency) for r in results] == [
+        (scenario, concurrency)
+        for scenario in ("chat", "chat_stream", "inference", "inference_stream", "embedding")
+        for concurrency in (1, 4)
+    ]
+    assert all(r.errors == 0 and r.latency is not None for r in results)
+    assert all(r.time_to_first_token is not None for r in results if r.scenario.endswith("stream"))
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_calls_end_at_the_deadline():
+    """Test that a completion or a stream slower than the deadline is cut at the deadline."""
+    config = FAST_STUB.model_copy(
+        update={"latency_ms": 2000, "tokens_per_second": 0, "completion_tokens": 8}
+    )
+    slow_stream = FAST_STUB.model_copy(
+        update={"latency_ms": 5, "tokens_per_second": 10, "completion_tokens": 50}
+    )
+    messages = [{"role": "user", "content": "hi"}]
+    for stub, generate in (
+        (config, lambda llm: llm.a_generate_from_messages(messages)),
+        (slow_stream, lambda llm: _drain(llm.a_stream_from_messages(messages))),
+    ):
+        with run_stub_server(stub) as base_url:
+            llm = _llm(base_url, deadline_seconds=0.5)
+            start_time = time.perf_counter()
+            try:
+                assert await generate(llm) is None
+            except TimeoutError:
+                pass
+            assert time.perf_counter() - start_time < 1.0
+
+
+async def _drain(stream) -> None:
+    async for _ in stream:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_chat_requests_come_from_new_sessions(stub_url):
+    """Test that the chat requests don't pile up into one conversation."""
+    conversation_store.reset()
+
+    await a_run_benchmark(stub_url, scenarios=["chat"], concurrency_levels=[2], n_requests=4)
+
+    assert conversation_store.stats()["conversations"] == 4
+
+
+def _report(throughput: float, p95: float, errors: int = 0) -> BenchmarkReport:
+    latency = percentiles([p95])
+    return BenchmarkReport(
+        created_at="2026-01-01T00:00:00+00:00",
+        python="3.11",
+        platform="test",
+        results=[
+            ScenarioResult(
+                scenario="inference",
+                concurrency=8,
+                requests=100,
+                errors=errors,
+                duration_seconds=1.0,
+                throughput_rps=throughput,
+                latency=latency,
+            )
+        ],
+    )
+
+
+def test_compare_reports_flags_regressions():
+    """Test that throughput drops, latency increases and new errors beyond the threshold are flagged."""
+    baseline = _report(throughput=100, p95=0.2)
+
+    assert not any(c["regression"] for c in compare_reports(baseline, _report(95, 0.21), 0.1))
+    regressions = {
+        c["metric"]
+        for c in compare_reports(baseline, _report(80, 0.3, errors=2), 0.1)
+        if c["regression"]
+    }
+    assert regressions == {"throughput_rps", "latency_p95", "errors"}
+
+
+def test_compare_command_exit_code(tmp_path):
+    """Test that the compare command exits with 1 on a regression only."""
+    baseline, same, slower = tmp_path / "a.json", tmp_path / "b.json", tmp_path / "c.json"
+    baseline.write_text(_report(100, 0.2).model_dump_json())
+    same.write_text(_report(100, 0.2).model_dump_json())
+    slower.write_text(_report(100, 0.5).model_dump_json())
+
+    assert main(["compare", str(baseline), str(same)]) == 0
+    assert main(["compare", str(baseline), str(slower)]) == 1
@@ -0,0 +1,163 @@
+import json
+
+import litellm
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.bulk_inference import a_run_bulk_inference, load_schema
+
+
+@pytest.fixture
+def echo_provider(monkeypatch):
+    """Answer each prompt with itself, and return the list of prompts sent."""
+    acompletion = litellm.acompletion
+    prompts = []
+
+    async def fake_acompletion(*args, messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return await acompletion(
+            *args, messages=messages, mock_response=messages[-1]["content"], **kwargs
+        )
+
+    monkeypatch.setattr(litellm, "acompletion", fake_acompletion)
+    return prompts
+
+
+@pytest.fixture
+def llm():
+    return InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b", api_key="t", base_url="http://localhost:11434"
+    )
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    lines = [json.dumps({"id": f"item-{i}", "prompt": f"prompt {i}"}) for i in range(20)]
+    lines[7] = json.dumps({"id": "item-7", "messages": [{"role": "user", "content": "chat 7"}]})
+    lines[11] = json.dumps({"id": "item-11"})  # neither prompt nor messages
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def _read_output(path) -> dict:
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    return {record["id"]: record for record in records}
+
+
+@pytest.mark.asyncio
+async def test_bulk_inference_writes_one_result_per_item(llm, echo_provider, input_path, tmp_path):
+    """Test that every item gets its output, or its error, and that usage is counted."""
+    output_path = tmp_path / "results.jsonl"
+
+    stats = await a_run_bulk_inference(llm, input_path, output_path, concurrency=4)
+
+    results = _read_output(output_path)
+    assert len(results) == 20
+    assert results["item-3"]["output"] == "prompt 3"
+    assert results["item-7"]["output"] == "chat 7"
+    assert results["item-11"]["output"] is None and "prompt" in results["item-11"]["error"]
+    assert (stats.completed, stats.errors, stats.skipped) == (20, 1, 0)
+    assert stats.total_tokens > 0 and stats.items_per_second > 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_inference_resumes(llm, echo_provider, input_path, tmp_path):
+    """Test that a rerun after a crash only sends the items missing from the output, by id."""
+    output_path = tmp_path / "results.jsonl"
+    await a_run_bulk_inference(llm, input_path, output_path, concurrency=4)
+
+    # simulate a crash: a few results lost and the last one half written
+    lines = output_path.read_text().splitlines()
+    kept = [line for line in lines if json.loads(line)["index"] not in (2, 15, 16)]
+    output_path.write_text("\n".join(kept[:-1]) + "\n" + kept[-1][:10])
+    lost_id = json.loads(kept[-1])["id"]
+    # and lines inserted in the input in the meantime, which moves every item
+    input_lines = input_path.read_text().splitlines()
+    input_path.write_text("\n".join(["", *input_lines[:5], '{"id": "new"}', *input_lines[5:]]))
+    echo_provider.clear()
+
+    stats = await a_run_bulk_inference(llm, input_path, output_path, concurrency=4)
+
+    expected = {"prompt 2", "prompt 15", "prompt 16", lost_id.replace("item-", "prompt ")}
+    assert set(echo_provider) == expected - {"prompt 11"}
+    assert stats.skipped == 20 - len(expected)
+    ids = [json.loads(line)["id"] for line in output_path.read_text().splitlines()]
+    assert sorted(ids) == sorted([f"item-{i}" for i in range(20)] + ["new"])
+
+
+@pytest.mark.asyncio
+async def test_bulk_inference_retries_errors_on_request(llm, monkeypatch, input_path, tmp_path):
+    """Test that failed items count as done, unless the rerun is asked to retry them."""
+    output_path = tmp_path / "results.jsonl"
+    acompletion = litellm.acompletion
+    failing = {"prompt 4"}
+
+    async def flaky_acompletion(*args, messages, **kwargs):
+        if messages[-1]["content"] in failing:
+            raise litellm.exceptions.BadRequestError("bad luck", llm_provider="ollama", model="m")
+        return await acompletion(*args, messages=messages, mock_response="ok", **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", flaky_acompletion)
+    await a_run_bulk_inference(llm, input_path, output_path)
+    assert _read_output(output_path)["item-4"]["error"]
+
+    failing.clear()
+    stats = await a_run_bulk_inference(llm, input_path, output_path)
+    assert (stats.completed, stats.skipped) == (0, 20)
+
+    stats = await a_run_bulk_inference(
+        llm, input_path, output_path, retry_errors=True, concurrency=1
+    )
+    assert (stats.completed, stats.errors, stats.skipped) == (2, 1, 18)  # item-11 fails again
+    results = _read_output(output_path)  # the latest record of each id
+    assert results["item-4"]["error"] is None and results["item-4"]["output"]
+
+
+def test_load_schema():
+    """Test that schemas are imported from module:Class paths."""
+    assert load_schema("genai_template_backend.bulk_inference:BulkInferenceStats").__name__ == (
+        "BulkInferenceStats"
+    )
+    with pytest.raises(ValueError):
+        load_schema("genai_template_backend.bulk_inference")
+    with pytest.raises(ValueError):
+        load_schema("genai_template_backend.bulk_inference:load_schema")
+
+
+@pytest.mark.asyncio
+async def test_bulk_inference_accepts_any_json_id(llm, echo_provider, tmp_path):
+    """Test that list and object ids are written as they are and skipped on a rerun."""
+    input_path = tmp_path / "prompts.jsonl"
+    ids = [["batch", 1], {"b": 2, "a": 1}, 3, "3"]
+    lines = [json.dumps({"id": item_id, "prompt": f"prompt {i}"}) for i, item_id in enumerate(ids)]
+    input_path.write_text("\n".join(lines) + "\n")
+    output_path = tmp_path / "results.jsonl"
+
+    stats = await a_run_bulk_inference(llm, input_path, output_path)
+    assert (stats.completed, stats.errors) == (4, 0)
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(map(json.dumps, (record["id"] for record in records))) == sorted(
+        map(json.dumps, ids)
+    )
+
+    stats = await a_run_bulk_inference(llm, input_path, output_path)
+    assert (stats.completed, stats.skipped) == (0, 4)
+
+
+@pytest.mark.asyncio
+async def test_bulk_inference_fails_when_an_item_raises(
+    llm, echo_provider, monkeypatch, input_path, tmp_path
+):
+    """Test that an unexpected error while processing an item fails the run."""
+    a_generate_result = InferenceLLMConfig.a_generate_result
+
+    async def broken_a_generate_result(self, messages, *args, **kwargs):
+        if messages[-1]["content"] == "prompt 5":
+            raise RuntimeError("broken")
+        return await a_generate_result(self, messages, *args, **kwargs)
+
+    monkeypatch.setattr(InferenceLLMConfig, "a_generate_result", broken_a_generate_result)
+
+    with pytest.raises(RuntimeError, match="broken"):
+        await a_run_bulk_inference(llm, input_path, tmp_path / "results.jsonl", concurrency=2)
@@ -0,0 +1,111 @@
+import time
+
+import litellm
+import pytest
+from pydantic import BaseModel
+
+from genai_template_backend.api.cache import ResponseCache, request_key
+from genai_template_backend.api.llm import InferenceLLMConfig
+
+
+class Person(BaseModel):
+    name: str
+    age: int
+
+
+@pytest.fixture
+def llm():
+    return InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        response_cache=ResponseCache(max_entries=8),
+    )
+
+
+@pytest.fixture
+def provider_calls(fake_llm_provider, monkeypatch):
+    """Count the completions that reach the (fake) provider."""
+    calls = []
+    acompletion, completion = litellm.acompletion, litellm.completion
+
+    async def counting_acompletion(*args, **kwargs):
+        calls.append(kwargs["messages"])
+        return await acompletion(*args, **kwargs)
+
+    def counting_completion(*args, **kwargs):
+        calls.append(kwargs["messages"])
+        return completion(*args, **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", counting_acompletion)
+    monkeypatch.setattr(litellm, "completion", counting_completion)
+    return calls
+
+
+def test_request_key_normalizes_messages():
+    """Test that formatting differences don't change the key, but parameters do."""
+    key = request_key("model", [{"role": "user", "content": "Hello"}], temperature=0.0)
+
+    assert key == request_key("model", [{"content": " Hello\n", "role": "user"}], temperature=0.0)
+    assert key != request_key("model", [{"role": "user", "content": "Hello"}], temperature=0.5)
+    assert key != request_key("other-model", [{"role": "user", "content": "Hello"}])
+    assert key != request_key("model", [{"role": "user", "content": "Hello"}], Person)
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted once the cache is full."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" becomes the least recently used entry
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_expiry():
+    """Test that entries expire after their time-to-live."""
+    cache = ResponseCache(ttl_seconds=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_structured_outputs_are_copied():
+    """Test that callers can't mutate the cached pydantic object."""
+    cache = ResponseCache()
+    cache.set("person", Person(name="John", age=30))
+
+    cache.get("person").age = 31
+    assert cache.get("person") == Person(name="John", age=30)
+
+
+def test_generate_hits_cache(llm, provider_calls):
+    """Test that a repeated prompt is answered from the cache."""
+    messages = [{"role": "user", "content": "What are your opening hours?"}]
+
+    first = llm.generate_from_messages(messages=messages)
+    second = llm.generate_from_messages(messages=messages)
+
+    assert first == second == "Hello from the fake provider!"
+    assert len(provider_calls) == 1
+    assert llm.response_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_a_generate_hits_cache(llm, provider_calls):
+    """Test that the async path shares the cache and skips raw responses."""
+    messages = [{"role": "user", "content": "What are your opening hours?"}]
+
+    await llm.a_generate_from_messages(messages=messages)
+    await llm.a_generate_from_messages(messages=messages)
+    await llm.a_generate_from_messages(messages=messages, raw_response=True)
+
+    assert len(provider_calls) == 2
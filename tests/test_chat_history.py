@@ -0,0 +1,43 @@
+import pytest
+
+from genai_template_frontend.chat_history import ChatHistory
+
+
+def test_only_the_latest_messages_stay_rendered():
+    history = ChatHistory(max_messages=100, render_window=3)
+
+    unrendered = [history.add("user", f"message {i}")[1] for i in range(5)]
+
+    assert unrendered == [[], [], [], [0], [1]]
+    assert history.first_rendered_id == 2
+    assert history.has_earlier()
+
+
+def test_earlier_messages_are_loaded_by_pages():
+    """Test that earlier messages come a window at a time, and stay rendered once loaded."""
+    history = ChatHistory(max_messages=100, render_window=3)
+    for i in range(8):
+        history.add("user", f"message {i}")
+
+    assert [m.text for m in history.load_earlier()] == ["message 2", "message 3", "message 4"]
+    assert [m.text for m in history.load_earlier()] == ["message 0", "message 1"]
+    assert not history.has_earlier()
+    assert history.load_earlier() == []
+
+    # the loaded messages count in the window, which keeps its size from then on
+    assert history.add("bot", "reply")[1] == [0]
+
+
+def test_messages_are_bounded():
+    history = ChatHistory(max_messages=4, render_window=2)
+    for i in range(10):
+        history.add("user", f"message {i}")
+
+    assert len(history) == 4
+    assert [m.text for m in history.load_earlier()] == ["message 6", "message 7"]
+    assert not history.has_earlier()
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        ChatHistory(render_window=0)
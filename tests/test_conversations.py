@@ -0,0 +1,204 @@
+import time
+
+import pytest
+
+from genai_template_backend.api.conversations import (
+    ConversationStore,
+    SqliteConversationBackend,
+    message_tokens,
+)
+
+
+def _turn_tokens(user: str, reply: str) -> int:
+    return message_tokens(user) + message_tokens(reply)
+
+
+def test_history_is_trimmed_to_the_budget_by_whole_turns():
+    """Test that the oldest turns are dropped first, never leaving a reply without its message."""
+    turn = ("q" * 40, "a" * 80)
+    store = ConversationStore(max_context_tokens=3 * _turn_tokens(*turn))
+
+    for i in range(10):
+        store.add_turn("s", f"{i}" + turn[0][1:], turn[1])
+
+    history = store.history("s")
+    assert len(history) == 6
+    assert history[0]["role"] == "user" and history[0]["content"].startswith("7")
+    assert store.stats()["trimmed_messages"] == 14
+
+    # room is made for the new message as well
+    history = store.history("s", new_message="n" * 40)
+    assert len(history) == 4 and history[0]["content"].startswith("8")
+
+
+def test_latest_turn_is_kept_when_it_exceeds_the_budget():
+    store = ConversationStore(max_context_tokens=10)
+
+    store.add_turn("s", "hello", "hi")
+    store.add_turn("s", "hi", "x" * 400)
+
+    assert store.history("s") == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "x" * 400},
+    ]
+
+
+def test_sessions_are_independent():
+    store = ConversationStore()
+    store.add_turn("a", "hello", "hi a")
+    store.add_turn("b", "hello", "hi b")
+
+    assert store.history("a")[-1]["content"] == "hi a"
+    assert store.history(None) == []
+    store.clear("a")
+    assert store.history("a") == []
+    assert store.history("b")[-1]["content"] == "hi b"
+
+
+def test_last_reply_is_replaced(tmp_path):
+    """Test that a regenerated reply replaces the latest one, in memory and in the backend."""
+    path = tmp_path / "conversations.sqlite3"
+    store = ConversationStore(backend=SqliteConversationBackend(path))
+    assert store.last_turn("s") is None
+    store.add_turn("s", "hello", "hi")
+    store.add_turn("s", "how are you?", "wrong")
+
+    assert store.last_turn("s") == (
+        [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}],
+        "how are you?",
+    )
+    store.replace_last_reply("s", "fine, thanks")
+
+    expected = store.history("s")
+    assert expected[-1] == {"role": "assistant", "content": "fine, thanks"}
+    store.reset()
+    assert store.history("s") == expected
+    store.close()
+
+
+def test_idle_conversations_are_evicted():
+    store = ConversationStore(idle_ttl_seconds=0.01)
+    store.add_turn("old", "hello", "hi")
+    time.sleep(0.02)
+
+    store.add_turn("new", "hello", "hi")
+
+    assert store.history("old") == []
+    assert len(store) == 1
+
+
+def test_least_recently_used_conversations_are_evicted_past_the_memory_budget():
+    """Test that the memory budget evicts the least recently used conversations first."""
+    store = ConversationStore(max_memory_bytes=1200)
+    store.add_turn("a", "a" * 300, "reply")
+    store.add_turn("b", "b" * 300, "reply")
+    store.history("a")  # a is now more recent than b
+
+    store.add_turn("c", "c" * 300, "reply")
+
+    assert store.history("b") == []
+    assert store.history("a") and store.history("c")
+    assert store.stats()["memory_bytes"] <= 1200
+
+
+def test_sqlite_backend_reloads_evicted_conversations(tmp_path):
+    """Test that conversations survive evictions and restarts, without their trimmed turns."""
+    path = tmp_path / "conversations.sqlite3"
+    store = ConversationStore(
+        max_context_tokens=2 * _turn_tokens("q" * 40, "a" * 40),
+        backend=SqliteConversationBackend(path),
+    )
+    for i in range(5):
+        store.add_turn("s", f"{i}" * 40, "a" * 40)
+    expected = store.history("s")
+    store.reset()
+    assert store.history("s") == expected
+    store.close()
+
+    restarted = ConversationStore(backend=SqliteConversationBackend(path))
+    assert restarted.history("s") == expected
+    restarted.add_turn("s", "next", "reply")
+    assert restarted.history("s")[-1]["content"] == "reply"
+    restarted.clear("s")
+    restarted.reset()
+    assert restarted.history("s") == []
+    restarted.close()
+
+
+class FakeSummarizer:
+    def __init__(self, answer: str | None = "the summary"):
+        self.answer = answer
+        self.prompts = []
+
+    async def _a_generate_with_completion(self, messages, schema=None, use_caches=True):
+        assert not use_caches, "summaries must not come from the caches"
+        self.prompts.append(messages[-1]["content"])
+        return self.answer, None
+
+
+@pytest.mark.asyncio
+async def test_trimmed_turns_are_folded_into_the_summary():
+    """Test that only the trimmed messages are sent to be summarized, and the summary comes first."""
+    store = ConversationStore(
+        max_context_tokens=2 * _turn_tokens("q" * 40, "a" * 40) + 20, trimming="summary"
+    )
+    summarizer = FakeSummarizer()
+    for i in range(3):
+        store.add_turn("s", f"{i}" * 40, "a" * 40)
+
+    await store.a_summarize("s", summarizer)
+    await store.a_summarize("s", summarizer)  # nothing new to summarize
+
+    assert len(summarizer.prompts) == 1
+    assert "0" * 40 in summarizer.prompts[0] and "1" * 40 not in summarizer.prompts[0]
+    history = store.history("s")
+    assert history[0] == {
+        "role": "system",
+        "content": "Summary of the earlier conversation: the summary",
+    }
+    assert history[1]["content"] == "1" * 40
+
+
+@pytest.mark.asyncio
+async def test_failed_summaries_are_retried_with_the_next_turn():
+    store = ConversationStore(max_context_tokens=40, trimming="summary")
+    for i in range(3):
+        store.add_turn("s", f"{i}" * 40, "a" * 40)
+
+    await store.a_summarize("s", FakeSummarizer(answer=None))
+    summarizer = FakeSummarizer()
+    await store.a_summarize("s", summarizer)
+
+    assert "0" * 40 in summarizer.prompts[0] and "1" * 40 in summarizer.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_trimmed_turns_survive_a_restart_until_summarized(tmp_path):
+    """Test that the trimmed turns stay in the backend until their summary is saved."""
+    path = tmp_path / "conversations.sqlite3"
+    budget = 2 * _turn_tokens("q" * 40, "a" * 40) + 20
+
+    store = ConversationStore(
+        max_context_tokens=budget, trimming="summary", backend=SqliteConversationBackend(path)
+    )
+    for i in range(3):
+        store.add_turn("s", f"{i}" * 40, "a" * 40)
+    await store.a_summarize("s", FakeSummarizer(answer=None))  # the summary fails
+    store.close()
+
+    restarted = ConversationStore(
+        max_context_tokens=budget, trimming="summary", backend=SqliteConversationBackend(path)
+    )
+    restarted.history("s")  # trims the reloaded window again
+    summarizer = FakeSummarizer()
+    await restarted.a_summarize("s", summarizer)
+    assert "0" * 40 in summarizer.prompts[0]
+    restarted.close()
+
+    reloaded = ConversationStore(
+        max_context_tokens=budget, trimming="summary", backend=SqliteConversationBackend(path)
+    )
+    history = reloaded.history("s")
+    assert history[0]["content"] == "Summary of the earlier conversation: the summary"
+    assert all("0" * 40 not in message["content"] for message in history)
+    reloaded.close()
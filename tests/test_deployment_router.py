@@ -0,0 +1,178 @@
+import asyncio
+from collections import Counter
+
+import litellm
+import pytest
+from pydantic import BaseModel
+
+from genai_template_backend.api.deployment_router import LLMRouter
+from genai_template_backend.api.llm import InferenceLLMConfig
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+@pytest.fixture
+def deployments(monkeypatch):
+    """Fake provider answering with the name of the deployment, per base URL.
+
+    Returns the behavior of each deployment, a ``(delay, failing)`` tuple keyed by base URL,
+    with a ``calls`` counter of the requests received by each one.
+    """
+    acompletion = litellm.acompletion
+
+    class Deployments(dict):
+        calls: Counter
+
+    behaviors = Deployments()
+    behaviors.calls = Counter()
+
+    async def fake_acompletion(*args, base_url, **kwargs):
+        behaviors.calls[base_url] += 1
+        delay, failing = behaviors[base_url]
+        if failing:
+            raise litellm.exceptions.ServiceUnavailableError(
+                message="down", llm_provider="ollama", model="qwen3:0.6b"
+            )
+        return await acompletion(
+            *args, base_url=base_url, mock_response=base_url, mock_delay=delay, **kwargs
+        )
+
+    monkeypatch.setattr(litellm, "acompletion", fake_acompletion)
+    return behaviors
+
+
+def _router(*base_urls: str, fallbacks: tuple[str, ...] = (), **kwargs) -> LLMRouter:
+    def client(base_url: str) -> InferenceLLMConfig:
+        return InferenceLLMConfig(
+            model_name="ollama/qwen3:0.6b", api_key="t", base_url=base_url, max_retries=0
+        )
+
+    return LLMRouter(
+        deployments=[client(url) for url in base_urls],
+        fallback_deployments=[client(url) for url in fallbacks],
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefers_the_fastest_deployment(deployments):
+    """Test that once both deployments are measured, requests go to the fastest one."""
+    deployments.update({"http://slow": (0.2, False), "http://fast": (0.01, False)})
+    router = _router("http://slow", "http://fast")
+
+    for _ in range(10):
+        await router.a_generate_from_messages(MESSAGES)
+
+    assert deployments.calls["http://slow"] == 1
+    assert deployments.calls["http://fast"] == 9
+
+
+@pytest.mark.asyncio
+async def test_spreads_concurrent_requests_by_in_flight_count(deployments):
+    """Test that concurrent requests are spread instead of piling up on one deployment."""
+    deployments.update({"http://a": (0.1, False), "http://b": (0.1, False)})
+    router = _router("http://a", "http://b")
+
+    await asyncio.gather(*(router._a_complete(MESSAGES) for _ in range(10)))
+
+    assert deployments.calls["http://a"] == deployments.calls["http://b"] == 5
+
+
+@pytest.mark.asyncio
+async def test_fails_over_and_ejects_a_failing_deployment(deployments):
+    """Test that requests to a failing deployment fail over, until it gets ejected."""
+    deployments.update({"http://down": (0, True), "http://up": (0.01, False)})
+    router = _router("http://down", "http://up", eject_after_failures=3)
+
+    results = [await router.a_generate_from_messages(MESSAGES) for _ in range(10)]
+
+    assert results == ["http://up"] * 10
+    assert deployments.calls["http://down"] == 3
+    assert router.stats()["ollama/qwen3:0.6b@http://down"]["ejected"]
+
+
+@pytest.mark.asyncio
+async def test_reprobes_an_ejected_deployment(deployments):
+    """Test that an ejected deployment gets a probe once its ejection is over, and comes back."""
+    deployments.update({"http://flaky": (0, True), "http://up": (0.05, False)})
+    router = _router("http://flaky", "http://up", eject_after_failures=1, eject_seconds=0.1)
+    router._record(1, 1.0, failed=False)  # make the flaky deployment the first choice
+
+    await router.a_generate_from_messages(MESSAGES)
+    assert router.stats()["ollama/qwen3:0.6b@http://flaky"]["ejected"]
+
+    deployments["http://flaky"] = (0, False)
+    await asyncio.sleep(0.15)
+    assert await router.a_generate_from_messages(MESSAGES) == "http://flaky"
+    assert not router.stats()["ollama/qwen3:0.6b@http://flaky"]["ejected"]
+
+
+@pytest.mark.asyncio
+async def test_fallback_only_used_without_primary(deployments):
+    """Test that fallback deployments only get requests the primary ones can't serve."""
+    deployments.update({"http://primary": (0.05, False), "http://ollama": (0, False)})
+    router = _router("http://primary", fallbacks=("http://ollama",))
+
+    assert await router.a_generate_from_messages(MESSAGES) == "http://primary"
+    deployments["http://primary"] = (0, True)
+    assert await router.a_generate_from_messages(MESSAGES) == "http://ollama"
+    assert deployments.calls["http://ollama"] == 1
+
+
+@pytest.mark.asyncio
+async def test_raises_when_every_deployment_fails(deployments):
+    """Test that the last error is raised once every deployment has been tried."""
+    deployments.update({"http://a": (0, True), "http://b": (0, True)})
+    router = _router("http://a", "http://b")
+
+    with pytest.raises(litellm.exceptions.ServiceUnavailableError):
+        await router._a_complete(MESSAGES)
+    assert await router.a_generate_from_messages(MESSAGES) is None
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_the_first_chunk(deployments):
+    """Test that a stream failing to start is served by another deployment."""
+    deployments.update({"http://down": (0, True), "http://up": (0, False)})
+    router = _router("http://down", "http://up")
+    router._record(1, 1.0, failed=False)  # make the failing deployment look faster
+
+    chunks = [chunk async for chunk in router.a_stream_from_messages(MESSAGES)]
+
+    assert "".join(chunks) == "http://up"
+    assert deployments.calls["http://down"] == 1
+    assert all(health["in_flight"] == 0 for health in router.stats().values())
+
+
+def test_only_the_probe_clears_the_probe_flag(deployments):
+    """Test that an attempt started before the ejection doesn't allow a second probe."""
+    router = _router("http://flaky", "http://up", eject_after_failures=1, eject_seconds=0)
+    router._record(1, 1.0, failed=False)  # make the flaky deployment the first choice
+    earlier = router._select(set())
+    router._record(0, 0.1, failed=True)
+
+    assert router._select(set()) == (0, True)
+    router._release(*earlier)
+
+    assert router._select(set()) == (1, False)
+
+
+@pytest.mark.asyncio
+async def test_instructor_stream_goes_to_the_selected_deployment(deployments, monkeypatch):
+    """Test that structured streams without response schema are routed and fail over."""
+    deployments.update({"http://down": (0, True), "http://up": (0, False)})
+
+    async def fake_stream_partials(self, messages, schema, *args, **kwargs):
+        await litellm.acompletion(model=self.model_name, messages=messages, base_url=self.base_url)
+        yield self.base_url
+
+    monkeypatch.setattr(InferenceLLMConfig, "_a_stream_partials", fake_stream_partials)
+    router = _router("http://down", "http://up")
+    router.supports_response_schema = False
+    router._record(1, 1.0, failed=False)  # make the failing deployment look faster
+
+    partials = [partial async for partial in router.a_stream_structured(MESSAGES, BaseModel)]
+
+    assert partials == ["http://up"]
+    assert deployments.calls["http://down"] == 1
+    assert all(health["in_flight"] == 0 for health in router.stats().values())
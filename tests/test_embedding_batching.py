@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+
+import litellm
+import pytest
+
+from genai_template_backend.api import llm as llm_module
+from genai_template_backend.api.llm import EmbeddingLLMConfig, _split_batches
+from tests.conftest import fake_vector
+
+
+@pytest.fixture
+def embedding_llm():
+    return EmbeddingLLMConfig(
+        model_name="ollama/all-minilm:l6-v2",
+        api_key="t",
+        base_url="http://localhost:11434",
+        embedding_batch_size=2,
+        embedding_max_concurrency=4,
+    )
+
+
+def test_split_batches_respects_item_and_token_limits():
+    """Test that batches are cut on the item count and on the estimated token count."""
+    assert _split_batches(["a", "b", "c"], max_items=2, max_tokens=100) == [["a", "b"], ["c"]]
+    assert _split_batches(["a" * 40, "b" * 40, "c"], max_items=10, max_tokens=15) == [
+        ["a" * 40],
+        ["b" * 40, "c"],
+    ]
+    assert _split_batches([], max_items=2, max_tokens=100) == []
+
+
+def test_embed_texts_batches_and_deduplicates(embedding_llm, fake_embedding_provider):
+    """Test that duplicates are sent once and results come back in input order."""
+    texts = ["one", "two", "three", "two", "four", "five", "one"]
+
+    assert embedding_llm.embed_texts(texts) == [fake_vector(text) for text in texts]
+    assert sorted(map(len, fake_embedding_provider)) == [1, 2, 2]
+    assert sorted(t for batch in fake_embedding_provider for t in batch) == sorted(set(texts))
+
+
+@pytest.mark.asyncio
+async def test_a_embed_texts_dispatches_batches_concurrently(
+    embedding_llm, fake_embedding_provider
+):
+    """Test that batches overlap in time up to the concurrency limit."""
+    fake_embedding_provider.delay = 0.2
+    texts = [f"text {i}" for i in range(8)]  # 4 batches of 2
+
+    start_time = time.perf_counter()
+    vectors = await embedding_llm.a_embed_texts(texts)
+    elapsed = time.perf_counter() - start_time
+
+    assert vectors == [fake_vector(text) for text in texts]
+    assert len(fake_embedding_provider) == 4
+    assert elapsed < 2 * fake_embedding_provider.delay
+
+
+@pytest.mark.asyncio
+async def test_a_embed_texts_retries_failed_batch(embedding_llm, monkeypatch):
+    """Test that a rate-limited batch is retried without failing the job."""
+    monkeypatch.setattr(llm_module, "wait_exponential", lambda **kwargs: lambda state: 0)
+    calls = []
+
+    async def flaky_aembedding(input, **kwargs):
+        calls.append(list(input))
+        if len(calls) == 1:
+            raise litellm.exceptions.RateLimitError("slow down", "ollama", "all-minilm")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0])])
+
+    monkeypatch.setattr(llm_module, "aembedding", flaky_aembedding)
+
+    assert await embedding_llm.a_embed_texts(["hello"]) == [[1.0]]
+    assert calls == [["hello"], ["hello"]]
@@ -0,0 +1,53 @@
+import pytest
+
+from genai_template_backend.api.embedding_cache import EmbeddingCache
+from genai_template_backend.api.llm import EmbeddingLLMConfig
+from tests.conftest import fake_vector
+
+
+@pytest.fixture
+def embedding_llm(tmp_path):
+    return EmbeddingLLMConfig(
+        model_name="ollama/all-minilm:l6-v2",
+        api_key="t",
+        base_url="http://localhost:11434",
+        embedding_cache=EmbeddingCache(tmp_path / "embeddings.sqlite3"),
+    )
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """Test that vectors written by one cache instance are read back by another one."""
+    path = tmp_path / "embeddings.sqlite3"
+    cache = EmbeddingCache(path)
+    cache.put_many("model", {EmbeddingCache.text_hash("hello"): [0.25, -1.0]})
+    cache.close()
+
+    reopened = EmbeddingCache(path)
+    hello, other = EmbeddingCache.text_hash("hello"), EmbeddingCache.text_hash("other")
+    assert reopened.get_many("model", [hello, other]) == {hello: [0.25, -1.0]}
+    assert reopened.get_many("other-model", [hello]) == {}
+
+
+def test_embed_texts_only_sends_misses(embedding_llm, fake_embedding_provider):
+    """Test that re-embedding a corpus only sends new texts, once each, and keeps input order."""
+    assert embedding_llm.embed_texts(["banana", "apple"]) == [
+        fake_vector("banana"),
+        fake_vector("apple"),
+    ]
+
+    texts = ["cherry", "banana", "cherry", "apple"]
+    assert embedding_llm.embed_texts(texts) == [fake_vector(text) for text in texts]
+    assert fake_embedding_provider == [["banana", "apple"], ["cherry"]]
+
+
+@pytest.mark.asyncio
+async def test_a_embed_texts_only_sends_misses(embedding_llm, fake_embedding_provider):
+    """Test that the async path shares the cache with the sync one."""
+    embedding_llm.embed_text("banana")
+
+    assert await embedding_llm.a_embed_texts(["banana", "kiwi"]) == [
+        fake_vector("banana"),
+        fake_vector("kiwi"),
+    ]
+    assert await embedding_llm.a_embed_text("kiwi") == fake_vector("kiwi")
+    assert fake_embedding_provider == [["banana"], ["kiwi"]]
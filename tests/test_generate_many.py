@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import litellm
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+
+
+@pytest.fixture
+def echo_provider(monkeypatch):
+    """Answer each prompt with itself after a delay, failing on prompts starting with "fail"."""
+    acompletion = litellm.acompletion
+    delay = 0.2
+
+    async def fake_acompletion(*args, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        if prompt.startswith("fail"):
+            raise ValueError(f"cannot answer {prompt}")
+        return await acompletion(
+            *args, messages=messages, mock_response=prompt, mock_delay=delay, **kwargs
+        )
+
+    monkeypatch.setattr(litellm, "acompletion", fake_acompletion)
+    return delay
+
+
+@pytest.fixture
+def llm():
+    return InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b", api_key="t", base_url="http://localhost:11434"
+    )
+
+
+def _conversations(prompts: list[str]) -> list[list]:
+    return [[{"role": "user", "content": prompt}] for prompt in prompts]
+
+
+@pytest.mark.asyncio
+async def test_results_keep_order_with_per_item_errors(llm, echo_provider):
+    """Test that a failed item carries its error without failing the rest of the batch."""
+    results = await llm.a_generate_many(_conversations(["one", "fail two", "three"]))
+
+    assert [result.output for result in results] == ["one", None, "three"]
+    assert results[0].error is None and results[2].error is None
+    assert "cannot answer fail two" in results[1].error
+
+
+@pytest.mark.asyncio
+async def test_throughput_scales_with_concurrency(llm, echo_provider):
+    """Test that a batch takes about ceil(n / max_concurrency) latencies, not n of them."""
+    prompts = [f"prompt {i}" for i in range(8)]
+
+    start_time = time.perf_counter()
+    results = await llm.a_generate_many(_conversations(prompts), max_concurrency=4)
+    elapsed = time.perf_counter() - start_time
+
+    assert [result.output for result in results] == prompts
+    assert 2 * echo_provider <= elapsed < 3 * echo_provider
+
+
+def test_generate_many_sync_wrapper(llm, echo_provider):
+    """Test that the sync wrapper runs the batch on its own event loop."""
+    results = llm.generate_many(_conversations(["a", "b"]), max_concurrency=2)
+
+    assert [result.output for result in results] == ["a", "b"]
+    with pytest.raises(ValueError):
+        asyncio.run(llm.a_generate_many(_conversations(["a"]), max_concurrency=0))
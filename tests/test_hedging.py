@@ -0,0 +1,135 @@
+import time
+
+import litellm
+import pytest
+
+from genai_template_backend.api.deployment_router import LLMRouter
+from genai_template_backend.api.hedging import HedgingPolicy
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.metrics import LLM_HEDGED_CALL_DURATION
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+@pytest.fixture
+def scripted_provider(monkeypatch):
+    """Fake provider whose successive calls take the delays of the returned list.
+
+    Each call answers with the base URL it was sent to and the number of the call.
+    """
+    acompletion = litellm.acompletion
+
+    class Delays(list):
+        calls: list
+
+    delays = Delays()
+    calls = delays.calls = []
+
+    async def fake_acompletion(*args, base_url, **kwargs):
+        calls.append(base_url)
+        delay = delays.pop(0) if delays else 0.0
+        return await acompletion(
+            *args,
+            base_url=base_url,
+            mock_response=f"{base_url} #{len(calls)}",
+            mock_delay=delay,
+            **kwargs,
+        )
+
+    monkeypatch.setattr(litellm, "acompletion", fake_acompletion)
+    return delays
+
+
+def _primed_policy(latency: float = 0.05, **kwargs) -> HedgingPolicy:
+    policy = HedgingPolicy(**{"max_burst": 1.0, "max_hedge_rate": 1.0, **kwargs})
+    for _ in range(policy.min_samples):
+        policy.record(latency)
+    return policy
+
+
+def _client(
+    base_url: str = "http://a", model_name: str = "ollama/qwen3:0.6b", **kwargs
+) -> InferenceLLMConfig:
+    return InferenceLLMConfig(model_name=model_name, api_key="t", base_url=base_url, **kwargs)
+
+
+def test_policy_delay_and_budget():
+    """Test the hedge delay percentile, and that hedges are capped by the budget."""
+    policy = HedgingPolicy(percentile=90, max_hedge_rate=0.5, max_burst=1.0, min_samples=10)
+    assert policy.delay() is None  # not enough samples yet
+
+    for latency in range(1, 11):
+        policy.record(latency / 10)
+    assert policy.delay() == pytest.approx(0.9)
+
+    assert policy.try_fire()  # the budget refilled by the two calls so far
+    assert not policy.try_fire()
+    assert policy.stats()["hedges_fired"] == 1 and policy.stats()["hedges_skipped"] == 1
+
+
+class TestHedgedGeneration:
+    @pytest.mark.asyncio
+    async def test_hedge_wins_over_slow_attempt(self, scripted_provider):
+        """Test that a slow call is hedged and answered by the hedge."""
+        scripted_provider.extend([2.0, 0.05])
+        llm = _client(hedging=_primed_policy())
+
+        start_time = time.perf_counter()
+        response = await llm.a_generate_from_messages(MESSAGES)
+
+        assert time.perf_counter() - start_time < 0.5
+        assert response == "http://a #2"
+        assert llm.hedging.stats()["hedges_fired"] == llm.hedging.stats()["hedges_won"] == 1
+        # the slow attempt is sampled too, with the time it ran before being cancelled
+        samples = list(llm.hedging._latencies)[llm.hedging.min_samples :]
+        assert len(samples) == 2 and samples[1] > samples[0]
+
+    @pytest.mark.asyncio
+    async def test_hedge_outcome_is_recorded_per_call(self, scripted_provider):
+        """Test that each call records whether it was hedged and which attempt won."""
+        scripted_provider.extend([2.0, 0.05, 0.01])
+        llm = _client(model_name="ollama/hedge-outcomes", hedging=_primed_policy(latency=0.2))
+
+        await llm.a_generate_from_messages(MESSAGES)  # hedged, the hedge wins
+        await llm.a_generate_from_messages(MESSAGES)  # fast, not hedged
+
+        def calls(hedged: str, winner: str) -> int:
+            return LLM_HEDGED_CALL_DURATION.count(
+                model="ollama/hedge-outcomes", hedged=hedged, winner=winner
+            )
+
+        assert calls("true", "hedge") == 1
+        assert calls("false", "first") == 1
+        assert calls("true", "first") == 0
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self, scripted_provider):
+        """Test that calls faster than the hedge delay only send one request."""
+        llm = _client(hedging=_primed_policy(latency=0.5))
+
+        assert await llm.a_generate_from_messages(MESSAGES) == "http://a #1"
+        assert len(scripted_provider.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_budget(self, scripted_provider):
+        """Test that a slow call isn't hedged once the hedge budget is spent."""
+        scripted_provider.extend([0.3])
+        llm = _client(hedging=_primed_policy(max_hedge_rate=0.0))
+
+        assert await llm.a_generate_from_messages(MESSAGES) == "http://a #1"
+        assert len(scripted_provider.calls) == 1
+        assert llm.hedging.stats()["hedges_skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_router_hedges_to_another_deployment(self, scripted_provider):
+        """Test that the router sends the hedge to another deployment than the slow attempt."""
+        scripted_provider.extend([2.0, 0.05])
+        router = LLMRouter(
+            deployments=[_client("http://a", max_retries=0), _client("http://b", max_retries=0)],
+            hedging=_primed_policy(),
+        )
+        router._record(1, 1.0, failed=False)  # make http://a the first choice
+
+        assert await router.a_generate_from_messages(MESSAGES) == "http://b #2"
+        assert scripted_provider.calls == ["http://a", "http://b"]
+        assert all(health["in_flight"] == 0 for health in router.stats().values())
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+from genai_template_backend.utils import LazyModule
+
+
+def test_lazy_module_imports_on_first_use():
+    """Test that the module is imported on first attribute access, and configured once."""
+    configured = []
+    lazy_json = LazyModule("json", on_import=configured.append)
+    assert configured == []
+    assert "not imported yet" in repr(lazy_json)
+
+    assert lazy_json.dumps([1]) == "[1]"
+    assert lazy_json.loads("2") == 2
+
+    assert [module.__name__ for module in configured] == ["json"]
+    assert "imported" in repr(lazy_json)
+
+
+def test_app_import_does_not_load_heavy_dependencies():
+    """Test that importing the app leaves litellm, instructor, numpy and torch unloaded."""
+    heavy = ["litellm", "instructor", "numpy", "torch"]
+    code = (
+        "import sys, genai_template_backend.app; "
+        f"print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=os.environ.copy()
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
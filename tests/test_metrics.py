@@ -0,0 +1,103 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.metrics import (
+    LLM_REQUEST_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+    MetricsRegistry,
+    observe_llm_call,
+)
+
+
+def test_render_prometheus_text_format():
+    """Test that counters, gauges and histograms are rendered in the Prometheus text format."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests.", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight.")
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    in_flight.set(3)
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert "# TYPE requests counter" in text
+    assert 'requests_total{route="/a\\"b"} 3.0' in text
+    assert "in_flight 3.0" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "latency_seconds_sum 5.55" in text
+
+
+def test_collectors():
+    """Test that numeric statistics of collectors are exposed as gauges, and failures ignored."""
+    registry = MetricsRegistry()
+    registry.register_collector("cache", lambda: {"hits": 2, "enabled": True, "nested": {"x": 1}})
+    registry.register_collector("broken", lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert "genai_cache_hits 2.0" in text
+    assert "genai_cache_nested_x 1.0" in text
+    assert "enabled" not in text
+    registry.unregister_collector("cache")
+    assert "genai_cache_hits" not in registry.render()
+
+
+def test_recording_overhead():
+    """Test that recording a call stays cheap enough for the hot path."""
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=34)
+    number = 10_000
+
+    start_time = time.perf_counter()
+    for _ in range(number):
+        observe_llm_call("overhead-model", "completion", 0.2, usage)
+    per_call = (time.perf_counter() - start_time) / number
+
+    assert per_call < 50e-6
+
+
+def test_llm_calls_are_recorded(fake_llm_provider):
+    """Test that completions and streams record their latency and time to first token."""
+    llm = InferenceLLMConfig(
+        model_name="ollama/metrics-model", api_key="t", base_url="http://localhost:11434"
+    )
+    labels = dict(model="ollama/metrics-model", outcome="success")
+    completions = LLM_REQUEST_DURATION.count(operation="completion", **labels)
+    streams = LLM_REQUEST_DURATION.count(operation="stream", **labels)
+
+    llm.generate_from_messages([{"role": "user", "content": "Hi"}])
+    "".join(llm.stream_from_messages([{"role": "user", "content": "Hi"}]))
+
+    assert LLM_REQUEST_DURATION.count(operation="completion", **labels) == completions + 1
+    assert LLM_REQUEST_DURATION.count(operation="stream", **labels) == streams + 1
+    assert LLM_TIME_TO_FIRST_TOKEN.count(model="ollama/metrics-model") >= 1
+
+
+@pytest.mark.asyncio
+async def test_failed_llm_calls_are_recorded(monkeypatch):
+    """Test that failing calls are recorded with an error outcome."""
+    import litellm
+
+    async def failing_acompletion(*args, **kwargs):
+        raise litellm.exceptions.APIConnectionError("down", "ollama", "ollama/failing-model")
+
+    monkeypatch.setattr(litellm, "acompletion", failing_acompletion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/failing-model", api_key="t", base_url="http://localhost:11434"
+    )
+
+    assert await llm.a_generate_from_messages([{"role": "user", "content": "Hi"}]) is None
+    assert (
+        LLM_REQUEST_DURATION.count(
+            model="ollama/failing-model", operation="completion", outcome="error"
+        )
+        == 1
+    )
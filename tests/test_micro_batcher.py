@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from genai_template_backend.api.llm import EmbeddingLLMConfig
+from genai_template_backend.api.micro_batcher import EmbeddingMicroBatcher
+from tests.conftest import fake_vector
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced(fake_embedding_provider):
+    """Test that concurrent a_embed_text calls share provider calls and get their own vectors."""
+    llm = EmbeddingLLMConfig(
+        model_name="ollama/all-minilm:l6-v2",
+        api_key="t",
+        base_url="http://localhost:11434",
+        micro_batching=True,
+        micro_batch_max_size=16,
+        micro_batch_max_wait_ms=20,
+    )
+    texts = [f"text {i}" for i in range(40)]
+
+    vectors = await asyncio.gather(*(llm.a_embed_text(text) for text in texts))
+
+    assert vectors == [fake_vector(text) for text in texts]
+    assert [len(batch) for batch in fake_embedding_provider] == [16, 16, 8]
+    assert llm.micro_batcher.fill_ratio == pytest.approx(40 / 48)
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller():
+    """Test that a failing batch call raises in each waiting caller."""
+
+    async def failing_embed_batch(texts):
+        raise ConnectionError("provider down")
+
+    batcher = EmbeddingMicroBatcher(failing_embed_batch, max_batch_size=4, max_wait_ms=1)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert batcher.batches == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_is_dropped_from_batch():
+    """Test that a caller cancelled before the flush doesn't take a slot in the batch."""
+    batches = []
+
+    async def embed_batch(texts):
+        batches.append(texts)
+        return [fake_vector(text) for text in texts]
+
+    batcher = EmbeddingMicroBatcher(embed_batch, max_batch_size=4, max_wait_ms=20)
+    cancelled = asyncio.ensure_future(batcher.submit("cancelled"))
+    kept = asyncio.ensure_future(batcher.submit("kept"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await kept == fake_vector("kept")
+    assert batches == [["kept"]]
@@ -0,0 +1,117 @@
+import time
+
+import httpx
+import litellm
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.rate_limit import (
+    RateLimiter,
+    RateLimitTimeout,
+    get_rate_limiter,
+    retry_after_seconds,
+)
+
+
+def rate_limit_error(headers: dict | None = None) -> litellm.exceptions.RateLimitError:
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "http://llm"))
+    return litellm.exceptions.RateLimitError("slow down", "openai", "gpt", response=response)
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        ({"retry-after": "2"}, 2.0),
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"x-ratelimit-reset-requests": "1m30s"}, 90.0),
+        ({"x-ratelimit-reset-tokens": "20ms"}, 0.02),
+        ({}, None),
+    ],
+)
+def test_retry_after_seconds(headers, expected):
+    """Test that the provider's retry hints are read from the error headers."""
+    assert retry_after_seconds(rate_limit_error(headers)) == pytest.approx(expected)
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_paces_calls():
+    """Test that requests beyond the bucket capacity wait for it to refill."""
+    limiter = RateLimiter(requests_per_minute=600)  # 10 per second, burst of 600
+    limiter._requests.tokens = 1
+
+    start_time = time.perf_counter()
+    await limiter.acquire()
+    await limiter.acquire()
+    await limiter.acquire()
+
+    assert time.perf_counter() - start_time == pytest.approx(0.2, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_acquire_fails_fast_past_deadline():
+    """Test that a caller doesn't wait for capacity it would get after its deadline."""
+    limiter = RateLimiter(tokens_per_minute=60)
+
+    await limiter.acquire(tokens=60)
+    with pytest.raises(RateLimitTimeout):
+        await limiter.acquire(tokens=30, deadline=time.monotonic() + 1)
+
+    # the failed attempt didn't consume capacity
+    assert limiter._tokens.tokens == pytest.approx(0, abs=0.1)
+
+
+def test_backoff_without_hint_is_jittered_exponential():
+    """Test that backoff delays grow exponentially and never exceed the cap."""
+    limiter = RateLimiter(base_backoff=1.0, max_backoff=5.0)
+    for attempt, cap in enumerate([1, 2, 4, 5, 5]):
+        assert 0 <= limiter.backoff(rate_limit_error(), attempt) <= cap
+    assert limiter.rate_limited == 5
+
+
+def test_limiters_are_shared_per_deployment():
+    """Test that clients of the same deployment share one limiter."""
+    limiter = get_rate_limiter("openai/gpt-4o", "https://a.example.com")
+
+    assert get_rate_limiter("openai/gpt-4o", "https://a.example.com") is limiter
+    assert get_rate_limiter("openai/gpt-4o", "https://b.example.com") is not limiter
+
+
+@pytest.mark.asyncio
+async def test_a_generate_honors_retry_after(fake_llm_provider, monkeypatch):
+    """Test that a 429 is retried after the delay asked by the provider."""
+    fake_llm_provider("Hello!")
+    acompletion, calls = litellm.acompletion, []
+
+    async def throttled_acompletion(*args, **kwargs):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            raise rate_limit_error({"retry-after-ms": "200"})
+        return await acompletion(*args, **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", throttled_acompletion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/retry-after", api_key="t", base_url="http://localhost:11434"
+    )
+
+    assert await llm.a_generate("Hi") == "Hello!"
+    assert calls[1] - calls[0] == pytest.approx(0.2, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_a_generate_fails_fast_when_deadline_would_be_exceeded(monkeypatch):
+    """Test that a long Retry-After fails the call immediately instead of holding it."""
+
+    async def throttled_acompletion(*args, **kwargs):
+        raise rate_limit_error({"retry-after": "60"})
+
+    monkeypatch.setattr(litellm, "acompletion", throttled_acompletion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/deadline",
+        api_key="t",
+        base_url="http://localhost:11434",
+        deadline_seconds=5,
+    )
+
+    start_time = time.perf_counter()
+    assert await llm.a_generate("Hi") is None
+    assert time.perf_counter() - start_time < 1
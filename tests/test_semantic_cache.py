@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.semantic_cache import SemanticCache
+
+VOCABULARY = ["how", "do", "i", "reset", "my", "the", "password", "opening", "hours"]
+
+
+class BagOfWordsEmbedder:
+    """Embedding model stand-in: one dimension per vocabulary word."""
+
+    def embed_text(self, text: str) -> list[float]:
+        words = text.lower().replace("?", "").split()
+        return [float(words.count(word)) for word in VOCABULARY]
+
+    async def a_embed_text(self, text: str) -> list[float]:
+        return self.embed_text(text)
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(BagOfWordsEmbedder(), capacity=2, similarity_threshold=0.4)
+
+
+def test_lookup_matches_paraphrase(cache):
+    """Test that a paraphrase hits and an unrelated prompt misses."""
+    embedder = cache.embedding_llm
+    cache.add(embedder.embed_text("reset my password"), "Click on 'Forgot password'.")
+
+    assert cache.lookup(embedder.embed_text("How do I reset the password?")) == (
+        "Click on 'Forgot password'."
+    )
+    assert cache.lookup(embedder.embed_text("opening hours")) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_namespaces_are_isolated(cache):
+    """Test that entries stored for a configuration are not returned for another one."""
+    vector = cache.embedding_llm.embed_text("reset my password")
+    cache.add(vector, "answer", namespace="model-a")
+
+    assert cache.lookup(vector, namespace="model-b") is None
+    assert cache.lookup(vector, namespace="model-a") == "answer"
+
+
+def test_capacity_evicts_least_recently_used(cache):
+    """Test that the least recently used entry is overwritten when the cache is full."""
+    vectors = np.eye(3, dtype=np.float32)
+    cache.add(vectors[0], "first")
+    cache.add(vectors[1], "second")
+    cache.lookup(vectors[0])
+    cache.add(vectors[2], "third")
+
+    assert len(cache) == 2
+    assert cache.lookup(vectors[1]) is None
+    assert cache.lookup(vectors[0]) == "first"
+    assert cache.evictions == 1
+
+
+def test_override_replaces_false_positive(cache):
+    """Test that a wrong hit can be corrected and is counted."""
+    embedder = cache.embedding_llm
+    cache.add(embedder.embed_text("reset my password"), "wrong answer")
+
+    assert cache.override(embedder.embed_text("how do i reset the password"), "right answer")
+    assert cache.lookup(embedder.embed_text("reset my password")) == "right answer"
+    assert cache.false_positive_overrides == 1
+
+
+@pytest.mark.asyncio
+async def test_a_generate_uses_semantic_cache(fake_llm_provider):
+    """Test that a paraphrased prompt is answered without calling the inference model."""
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        semantic_cache=SemanticCache(BagOfWordsEmbedder(), similarity_threshold=0.4),
+    )
+    fake_llm_provider("Click on 'Forgot password'.")
+    first = await llm.a_generate("reset my password")
+
+    fake_llm_provider("This answer should come from the cache instead.")
+    second = await llm.a_generate("How do I reset the password?")
+    third = await llm.a_generate("opening hours")
+
+    assert first == second == "Click on 'Forgot password'."
+    assert third == "This answer should come from the cache instead."
+    assert llm.semantic_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_a_regenerate_overrides_the_wrong_hit(fake_llm_provider):
+    """Test that a regenerated output replaces the cached one for the paraphrases too."""
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        semantic_cache=SemanticCache(BagOfWordsEmbedder(), similarity_threshold=0.4),
+    )
+    fake_llm_provider("wrong answer")
+    await llm.a_generate("reset my password")
+
+    fake_llm_provider("Click on 'Forgot password'.")
+    messages = [{"role": "user", "content": "How do I reset the password?"}]
+    assert await llm.a_regenerate_from_messages(messages) == "Click on 'Forgot password'."
+
+    fake_llm_provider("This answer should come from the cache instead.")
+    assert await llm.a_generate("reset my password") == "Click on 'Forgot password'."
+    assert llm.semantic_cache.stats()["false_positive_overrides"] == 1
+
+
+@pytest.mark.asyncio
+async def test_per_call_options_are_part_of_the_namespace(fake_llm_provider):
+    """Test that prompts sent with different options don't get each other's answers."""
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        semantic_cache=SemanticCache(BagOfWordsEmbedder(), similarity_threshold=0.4),
+    )
+    fake_llm_provider("Short answer.")
+    await llm.a_generate("reset my password", top_p=0.1)
+
+    fake_llm_provider("Answer for other options.")
+    assert await llm.a_generate("reset my password", top_p=0.9) == "Answer for other options."
+    assert await llm.a_generate("reset my password", top_p=0.1) == "Short answer."
@@ -0,0 +1,144 @@
+import asyncio
+
+import litellm
+import pytest
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.single_flight import SingleFlight
+
+
+class CountingCall:
+    """Slow call counting how many times it actually ran."""
+
+    def __init__(self, result="done", delay=0.1):
+        self.result, self.delay = result, delay
+        self.started = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_flight():
+    """Test that concurrent callers with the same key get the result of a single call."""
+    single_flight, call = SingleFlight(), CountingCall()
+
+    results = await asyncio.gather(*(single_flight.do("key", call) for _ in range(10)))
+
+    assert results == ["done"] * 10
+    assert call.started == 1
+    assert (single_flight.calls, single_flight.coalesced) == (1, 9)
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared():
+    """Test that every caller receives the exception of the shared call."""
+    single_flight, call = SingleFlight(), CountingCall(result=ValueError("boom"))
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", call) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert call.started == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_the_shared_call():
+    """Test that the call survives a cancelled waiter and is cancelled with the last one."""
+    single_flight, call = SingleFlight(), CountingCall()
+    first = asyncio.ensure_future(single_flight.do("key", call))
+    second = asyncio.ensure_future(single_flight.do("key", call))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    assert await second == "done"
+    assert not call.cancelled
+
+    third = asyncio.ensure_future(single_flight.do("other", call))
+    await asyncio.sleep(0.01)
+    third.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await third
+    await asyncio.sleep(0)
+    assert call.cancelled
+
+
+@pytest.mark.asyncio
+async def test_a_generate_coalesces_duplicate_requests(fake_llm_provider, monkeypatch):
+    """Test that a double-submitted prompt reaches the provider once."""
+    fake_llm_provider("Hello!", delay=0.1)
+    acompletion, calls = litellm.acompletion, []
+
+    async def counting_acompletion(*args, **kwargs):
+        calls.append(kwargs["messages"])
+        return await acompletion(*args, **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", counting_acompletion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        single_flight=SingleFlight(),
+    )
+
+    results = await asyncio.gather(llm.a_generate("Hi"), llm.a_generate("Hi"), llm.a_generate("Yo"))
+
+    assert results == ["Hello!"] * 3
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_regeneration_does_not_join_the_call_in_flight(fake_llm_provider, monkeypatch):
+    """Test that a regeneration makes its own call instead of sharing the one being replaced."""
+    fake_llm_provider("Hello!", delay=0.1)
+    acompletion, calls = litellm.acompletion, []
+
+    async def counting_acompletion(*args, **kwargs):
+        calls.append(kwargs["messages"])
+        return await acompletion(*args, **kwargs)
+
+    monkeypatch.setattr(litellm, "acompletion", counting_acompletion)
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        single_flight=SingleFlight(),
+    )
+    messages = [{"role": "user", "content": "Hi"}]
+
+    await asyncio.gather(
+        llm.a_generate_from_messages(messages), llm.a_regenerate_from_messages(messages)
+    )
+
+    assert len(calls) == 2
+    assert llm.single_flight.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_usage_is_reported_to_the_caller_that_made_the_call(fake_llm_provider):
+    """Test that callers joining a call in flight don't count its tokens again."""
+    fake_llm_provider("Hello!", delay=0.1)
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b",
+        api_key="t",
+        base_url="http://localhost:11434",
+        single_flight=SingleFlight(),
+    )
+    messages = [{"role": "user", "content": "Hi"}]
+
+    results = await asyncio.gather(*(llm.a_generate_result(messages) for _ in range(3)))
+
+    assert [result.output for result in results] == ["Hello!"] * 3
+    assert results[0].total_tokens > 0
+    assert [result.total_tokens for result in results[1:]] == [0, 0]
@@ -0,0 +1,71 @@
+from typing import Optional
+
+import instructor
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.structured_output import (
+    instructor_client,
+    parse_json_output,
+    response_format,
+)
+
+ANSWER = '{"name": "John", "age": 30, "verified": true, "nickname": null}'
+
+
+class Person(BaseModel):
+    name: str
+    age: int
+    verified: bool
+    nickname: Optional[str]
+
+
+@pytest.fixture
+def llm():
+    return InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b", api_key="t", base_url="http://localhost:11434"
+    )
+
+
+def test_parse_json_output():
+    """Test that JSON literals are parsed, and that invalid content is rejected."""
+    assert parse_json_output(Person, ANSWER) == Person(
+        name="John", age=30, verified=True, nickname=None
+    )
+    with pytest.raises(ValidationError):
+        parse_json_output(Person, "{'name': 'John'}")
+    with pytest.raises(ValueError):
+        parse_json_output(Person, None)
+
+
+def test_prepared_once():
+    """Test that response formats and instructor clients are built once and reused."""
+    assert response_format(Person) is response_format(Person)
+    assert response_format(Person)["json_schema"]["name"] == "Person"
+    assert instructor_client(instructor.Mode.JSON) is instructor_client(instructor.Mode.JSON)
+    assert instructor_client(instructor.Mode.JSON) is not instructor_client(instructor.Mode.TOOLS)
+
+
+@pytest.mark.parametrize("supports_response_schema", [True, False])
+def test_generate_structured_output(llm, fake_llm_provider, supports_response_schema):
+    """Test both structured paths: the provider's response format and the instructor fallback."""
+    fake_llm_provider(ANSWER)
+    llm.supports_response_schema = supports_response_schema
+
+    person = llm.generate_from_messages([{"role": "user", "content": "Who?"}], schema=Person)
+
+    assert isinstance(person, Person)
+    assert person.model_dump() == {"name": "John", "age": 30, "verified": True, "nickname": None}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supports_response_schema", [True, False])
+async def test_a_generate_structured_output(llm, fake_llm_provider, supports_response_schema):
+    """Test that the async structured paths use the same parsing."""
+    fake_llm_provider(ANSWER)
+    llm.supports_response_schema = supports_response_schema
+
+    person = await llm.a_generate_from_messages([{"role": "user", "content": "Who?"}], Person)
+
+    assert person.verified is True and person.nickname is None
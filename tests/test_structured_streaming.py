@@ -0,0 +1,111 @@
+from typing import Annotated, Optional
+
+import pytest
+from pydantic import BaseModel, Field
+
+from genai_template_backend.api.accounting import usage_ledger
+from genai_template_backend.api.llm import InferenceLLMConfig
+from genai_template_backend.api.metrics import LLM_REQUEST_DURATION, LLM_TIME_TO_FIRST_TOKEN
+
+ANSWER = (
+    '{"entities": [{"name": "Ada", "kind": "person"}, {"name": "Acme", "kind": "company"},'
+    ' {"name": "Paris", "kind": "city"}], "source": "notes"}'
+)
+MESSAGES = [{"role": "user", "content": "Extract the entities"}]
+
+
+class Entity(BaseModel):
+    name: str
+    kind: str
+
+
+class Extraction(BaseModel):
+    entities: list[Entity]
+    source: str
+
+
+@pytest.fixture(params=[True, False], ids=["response_schema", "instructor"])
+def llm(request, fake_llm_provider):
+    """Client going through the provider's response format, or the instructor JSON fallback."""
+    fake_llm_provider(ANSWER)
+    llm = InferenceLLMConfig(
+        model_name="ollama/qwen3:0.6b", api_key="t", base_url="http://localhost:11434"
+    )
+    llm.supports_response_schema = request.param
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_a_stream_structured_yields_growing_partials(llm):
+    """Test that partial objects are yielded before the whole response is generated."""
+    partials = [partial async for partial in llm.a_stream_structured(MESSAGES, Extraction)]
+
+    assert len(partials) > 1
+    assert any(p.entities and p.source is None for p in partials)
+    final = partials[-1]
+    assert [entity.name for entity in final.entities] == ["Ada", "Acme", "Paris"]
+    assert final.source == "notes"
+
+
+@pytest.mark.asyncio
+async def test_a_stream_structured_items(llm):
+    """Test that list items are yielded one by one, complete and validated."""
+    items = [item async for item in llm.a_stream_structured_items(MESSAGES, Extraction, "entities")]
+
+    assert items == [
+        Entity(name="Ada", kind="person"),
+        Entity(name="Acme", kind="company"),
+        Entity(name="Paris", kind="city"),
+    ]
+
+
+class OptionalExtraction(BaseModel):
+    entities: Annotated[Optional[list[Entity]], Field(description="Named entities")] = None
+    source: str
+
+
+@pytest.mark.asyncio
+async def test_a_stream_structured_items_of_an_optional_list(llm):
+    """Test that optional and annotated list fields are unwrapped to their item type."""
+    stream = llm.a_stream_structured_items(MESSAGES, OptionalExtraction, "entities")
+    items = [item async for item in stream]
+
+    assert [item.name for item in items] == ["Ada", "Acme", "Paris"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("field", ["source", "missing"])
+async def test_a_stream_structured_items_needs_a_list_field(llm, field):
+    """Test that a field which isn't a list is rejected before anything is sent."""
+    with pytest.raises(ValueError, match="not a list field of Extraction"):
+        await anext(llm.a_stream_structured_items(MESSAGES, Extraction, field))
+
+
+@pytest.mark.asyncio
+async def test_a_stream_structured_is_recorded(llm):
+    """Test that structured streams record their latency and time to first token, either way."""
+    labels = dict(model=llm.model_name, operation="stream")
+    streams = LLM_REQUEST_DURATION.count(outcome="success", **labels)
+    first_tokens = LLM_TIME_TO_FIRST_TOKEN.count(model=llm.model_name)
+
+    [partial async for partial in llm.a_stream_structured(MESSAGES, Extraction)]
+
+    assert LLM_REQUEST_DURATION.count(outcome="success", **labels) == streams + 1
+    assert LLM_TIME_TO_FIRST_TOKEN.count(model=llm.model_name) == first_tokens + 1
+
+    stream = llm.a_stream_structured(MESSAGES, Extraction)
+    await anext(stream)
+    await stream.aclose()  # the caller stops reading, like a disconnected client
+    assert LLM_REQUEST_DURATION.count(outcome="cancelled", **labels) >= 1
+
+
+@pytest.mark.asyncio
+async def test_a_stream_structured_usage_is_accounted(llm):
+    """Test that structured streams account their tokens, estimated if the provider sends none."""
+    usage_ledger.reset()
+
+    [partial async for partial in llm.a_stream_structured(MESSAGES, Extraction)]
+
+    totals = usage_ledger.summary()["by_model"][llm.model_name]
+    assert totals["calls"] == 1
+    assert totals["prompt_tokens"] > 0 and totals["completion_tokens"] > 0